@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+from optimizers import factor_cache, max_sharpe_portfolio
+from portfolio_functions import PortfolioProblem
+from stock_functions import annualization_factor
+
+
+class RollingMoments:
+    """
+    Running sums and cross-products of the rows in a moving window, so that the
+    window mean and sample covariance update in O(N^2) per added/dropped row
+    instead of recomputing .cov() over the whole window.
+    """
+
+    def __init__(self, n_assets):
+        self.count = 0
+        self.sums = np.zeros(n_assets)
+        self.cross_products = np.zeros((n_assets, n_assets))
+
+    def add(self, row):
+        self.count += 1
+        self.sums += row
+        self.cross_products += np.outer(row, row)
+
+    def remove(self, row):
+        self.count -= 1
+        self.sums -= row
+        self.cross_products -= np.outer(row, row)
+
+    def reset(self, rows):
+        # Recompute from scratch, used periodically to stop rounding drift from piling up
+        self.count = len(rows)
+        self.sums = rows.sum(axis=0)
+        self.cross_products = rows.T @ rows
+
+    def mean(self):
+        return self.sums / self.count
+
+    def cov(self):
+        # sample covariance (ddof=1), same as DataFrame.cov()
+        mean = self.mean()
+        return (self.cross_products - self.count * np.outer(mean, mean)) / (self.count - 1)
+
+
+def rolling_backtest(simple_returns, window=36, rebalance_every=1, bounds=(-0.08, 0.1), risk_free_rate=0.0193,
+                     method='qp', recompute_every=120, metrics=None):
+    """
+    Walk-forward backtest of the tangency portfolio.
+
+    Every `rebalance_every` periods the max Sharpe portfolio is re-optimized on
+    the last `window` returns and held over the following period. The window
+    moments are updated incrementally (add newest row, drop oldest) and each
+    rebalance is warm-started from the previous weights. A rebalance that fails
+    keeps the previous weights; pass a solver_metrics.SolverMetrics as `metrics`
+    to record every rebalance solve.
+
+    Returns (portfolio_returns, weights): a Series of realized out-of-sample
+    returns and a DataFrame of the weights set at each rebalance date.
+    """
+    data = simple_returns.to_numpy(dtype=np.float64)
+    periods = annualization_factor(simple_returns)
+    n_periods, n_assets = data.shape
+    if n_periods <= window:
+        raise ValueError(f"Need more than {window} periods of returns, got {n_periods}")
+
+    moments = RollingMoments(n_assets)
+    moments.reset(data[:window])
+
+    weights = None
+    rebalance_dates = []
+    weights_history = []
+    realized = []
+
+    for t in range(window, n_periods):
+        # rows t-window .. t-1 are in the window; rebalance before period t
+        if (t - window) % rebalance_every == 0:
+            problem = PortfolioProblem(moments.mean() * periods, moments.cov() * periods, risk_free_rate)
+            cache = factor_cache(problem) if method == 'qp' else None
+            result = max_sharpe_portfolio(problem, bounds, method=method, initial_weights=weights, cache=cache)
+            if metrics is not None:
+                metrics.record('rebalance', result, method, date=simple_returns.index[t])
+            if result.success or weights is None:
+                weights = result.x
+            rebalance_dates.append(simple_returns.index[t])
+            weights_history.append(weights)
+
+        realized.append(weights @ data[t])
+
+        # slide the window forward by one row
+        if (t - window + 1) % recompute_every == 0:
+            moments.reset(data[t - window + 1:t + 1])
+        else:
+            moments.add(data[t])
+            moments.remove(data[t - window])
+
+    portfolio_returns = pd.Series(realized, index=simple_returns.index[window:], name='Portfolio')
+    weights_df = pd.DataFrame(weights_history, index=rebalance_dates, columns=simple_returns.columns)
+    return portfolio_returns, weights_df
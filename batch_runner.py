@@ -0,0 +1,126 @@
+import argparse
+import json
+import os
+import pandas as pd
+
+from concurrent.futures import ProcessPoolExecutor
+from data_loader import load_stock_data
+from optimizers import factor_cache, max_sharpe_portfolio, minimum_variance_portfolio
+from portfolio_functions import PortfolioProblem
+from stock_functions import annualization_factor, compute_returns
+
+# Batch runner for many universes / parameter sets.
+#
+# The manifest is a JSON list of runs, for example
+#   [{"name": "core", "universe": "data/stock_data.csv", "bounds": [-0.08, 0.1],
+#     "risk_free_rate": 0.0193, "frequency": "monthly", "return_kind": "simple"}]
+# Only "universe" is required; the other keys default to the values used by main.py.
+# Results go to a single table with one row per run: status, max Sharpe and MVP
+# metrics, and one "w:<ticker>" column per ticker holding the max Sharpe weights.
+
+# pandas resampling rule for each supported frequency (None keeps the data as
+# downloaded); the annualization factor follows from the resampled dates
+FREQUENCIES = {
+    'daily': None,
+    'weekly': 'W',
+    'monthly': 'ME',
+    'quarterly': 'QE',
+}
+
+DEFAULT_RUN = {
+    'bounds': (-0.08, 0.1),
+    'risk_free_rate': 0.0193,
+    'frequency': 'monthly',
+    'return_kind': 'simple',
+}
+
+
+def load_manifest(file_path):
+    with open(file_path) as f:
+        runs = json.load(f)
+    for i, run in enumerate(runs):
+        if 'universe' not in run:
+            raise ValueError(f"Run {i} in {file_path} has no 'universe'")
+        run.setdefault('name', f"run_{i}")
+    return runs
+
+
+def run_one(run):
+    """
+    Optimize one manifest entry. Errors are reported in the 'status' field
+    instead of raised, so one bad run does not stop the batch.
+    """
+    run = {**DEFAULT_RUN, **run}
+    row = {'name': run['name'], 'universe': run['universe'], 'frequency': run['frequency'],
+           'lower_bound': run['bounds'][0], 'upper_bound': run['bounds'][1],
+           'risk_free_rate': run['risk_free_rate'], 'return_kind': run['return_kind']}
+    try:
+        rule = FREQUENCIES[run['frequency']]
+        prices = load_stock_data(run['universe'])
+        if rule is not None:
+            prices = prices.resample(rule).last()
+        returns = compute_returns(prices, run['return_kind'])
+        periods_per_year = annualization_factor(returns)
+
+        problem = PortfolioProblem(returns.mean().to_numpy() * periods_per_year,
+                                   returns.cov().to_numpy() * periods_per_year,
+                                   run['risk_free_rate'])
+        bounds = tuple(run['bounds'])
+        cache = factor_cache(problem)
+        optimal = max_sharpe_portfolio(problem, bounds=bounds, cache=cache)
+        mvp = minimum_variance_portfolio(problem, bounds=bounds, cache=cache)
+    except Exception as e:
+        row['status'] = f"error: {e!r}"
+        return row
+
+    row['status'] = 'ok' if optimal.success and mvp.success else 'not converged'
+    row['solver'] = '/'.join((optimal.method, mvp.method))  # 'slsqp' where the QP fell back
+    row['solve_time'] = optimal.wall_time + mvp.wall_time
+    row['max_constraint_violation'] = max(optimal.constraint_violation, mvp.constraint_violation)
+    for prefix, weights in (('', optimal.x), ('mvp_', mvp.x)):
+        rets, vols, sharpes = problem.batch_metrics(weights)
+        row[prefix + 'return'] = rets[0]
+        row[prefix + 'volatility'] = vols[0]
+        row[prefix + 'sharpe'] = sharpes[0]
+    for ticker, weight in zip(returns.columns, optimal.x):
+        row[f"w:{ticker}"] = weight
+    return row
+
+
+def write_results(results, file_path):
+    """Write the results table; .parquet needs pyarrow, anything else is written as CSV."""
+    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+    if file_path.endswith('.parquet'):
+        results.to_parquet(file_path, index=False)
+    else:
+        results.to_csv(file_path, index=False)
+
+
+def run_batch(runs, workers=None, output=None):
+    """
+    Run all manifest entries, across a process pool when workers > 1.
+    Returns the results DataFrame in manifest order and writes it to `output`.
+    """
+    if workers is None or workers <= 1:
+        rows = [run_one(run) for run in runs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rows = list(executor.map(run_one, runs))
+
+    results = pd.DataFrame(rows)
+    if output:
+        write_results(results, output)
+        print(f"Saved results for {len(results)} runs to: {output}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run many portfolio optimizations from a manifest")
+    parser.add_argument("manifest", help="JSON file with the list of runs")
+    parser.add_argument("--output", default="batch_results.csv",
+                        help="results file (.csv, or .parquet if pyarrow is installed)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    args = parser.parse_args()
+
+    results = run_batch(load_manifest(args.manifest), workers=args.workers, output=args.output)
+    print(results['status'].value_counts().to_string())
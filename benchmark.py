@@ -0,0 +1,210 @@
+import argparse
+import json
+import os
+import platform
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+from efficient_frontier import generate_efficient_frontier
+from optimizers import max_sharpe_portfolio, minimum_variance_portfolio
+from portfolio_functions import PortfolioProblem
+from stock_functions import covariance_matrix
+
+# Scaling benchmarks for the covariance estimators, the optimizers and the
+# efficient frontier on synthetic universes.
+#
+# Every case is timed over a few repeats (best and mean wall time), then run
+# once more under tracemalloc for the peak memory and the number of objective /
+# gradient evaluations made through the PortfolioProblem. Results are written
+# to a JSON file; pass an earlier file with --compare to flag regressions.
+#
+#   python benchmark.py                          # all sizes, saved to benchmarks/
+#   python benchmark.py --sizes 25 100 --compare benchmarks/baseline.json
+
+SIZES = (25, 100, 500, 2000)
+
+# SLSQP works on dense N x N matrices internally; above this size it takes
+# minutes per solve, so those cases are skipped unless --slsqp-max-assets is raised
+SLSQP_MAX_ASSETS = 500
+
+# Stop repeating a case once its timed runs add up to this many seconds
+# (slow cases are then timed from fewer runs, as asv does)
+MAX_CASE_SECONDS = 30
+
+# PortfolioProblem methods counted as objective evaluations
+EVALUATED_METHODS = ('variance', 'variance_grad', 'neg_sharpe_ratio', 'neg_sharpe_grad', 'batch_metrics')
+
+
+def synthetic_returns(n_assets, n_periods=120, n_factors=5, seed=0):
+    """
+    Monthly returns of a synthetic universe from a factor model: a few common
+    factors plus idiosyncratic noise, with realistic monthly scales.
+    """
+    rng = np.random.default_rng(seed)
+    factors = rng.normal(0.005, 0.04, size=(n_periods, n_factors))
+    loadings = rng.normal(0.0, 0.5, size=(n_factors, n_assets))
+    returns = factors @ loadings + rng.normal(0.006, 0.06, size=(n_periods, n_assets))
+    index = pd.date_range('2010-01-31', periods=n_periods, freq='ME')
+    return pd.DataFrame(returns, index=index, columns=[f"A{i:04d}" for i in range(n_assets)])
+
+
+def bounds_for(n_assets):
+    """Box bounds that scale with the universe; (-0.08, 0.1) for 25 assets as in main.py."""
+    return -2.0 / n_assets, 2.5 / n_assets
+
+
+def _count_evaluations(problem):
+    """Wrap the objective methods of `problem` with call counters."""
+    counts = {'evaluations': 0}
+
+    def counted(method):
+        def wrapper(*args, **kwargs):
+            counts['evaluations'] += 1
+            return method(*args, **kwargs)
+        return wrapper
+
+    for name in EVALUATED_METHODS:
+        setattr(problem, name, counted(getattr(problem, name)))
+    return counts
+
+
+def _cases(n_assets, slsqp_max_assets):
+    """
+    (name, setup) pairs. setup() returns (run, problem): the zero-argument
+    callable to measure and the PortfolioProblem it evaluates (None when the
+    case builds its own or has none).
+    """
+    returns = synthetic_returns(n_assets)
+    bounds = bounds_for(n_assets)
+    # with 120 periods the sample covariance of more than 120 assets is singular,
+    # so the optimizer cases use the (always positive definite) shrinkage estimate
+    cov = covariance_matrix(returns, 'ledoit_wolf')
+
+    def covariance_case(method):
+        return lambda: (lambda: covariance_matrix(returns, method), None)
+
+    def optimizer_case(optimizer, method):
+        def setup():
+            problem = PortfolioProblem.from_returns(returns, cov)
+            return (lambda: optimizer(problem, bounds, method=method)), problem
+        return setup
+
+    cases = [(f"covariance_{method}", covariance_case(method)) for method in ('sample', 'ledoit_wolf', 'factor')]
+    for method in ('qp', 'slsqp'):
+        if method == 'slsqp' and n_assets > slsqp_max_assets:
+            continue
+        cases.append((f"min_variance_{method}", optimizer_case(minimum_variance_portfolio, method)))
+        cases.append((f"max_sharpe_{method}", optimizer_case(max_sharpe_portfolio, method)))
+
+    mvp_weights = minimum_variance_portfolio(PortfolioProblem.from_returns(returns, cov), bounds).x
+    cases.append(('efficient_frontier_qp',
+                  lambda: (lambda: generate_efficient_frontier(returns, cov, mvp_weights, num_points=50,
+                                                               bounds=bounds), None)))
+    return cases
+
+
+def _measure(setup, repeats):
+    """
+    Best and mean wall time over up to `repeats` runs, then one traced run for the
+    peak memory and evaluation count. Returns (best, mean, peak_bytes, evaluations, output).
+    """
+    times = []
+    for _ in range(repeats):
+        run, _ = setup()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+        if sum(times) > MAX_CASE_SECONDS:
+            break
+
+    run, problem = setup()
+    counts = _count_evaluations(problem) if problem is not None else {'evaluations': None}
+    tracemalloc.start()
+    try:
+        output = run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(times), float(np.mean(times)), peak, counts['evaluations'], output
+
+
+def run_benchmarks(sizes=SIZES, repeats=3, slsqp_max_assets=SLSQP_MAX_ASSETS, verbose=True):
+    """Run every case for every universe size and return a list of result dicts."""
+    results = []
+    for n_assets in sizes:
+        for name, setup in _cases(n_assets, slsqp_max_assets):
+            best, mean, peak, evaluations, output = _measure(setup, repeats)
+            row = {
+                'case': name,
+                'n_assets': n_assets,
+                'best_time': best,
+                'mean_time': mean,
+                'peak_memory_mb': peak / 1024 ** 2,
+                'evaluations': evaluations,
+                'nit': int(output.nit) if hasattr(output, 'nit') else None,
+                'success': bool(getattr(output, 'success', True)),
+            }
+            results.append(row)
+            if verbose:
+                print(f"{name:<24} N={n_assets:<5} best {best:8.4f}s  mean {mean:8.4f}s  "
+                      f"peak {row['peak_memory_mb']:8.1f} MB  evals {evaluations}")
+    return results
+
+
+def save_results(results, file_path):
+    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+    payload = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }
+    with open(file_path, 'w') as f:
+        json.dump(payload, f, indent=2)
+    print(f"Saved benchmark results to: {file_path}")
+
+
+def compare_results(results, baseline_path, tolerance=0.2):
+    """
+    Compare best wall times and peak memory with a saved run. Returns the list
+    of (case, n_assets, metric, ratio) that got worse by more than `tolerance`.
+    """
+    with open(baseline_path) as f:
+        baseline = {(r['case'], r['n_assets']): r for r in json.load(f)['results']}
+
+    regressions = []
+    for row in results:
+        old = baseline.get((row['case'], row['n_assets']))
+        if old is None:
+            continue
+        for metric in ('best_time', 'peak_memory_mb'):
+            ratio = row[metric] / old[metric] if old[metric] else np.inf
+            flag = ''
+            if ratio > 1 + tolerance:
+                regressions.append((row['case'], row['n_assets'], metric, ratio))
+                flag = '  REGRESSION'
+            print(f"{row['case']:<24} N={row['n_assets']:<5} {metric:<15} {ratio:6.2f}x{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark covariance estimation, optimizers and frontier")
+    parser.add_argument("--sizes", type=int, nargs='+', default=list(SIZES), help="universe sizes")
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs per case")
+    parser.add_argument("--slsqp-max-assets", type=int, default=SLSQP_MAX_ASSETS,
+                        help="skip SLSQP cases above this many assets")
+    parser.add_argument("--output", default=os.path.join("benchmarks", time.strftime("%Y%m%d-%H%M%S") + ".json"),
+                        help="where to save the results")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before flagging (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.repeats, args.slsqp_max_assets)
+    save_results(results, args.output)
+    if args.compare:
+        regressions = compare_results(results, args.compare, args.tolerance)
+        raise SystemExit(1 if regressions else 0)
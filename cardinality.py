@@ -0,0 +1,199 @@
+import time
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+from scipy.optimize import OptimizeResult
+from group_constraints import GroupConstraints, GroupMembership
+from optimizers import max_sharpe_portfolio, minimum_variance_portfolio
+from portfolio_functions import PortfolioProblem
+
+# Cardinality-constrained portfolios: at most max_assets names held, and every
+# held position at least min_position in absolute size.
+#
+# The search works on supports (the sets of names held). For a fixed support
+# the problem is the ordinary max Sharpe / min variance problem on that
+# sub-universe, solved by optimizers.py. The minimum position size becomes a
+# per-asset bound once the side of each position is known (taken from the
+# solve without it):
+#   long [max(lower, min_position), upper],   short [lower, -min_position]
+# Group limits apply to the sub-universe through the columns of the
+# membership matrices that belong to the support.
+#
+# Supports are improved by local search. The first support holds the largest
+# positions of the unconstrained solution; every round tries swapping each held
+# name for one of the `candidates` most promising names not held (largest
+# objective gradient relative to the held names) and moves to the best swap.
+# At a local optimum a few names of the best support are swapped at random and
+# the descent restarts (iterated local search), until `restarts` restarts in a
+# row fail to improve on the best support or the time budget runs out.
+# The swaps of a round are independent subproblems and run in a process pool
+# when workers > 1. Supports are small, and on a dozen names SLSQP solves the
+# max Sharpe problem in about a millisecond, an order of magnitude faster than
+# the QP frontier search, so it is the default subproblem solver here.
+
+OBJECTIVES = {'sharpe': max_sharpe_portfolio, 'variance': minimum_variance_portfolio}
+
+# Per-process state for subproblem workers, set up once by _init_worker
+_worker = {}
+
+def _init_worker(*settings):
+    _worker['settings'] = settings
+
+def _restrict(group_constraints, index):
+    # the same limits on the memberships of the assets in `index` only
+    if group_constraints is None:
+        return None
+    if isinstance(group_constraints, GroupConstraints):
+        group_constraints = [group_constraints]
+    return [GroupConstraints(GroupMembership(c.membership.matrix[:, index], c.membership.labels, c.membership.name),
+                             c.lower, c.upper) for c in group_constraints]
+
+def _solve_support(support, mean_returns, cov, risk_free_rate, lower, upper, min_position, objective, method,
+                   group_constraints=None):
+    """
+    Best portfolio holding only the assets in `support` (sorted indices).
+    Returns (score, weights on the support, solver method, constraint violation)
+    with score the Sharpe ratio or minus the variance, or None if infeasible.
+    """
+    index = list(support)
+    sub = PortfolioProblem(mean_returns[index], cov[np.ix_(index, index)], risk_free_rate)
+    sub_lower, sub_upper = lower[index], upper[index]
+    sub_groups = _restrict(group_constraints, index)
+    optimizer = OBJECTIVES[objective]
+    result = optimizer(sub, (sub_lower, sub_upper), method=method, group_constraints=sub_groups)
+
+    if result.success and min_position > 0 and np.any(np.abs(result.x) < min_position - 1e-9):
+        long = (result.x >= 0) | (sub_lower > -min_position)
+        sub_lower, sub_upper = (np.where(long, np.maximum(sub_lower, min_position), sub_lower),
+                                np.where(long, sub_upper, -min_position))
+        if np.any(sub_lower > sub_upper):
+            return None
+        result = optimizer(sub, (sub_lower, sub_upper), method=method, group_constraints=sub_groups)
+
+    if not result.success or result.constraint_violation > 1e-6:
+        return None
+    score = sub.sharpe_ratio(result.x) if objective == 'sharpe' else -sub.variance(result.x)
+    return score, result.x, result.method, result.constraint_violation
+
+def _support_task(support):
+    return _solve_support(support, *_worker['settings'])
+
+def cardinality_portfolio(problem, max_assets, min_position=0.0, bounds=(-0.08, 0.1), objective='sharpe',
+                          method='slsqp', time_limit=10.0, candidates=5, restarts=10, seed=0, workers=None,
+                          group_constraints=None):
+    """
+    Max Sharpe (objective='sharpe') or minimum variance (objective='variance')
+    portfolio holding at most max_assets names, each at least min_position in
+    absolute weight, within optional group_constraints. bounds may be scalars
+    or per-asset arrays.
+
+    Returns the best portfolio found within time_limit seconds as an
+    OptimizeResult: status 0 if the search finished, 1 if it ran out of time,
+    2 if no feasible support was found. result.support holds the indices of
+    the names held. With the same seed the result does not depend on
+    `workers`, unless the time limit cuts the search short.
+    """
+    start_time = time.perf_counter()
+    deadline = start_time + time_limit
+    n_assets = problem.n_assets
+    max_assets = min(max_assets, n_assets)
+    lower, upper = (np.broadcast_to(np.asarray(side, dtype=np.float64), (n_assets,)) for side in bounds)
+    if np.sort(upper)[-max_assets:].sum() < 1:
+        raise ValueError(f"{max_assets} names within the upper bounds cannot be fully invested")
+
+    rng = np.random.default_rng(seed)
+    settings = (problem.mean_returns, problem.covariance.to_dense(), problem.risk_free_rate,
+                lower, upper, min_position, objective, method, group_constraints)
+    solved = {}  # support -> _solve_support result (None if infeasible)
+
+    executor = (ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=settings)
+                if workers is not None and workers > 1 else None)
+    batch_size = 1 if executor is None else 2 * workers
+
+    def evaluate(supports, force=False):
+        """Solve the supports not seen before (until the deadline) and return the feasible ones."""
+        new = [support for support in dict.fromkeys(supports) if support not in solved]
+        for i in range(0, len(new), batch_size):
+            if not force and time.perf_counter() > deadline:
+                break
+            batch = new[i:i + batch_size]
+            outcomes = (executor.map(_support_task, batch) if executor is not None
+                        else [_solve_support(support, *settings) for support in batch])
+            solved.update(zip(batch, outcomes))
+        return [(support, solved[support]) for support in supports if solved.get(support) is not None]
+
+    def neighbours(support, weights):
+        held = np.array(support)
+        full = np.zeros(n_assets)
+        full[held] = weights
+        gradient = -problem.neg_sharpe_grad(full) if objective == 'sharpe' else -problem.variance_grad(full)
+        # at the optimum on the support the gradient of every free held name equals
+        # the budget multiplier; names far from it improve the objective most when added
+        outside = np.setdiff1d(np.arange(n_assets), held)
+        gain = gradient[outside] - np.median(gradient[held])
+        gain = np.where(lower[outside] < 0, np.abs(gain), gain)  # names that can be shorted
+        entering = outside[np.argsort(-gain, kind='stable')[:candidates]]
+        moves = [tuple(sorted(set(support) - {i} | {j})) for i in support for j in entering]
+        if len(support) < max_assets:
+            moves += [tuple(sorted(support + (j,))) for j in entering]
+        return moves
+
+    def score(step):
+        return step[1][0]
+
+    try:
+        # full universe: QP
+        relaxed = OBJECTIVES[objective](problem, (lower, upper), group_constraints=group_constraints)
+        first = tuple(sorted(np.argsort(-np.abs(relaxed.x), kind='stable')[:max_assets]))
+        found = evaluate([first], force=True)
+        current = best = found[0] if found else None
+        restart_best = -np.inf
+        stale = rounds = 0
+        finished = False
+
+        while time.perf_counter() < deadline:
+            rounds += 1
+            if current is not None:
+                moves = evaluate(neighbours(current[0], current[1][1]))
+                step = max(moves, key=score, default=None)
+                if step is not None and score(step) > score(current) + 1e-12:
+                    current = step
+                    if score(current) > score(best):
+                        best = current
+                    continue
+
+            # local optimum (or no feasible support yet): restart from a perturbed best support
+            if best is not None and score(best) > restart_best + 1e-12:
+                restart_best, stale = score(best), 0
+            else:
+                stale += 1
+            if stale >= restarts:
+                finished = True
+                break
+            held = np.array(best[0] if best is not None else first)
+            outside = np.setdiff1d(np.arange(n_assets), held)
+            swaps = min(max(1, max_assets // 4), len(held), len(outside))
+            support = tuple(sorted(set(held) - set(rng.choice(held, swaps, replace=False)) |
+                                   set(rng.choice(outside, swaps, replace=False))))
+            found = evaluate([support])
+            current = found[0] if found else None
+            if current is not None and (best is None or score(current) > score(best)):
+                best = current
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    weights = np.zeros(n_assets)
+    if best is None:
+        result = OptimizeResult(x=weights, fun=np.inf, success=False, status=2, support=np.array([], dtype=np.int64),
+                                message='No feasible support found', method=method, constraint_violation=np.inf)
+    else:
+        support, (best_score, support_weights, solver, violation) = best
+        weights[list(support)] = support_weights
+        result = OptimizeResult(x=weights, fun=-best_score, success=True, status=0 if finished else 1,
+                                support=np.array(support), method=solver, constraint_violation=float(violation),
+                                message=('Local search finished' if finished else 'Time limit reached'))
+    result.nit = rounds
+    result.nfev = len(solved)
+    result.wall_time = time.perf_counter() - start_time
+    return result
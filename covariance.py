@@ -0,0 +1,140 @@
+import numpy as np
+import scipy.sparse as sp
+
+from scipy.sparse.linalg import spsolve
+
+# Covariance representations used by portfolio_functions, optimizers and
+# efficient_frontier. All of them expose the same operations:
+#   matvec(w)           S w
+#   quad_form(w)        w'S w
+#   batch_quad_form(W)  w_i'S w_i for every row of an (N_portfolios x N_assets) matrix
+#   solve(rhs)          S^-1 rhs
+#   diagonal(), scaled(c), to_dense(), len(), shape
+# so that the optimizers never need to know how the matrix is stored.
+
+
+class DenseCovariance:
+    """Plain N x N covariance matrix."""
+
+    def __init__(self, matrix, index=None):
+        if index is None and hasattr(matrix, "columns"):
+            index = matrix.columns
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float64)
+        self.index = index
+        self.shape = self.matrix.shape
+
+    def __len__(self):
+        return self.shape[0]
+
+    def matvec(self, weights):
+        return self.matrix @ weights
+
+    def quad_form(self, weights):
+        return weights @ self.matrix @ weights
+
+    def batch_quad_form(self, weights):
+        return np.einsum('ij,ij->i', weights @ self.matrix, weights)
+
+    def solve(self, rhs):
+        return np.linalg.solve(self.matrix, rhs)
+
+    def diagonal(self):
+        return np.diag(self.matrix).copy()
+
+    def scaled(self, factor):
+        return DenseCovariance(self.matrix * factor, self.index)
+
+    def to_dense(self):
+        return self.matrix
+
+
+class LowRankCovariance:
+    """
+    Covariance in factor form  S = B B' + diag(d)  with B the (N x K) factor
+    loadings and d the specific (idiosyncratic) variances.
+
+    Only O(N*K) numbers are stored and w'Sw / S w cost O(N*K), so universes of
+    thousands of assets never need the dense N x N matrix.
+    """
+
+    def __init__(self, loadings, specific_var, index=None):
+        self.loadings = np.ascontiguousarray(loadings, dtype=np.float64)
+        self.specific_var = np.ascontiguousarray(specific_var, dtype=np.float64)
+        self.index = index
+        self.shape = (len(self.specific_var), len(self.specific_var))
+
+    def __len__(self):
+        return len(self.specific_var)
+
+    def matvec(self, weights):
+        return self.loadings @ (self.loadings.T @ weights) + self.specific_var * weights
+
+    def quad_form(self, weights):
+        factor_exposure = self.loadings.T @ weights
+        return factor_exposure @ factor_exposure + self.specific_var @ (weights * weights)
+
+    def batch_quad_form(self, weights):
+        factor_exposure = weights @ self.loadings
+        return np.einsum('ik,ik->i', factor_exposure, factor_exposure) + (weights * weights) @ self.specific_var
+
+    def solve(self, rhs):
+        # Woodbury: S^-1 = D^-1 - D^-1 B (I + B'D^-1 B)^-1 B'D^-1, only a K x K system
+        inv_d = 1 / self.specific_var
+        scaled_rhs = rhs * (inv_d if rhs.ndim == 1 else inv_d[:, None])
+        scaled_loadings = self.loadings * inv_d[:, None]
+        capacitance = np.eye(self.loadings.shape[1]) + self.loadings.T @ scaled_loadings
+        return scaled_rhs - scaled_loadings @ np.linalg.solve(capacitance, self.loadings.T @ scaled_rhs)
+
+    def diagonal(self):
+        return np.einsum('ik,ik->i', self.loadings, self.loadings) + self.specific_var
+
+    def scaled(self, factor):
+        return LowRankCovariance(self.loadings * np.sqrt(factor), self.specific_var * factor, self.index)
+
+    def to_dense(self):
+        return self.loadings @ self.loadings.T + np.diag(self.specific_var)
+
+
+class SparseCovariance:
+    """Covariance stored as a scipy.sparse matrix (e.g. block-diagonal by sector)."""
+
+    def __init__(self, matrix, index=None):
+        self.matrix = sp.csr_matrix(matrix, dtype=np.float64)
+        self.index = index
+        self.shape = self.matrix.shape
+
+    def __len__(self):
+        return self.shape[0]
+
+    def matvec(self, weights):
+        return self.matrix @ weights
+
+    def quad_form(self, weights):
+        return weights @ (self.matrix @ weights)
+
+    def batch_quad_form(self, weights):
+        return np.einsum('ij,ij->i', (self.matrix @ weights.T).T, weights)
+
+    def solve(self, rhs):
+        return spsolve(self.matrix.tocsc(), rhs)
+
+    def diagonal(self):
+        return self.matrix.diagonal()
+
+    def scaled(self, factor):
+        return SparseCovariance(self.matrix * factor, self.index)
+
+    def to_dense(self):
+        return self.matrix.toarray()
+
+
+def as_covariance(cov_matrix):
+    """
+    Wrap an ndarray / DataFrame / scipy.sparse matrix in the matching covariance
+    type; covariance objects are returned unchanged.
+    """
+    if isinstance(cov_matrix, (DenseCovariance, LowRankCovariance, SparseCovariance)):
+        return cov_matrix
+    if sp.issparse(cov_matrix):
+        return SparseCovariance(cov_matrix)
+    return DenseCovariance(cov_matrix)
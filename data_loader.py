@@ -1,11 +1,50 @@
 import pandas as pd
+import numpy as np
+import json
 import os
 
-# Load stock data from CSV file
+# Binary price store: a directory next to the CSV holding
+#   prices.npy   float64 matrix (dates x tickers), column-major so each ticker is contiguous
+#   dates.npy    datetime64[ns] index
+#   tickers.json column names
+# It is memory-mapped on load, so nothing is parsed or copied up front.
+# The CSV is still written by the downloader as an export format.
+
+def store_path_for(file_path):
+    return os.path.splitext(file_path)[0] + "_store"
+
+def save_price_store(df, store_path):
+    os.makedirs(store_path, exist_ok=True)
+    np.save(os.path.join(store_path, "prices.npy"), np.asfortranarray(df.to_numpy(dtype=np.float64)))
+    np.save(os.path.join(store_path, "dates.npy"), pd.DatetimeIndex(df.index).to_numpy(dtype="datetime64[ns]"))
+    with open(os.path.join(store_path, "tickers.json"), "w") as f:
+        json.dump([str(c) for c in df.columns], f)
+
+def load_price_store(store_path):
+    prices = np.load(os.path.join(store_path, "prices.npy"), mmap_mode="r")
+    dates = np.load(os.path.join(store_path, "dates.npy"))
+    with open(os.path.join(store_path, "tickers.json")) as f:
+        tickers = json.load(f)
+
+    # pandas wraps the memory-mapped array directly, without copying it
+    df = pd.DataFrame(prices, index=pd.DatetimeIndex(dates, name="Date"), columns=tickers, copy=False)
+    return df
+
+def _store_is_current(store_path, file_path):
+    prices_path = os.path.join(store_path, "prices.npy")
+    if not os.path.exists(prices_path):
+        return False
+    return not os.path.exists(file_path) or os.path.getmtime(prices_path) >= os.path.getmtime(file_path)
+
+# Load stock data, from the binary store when it is up to date, otherwise from the CSV file
 def load_stock_data(file_path="data/stock_data.csv"):
 
+    store_path = store_path_for(file_path)
+    if _store_is_current(store_path, file_path):
+        return load_price_store(store_path)
+
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"CSV file not found: {file_path}")
-    
+
     df = pd.read_csv(file_path, index_col=0, parse_dates=True)
     return df
@@ -1,63 +1,125 @@
-import yfinance as yf
-import pandas as pd
+import json
 import os
+import pandas as pd
+
+from datetime import datetime
+from data_loader import load_price_store, save_price_store, store_path_for
+from universe import tickers, start_date, end_date, interval, stock_data_path
+
+
+# ---- DATA PROVIDERS ----
+# A provider has fetch(tickers, start, end, interval) returning a DataFrame of
+# adjusted close prices (dates x tickers).
+
+class YFinanceProvider:
+
+    def fetch(self, tickers, start, end, interval):
+        import yfinance as yf  # imported here so that importing this module stays cheap
+
+        data = yf.download(list(tickers), start=start, end=end, auto_adjust=True, interval=interval)
+        adj_close_df = data['Close']  # Extract adjusted close prices
+        if isinstance(adj_close_df, pd.Series):
+            adj_close_df = adj_close_df.to_frame(tickers[0])
+        return adj_close_df
+
+
+class FakeProvider:
+    """
+    Offline provider serving slices of a price DataFrame held in memory.
+    Every request is recorded in `requests` as (tickers, start, end).
+    """
+
+    def __init__(self, prices):
+        self.prices = prices
+        self.requests = []
+
+    def fetch(self, tickers, start, end, interval):
+        self.requests.append((list(tickers), start, end))
+        index = self.prices.index
+        return self.prices.loc[(index >= pd.Timestamp(start)) & (index < pd.Timestamp(end)), list(tickers)]
+
+
+# ---- WATERMARKS ----
+# Last date fetched per ticker, kept next to the price store.
+
+def _watermarks_path(file_path):
+    return os.path.join(store_path_for(file_path), "watermarks.json")
+
+def load_watermarks(file_path=stock_data_path):
+    path = _watermarks_path(file_path)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {ticker: pd.Timestamp(date) for ticker, date in json.load(f).items()}
 
-from datetime import datetime, timedelta
+def _save(adj_close_df, file_path):
+    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+    adj_close_df.to_csv(file_path)
+    save_price_store(adj_close_df, store_path_for(file_path))  # written after the CSV so it counts as current
 
-# ---- TICKER LIST ----
+    watermarks = {ticker: adj_close_df[ticker].last_valid_index() for ticker in adj_close_df.columns}
+    with open(_watermarks_path(file_path), "w") as f:
+        json.dump({t: d.strftime("%Y-%m-%d") for t, d in watermarks.items() if d is not None}, f, indent=2)
 
-tickers = [
-    # --- Technology (Software / Semiconductors) ---
-    'HO.PA',
-    'SYP.DE',
-    'ASML.AS',
-    'SAP.DE',
-    'IFX.DE',
 
-    # --- Consumer & Luxury Goods ---
-    'MC.PA',
-    'RACE.MI',
-    'ITX.MC',
-    'AD.AS',
+def download(tickers=tickers, file_path=stock_data_path, start=start_date, end=end_date, interval=interval,
+             provider=None):
+    """
+    Download the full history of adjusted close prices and save it to the binary
+    price store read by load_stock_data, plus a CSV export.
+    """
+    provider = provider or YFinanceProvider()
+    adj_close_df = provider.fetch(tickers, start, end, interval)
+    _save(adj_close_df, file_path)
 
-    # --- Industrials & Aerospace ---
-    'AIR.PA',
-    'SIE.DE',
-    'SU.PA',
+    print(f"Saved adjusted close prices for {len(tickers)} tickers to: {file_path}")
+    return adj_close_df
 
-    # --- Healthcare ---
-    'SAN.PA',
-    'SHL.DE',
 
-    # --- Financials ---
-    'ALV.DE',
-    'BNP.PA',
-    'INGA.AS',
+def update(tickers=tickers, file_path=stock_data_path, start=start_date, end=None, interval=interval,
+           provider=None):
+    """
+    Incrementally update the local price store.
 
-    # --- Energy & Utilities ---
-    'TTE.PA',
-    'IBE.MC',
-    'ENEL.MI',
-    'EDP.LS',
+    Each ticker is only requested from its watermark (last stored date, refetched
+    so a partial last bar gets corrected) onwards; tickers without a watermark
+    are fetched from `start`. Tickers sharing a start date go in one request.
+    Prices are fetched up to `end`, today by default (download() keeps the
+    fixed universe.end_date so full histories stay reproducible).
+    """
+    provider = provider or YFinanceProvider()
+    end = datetime.today() if end is None else end
+    store_path = store_path_for(file_path)
+    watermarks = load_watermarks(file_path)
+    existing = load_price_store(store_path).copy() if os.path.exists(os.path.join(store_path, "prices.npy")) else None
 
-    # --- Materials & Chemicals ---
-    'BAS.DE',
-    'LIN.DE',
+    # group tickers by the date their missing range starts
+    missing = {}
+    for ticker in tickers:
+        fetch_from = watermarks.get(ticker, pd.Timestamp(start))
+        if fetch_from < pd.Timestamp(end):
+            missing.setdefault(fetch_from, []).append(ticker)
 
-    # --- Telecommunications ---
-    'DTE.DE',
-    'TEF.MC'
-]
+    adj_close_df = existing
+    for fetch_from, group in sorted(missing.items()):
+        new_data = provider.fetch(group, fetch_from, end, interval).dropna(how='all')
+        if new_data.empty:
+            continue
+        # newly fetched values take precedence over the stored ones
+        adj_close_df = new_data if adj_close_df is None else new_data.combine_first(adj_close_df)
 
-# define start and end dates
-end_date = datetime.strptime("2025-01-01", "%Y-%m-%d")
-start_date = datetime.strptime("2020-01-31", "%Y-%m-%d")
+    if adj_close_df is None:
+        print("No price data available.")
+        return None
 
-data = yf.download(tickers, start= start_date, end=end_date, auto_adjust=True, interval="1mo")
+    known = [] if existing is None else list(existing.columns)
+    columns = known + [t for t in adj_close_df.columns if t not in known]
+    adj_close_df = adj_close_df.sort_index()[columns]
+    _save(adj_close_df, file_path)
 
-adj_close_df = data['Close']  # Extract adjusted close prices
+    print(f"Updated {sum(len(g) for g in missing.values())} tickers in {len(missing)} request(s): {file_path}")
+    return adj_close_df
 
-file_path = 'data/stock_data.csv'
-adj_close_df.to_csv(file_path)
 
-print(f"Saved adjusted close prices for {len(tickers)} tickers to: {file_path}")
+if __name__ == "__main__":
+    update()
@@ -1,52 +1,191 @@
 import numpy as np
 
-from scipy.optimize import minimize
-from portfolio_functions import expected_returns, standard_deviation, portfolio_variance
-from download_data import tickers
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from covariance import DenseCovariance, as_covariance
+from portfolio_functions import PortfolioProblem
+from solver_metrics import solve_record
+from group_constraints import group_violation
+from optimizers import efficient_portfolio, factor_cache, max_feasible_return
 
-def generate_efficient_frontier(returns, cov_matrix, mvp_weights, num_points=200):
+def two_fund_weights(target_returns, mean_returns, cov_matrix):
+    """
+    Closed-form frontier weights when only the budget constraint is active.
+    Every frontier portfolio is a combination of two funds, w = g + h * target,
+    so all targets are solved with a single pair of linear solves.
+    cov_matrix may be any covariance.* object (a factor model solves via Woodbury).
+    Returns an array of shape (len(target_returns), n_assets).
+    """
+    ones = np.ones(len(mean_returns))
+    inv_ones, inv_mu = as_covariance(cov_matrix).solve(np.column_stack([ones, mean_returns])).T
+
+    a = ones @ inv_ones
+    b = ones @ inv_mu
+    c = mean_returns @ inv_mu
+    d = a * c - b ** 2
+
+    g = (c * inv_ones - b * inv_mu) / d
+    h = (a * inv_mu - b * inv_ones) / d
+    return g + np.outer(target_returns, h)
+
+# Per-process state for parallel frontier workers, set up once by _init_worker
+_worker = {}
+
+def _init_worker(shm_name, n_assets, mean_returns, risk_free_rate, method, covariance=None):
+    """
+    Attach to the covariance matrix in shared memory and build the problem and
+    factor cache once per worker process. Compact (factor / sparse) covariances
+    are passed directly as `covariance` instead of through shared memory.
+    """
+    if covariance is None:
+        shm = shared_memory.SharedMemory(name=shm_name)
+        covariance = np.ndarray((n_assets, n_assets), dtype=np.float64, buffer=shm.buf)
+        _worker['shm'] = shm  # keep the mapping alive for the life of the worker
+    problem = PortfolioProblem(mean_returns, covariance, risk_free_rate)
+    _worker['problem'] = problem
+    _worker['cache'] = factor_cache(problem) if method == 'qp' else None
+
+def _solve_targets(problem, targets, start_weights, bounds, method, group_constraints, cache):
+    """
+    Solve a run of frontier points in order, warm-starting each from the previous one.
+    Returns the volatilities, NaN where the solver failed, and a solve record
+    per point (see solver_metrics.solve_record).
+    """
+    vols = np.full(len(targets), np.nan)
+    records = []
+    previous_weights = start_weights
+    for k, target_return in enumerate(targets):
+        result = efficient_portfolio(problem, target_return, bounds, method=method,
+                                     initial_weights=previous_weights, cache=cache,
+                                     group_constraints=group_constraints)
+        records.append(solve_record('frontier_point', result, method, target_return=float(target_return)))
+        if result.success:
+            previous_weights = result.x
+            vols[k] = problem.standard_deviation(result.x)
+    return vols, records
+
+def _admissible(weights, bounds, group_constraints):
+    """Rows of `weights` inside the box bounds and the group limits."""
+    lower, upper = bounds
+    inside = np.all((weights >= lower - 1e-12) & (weights <= upper + 1e-12), axis=1)
+    if group_constraints is not None:
+        inside &= group_violation(group_constraints, weights) <= 1e-12
+    return inside
+
+def frontier_weights(problem, target_returns, bounds=(-0.08, 0.1), method='qp', cache=None, group_constraints=None):
+    """
+    Frontier weights for each target return, in one process: two-fund weights
+    where they respect the bounds, otherwise a solve warm-started from the
+    previous point. Rows are NaN where the solver failed.
+    Returns an array of shape (len(target_returns), n_assets).
+    """
+    lower, upper = bounds
+    weights = two_fund_weights(target_returns, problem.mean_returns, problem.covariance)
+    inside_bounds = _admissible(weights, bounds, group_constraints)
+    if inside_bounds.all():
+        return weights
+
+    if method == 'qp':
+        cache = factor_cache(problem, cache)
+    previous_weights = None
+    for k in np.flatnonzero(~inside_bounds):
+        if previous_weights is None:
+            previous_weights = np.clip(weights[k], lower, upper)
+        result = efficient_portfolio(problem, target_returns[k], bounds, method=method,
+                                     initial_weights=previous_weights, cache=cache,
+                                     group_constraints=group_constraints)
+        if result.success:
+            weights[k] = previous_weights = result.x
+        else:
+            weights[k] = np.nan
+    return weights
+
+def _solve_chunk(args):
+    return _solve_targets(_worker['problem'], *args, cache=_worker['cache'])
+
+def generate_efficient_frontier(returns, cov_matrix, mvp_weights, num_points=200, bounds=(-0.08, 0.1), method='qp',
+                                workers=None, metrics=None, group_constraints=None):
     """
     Generate points on the efficient frontier by varying target returns.
     Returns arrays of volatilities and returns for plotting.
+
+    Points whose two-fund solution already respects the bounds are taken as is;
+    the remaining ones are solved with `method` ('qp' active-set solver or
+    'slsqp'), warm-started from the previous point.
+
+    With workers > 1 the points to solve are split into contiguous chunks and
+    solved in a process pool. The covariance matrix is placed in shared memory
+    once instead of being pickled per task, and the output order is the same as
+    in the sequential case. Factor and sparse covariances are small enough to
+    be sent to the workers as they are.
+
+    Pass a solver_metrics.SolverMetrics as `metrics` to record every solved
+    point, including the ones that failed and are left out of the result.
+    group_constraints (see group_constraints.py) limits sector / industry /
+    country exposures of every frontier portfolio.
     """
+    lower, upper = bounds
+
+    # Work on plain arrays so no pandas reduction happens inside the solver loop
+    problem = PortfolioProblem.from_returns(returns, cov_matrix)
+    mean_returns = problem.mean_returns
+
     # Get range of possible returns - start from MVP return to max individual stock return
-    mvp_return = expected_returns(mvp_weights, returns)
-    
+    mvp_return = mean_returns @ mvp_weights
+
     # Find maximum return among all individual stocks
-    max_return = max([expected_returns(np.eye(len(tickers))[i], returns) for i in range(len(tickers))])
-    
+    max_return = mean_returns.max()
+
     # Extend the range to ensure frontier goes beyond tangent portfolio
     extended_max = max_return * 1.1
-    
+
     # Generate target returns starting from MVP return
     target_returns = np.linspace(mvp_return, extended_max, num_points)
-    
-    efficient_vols = []
-    efficient_returns = []
-    
-    bounds = tuple((-0.08, 0.1) for _ in range(len(tickers)))
-    
-    # Constraints: sum of weights = 1, and target return
-    for target_return in target_returns:
-        constraints = (
-            {'type': 'eq', 'fun': lambda w: np.sum(w) - 1},
-            {'type': 'eq', 'fun': lambda w: expected_returns(w, returns) - target_return}
-        )
-        
-        initial_weights = np.array([1/len(tickers)] * len(tickers))
-        
+
+    # Targets above the best attainable return have no solution, skip them up front
+    target_returns = target_returns[target_returns <= max_feasible_return(mean_returns, bounds, group_constraints) + 1e-12]
+
+    closed_form = two_fund_weights(target_returns, mean_returns, problem.covariance)
+    inside_bounds = _admissible(closed_form, bounds, group_constraints)
+
+    efficient_vols = np.full(len(target_returns), np.nan)
+    efficient_vols[inside_bounds] = problem.batch_metrics(closed_form[inside_bounds])[1]
+
+    to_solve = np.flatnonzero(~inside_bounds)
+    if workers is None or workers <= 1 or len(to_solve) < 2 * workers:
+        chunks = [to_solve] if len(to_solve) else []
+    else:
+        chunks = np.array_split(to_solve, min(len(to_solve), 4 * workers))
+
+    # Each chunk starts from its first point's two-fund solution clipped to the bounds
+    tasks = [(target_returns[chunk], np.clip(closed_form[chunk[0]], lower, upper), bounds, method, group_constraints)
+             for chunk in chunks]
+
+    if len(tasks) <= 1:
+        cache = factor_cache(problem) if method == 'qp' else None
+        chunk_results = [_solve_targets(problem, *task, cache=cache) for task in tasks]
+    elif not isinstance(problem.covariance, DenseCovariance):
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(None, problem.n_assets, mean_returns,
+                                           problem.risk_free_rate, method, problem.covariance)) as executor:
+            chunk_results = list(executor.map(_solve_chunk, tasks))
+    else:
+        cov = problem.covariance.matrix
+        shm = shared_memory.SharedMemory(create=True, size=cov.nbytes)
         try:
-            result = minimize(portfolio_variance, initial_weights,
-                            args=(cov_matrix,),
-                            method='SLSQP',
-                            constraints=constraints,
-                            bounds=bounds)  
-            
-            if result.success:
-                vol = standard_deviation(result.x, cov_matrix)
-                efficient_vols.append(vol)
-                efficient_returns.append(target_return)
-        except:
-            continue
-    
-    return np.array(efficient_returns), np.array(efficient_vols)
\ No newline at end of file
+            np.ndarray(cov.shape, dtype=np.float64, buffer=shm.buf)[:] = cov
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(shm.name, problem.n_assets, mean_returns,
+                                               problem.risk_free_rate, method)) as executor:
+                chunk_results = list(executor.map(_solve_chunk, tasks))  # map keeps the chunk order
+        finally:
+            shm.close()
+            shm.unlink()
+
+    for chunk, (vols, records) in zip(chunks, chunk_results):
+        efficient_vols[chunk] = vols
+        if metrics is not None:
+            metrics.add(*records)
+
+    solved = ~np.isnan(efficient_vols)
+    return target_returns[solved], efficient_vols[solved]
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+# Sector / industry / country exposure limits.
+# A GroupMembership is a sparse (n_groups x n_assets) 0/1 matrix built once
+# from the security master (security_master.py), so the exposure
+# of every group is a single sparse product G @ w. The same matrix serves the
+# optimizers (linear inequality constraints with constant Jacobian G) and the
+# charts (aggregating weights per group).
+
+
+class GroupMembership:
+    """Which asset belongs to which group, as a sparse (n_groups x n_assets) matrix."""
+
+    def __init__(self, matrix, labels, name=None):
+        self.matrix = sp.csr_matrix(matrix, dtype=np.float64)
+        self.labels = pd.Index(labels, name=name)
+        self.name = name
+
+    @classmethod
+    def from_metadata(cls, metadata, tickers, column, ticker_column='Ticker'):
+        """
+        Membership of `tickers` (in optimizer order) in the groups of
+        metadata[column]. metadata is indexed by ticker (as from
+        security_master) or has a `ticker_column`. Tickers missing from the
+        metadata belong to no group.
+        """
+        if ticker_column in metadata.columns:
+            metadata = metadata.set_index(ticker_column)
+        groups = metadata[column].reindex(tickers)
+        categories = pd.Categorical(groups).remove_unused_categories()
+        assets = np.flatnonzero(categories.codes >= 0)
+        matrix = sp.csr_matrix((np.ones(len(assets)), (categories.codes[assets], assets)),
+                               shape=(len(categories.categories), len(tickers)))
+        return cls(matrix, categories.categories, name=column)
+
+    def exposures(self, weights):
+        """Group exposures: (n_groups,) for one weight vector, (n_portfolios, n_groups) for a batch."""
+        weights = np.asarray(weights, dtype=np.float64)
+        return (self.matrix @ weights.T).T
+
+    def aggregate(self, weights):
+        """Group exposures of one weight vector as a Series indexed by group label."""
+        return pd.Series(self.exposures(weights), index=self.labels, name='Weight')
+
+
+class GroupConstraints:
+    """
+    Lower and/or upper limits on the exposures of a GroupMembership.
+
+    lower / upper are a scalar applied to every group, a dict {label: limit}
+    for some groups, or None for no limit on that side.
+    """
+
+    def __init__(self, membership, lower=None, upper=None):
+        self.membership = membership
+        self.lower = self._limits(lower, -np.inf)
+        self.upper = self._limits(upper, np.inf)
+
+    def _limits(self, limits, default):
+        values = np.full(len(self.membership.labels), default)
+        if isinstance(limits, dict):
+            for label, limit in limits.items():
+                values[self.membership.labels.get_loc(label)] = limit
+        elif limits is not None:
+            values[:] = limits
+        return values
+
+
+def group_inequalities(group_constraints):
+    """
+    Stack one or more GroupConstraints into A_ub w <= b_ub (sparse A_ub).
+    Returns None when there are no finite limits.
+    """
+    if group_constraints is None:
+        return None
+    if isinstance(group_constraints, GroupConstraints):
+        group_constraints = [group_constraints]
+
+    blocks, limits = [], []
+    for constraint in group_constraints:
+        matrix = constraint.membership.matrix
+        upper = np.isfinite(constraint.upper)
+        lower = np.isfinite(constraint.lower)
+        blocks += [matrix[upper], -matrix[lower]]
+        limits += [constraint.upper[upper], -constraint.lower[lower]]
+
+    b_ub = np.concatenate(limits)
+    if not len(b_ub):
+        return None
+    return sp.vstack(blocks, format='csr'), b_ub
+
+
+def group_violation(group_constraints, weights):
+    """Largest violation over one or more GroupConstraints (0 for None)."""
+    inequalities = group_inequalities(group_constraints)
+    if inequalities is None:
+        return np.zeros(np.shape(weights)[:-1]) if np.ndim(weights) > 1 else 0.0
+    A_ub, b_ub = inequalities
+    excess = (A_ub @ np.asarray(weights).T).T - b_ub
+    return np.maximum(excess.max(axis=-1), 0.0)
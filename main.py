@@ -1,51 +1,92 @@
 import numpy as np
-from scipy.optimize import minimize
-import matplotlib.pyplot as plt
 import pandas as pd
 
 from data_loader import load_stock_data
-from stock_functions import simple_returns, covariance_matrix
-from portfolio_functions import neg_sharpe_ratio
-from download_data import tickers
-from portfolio_functions import standard_deviation, expected_returns, sharpe_ratio, portfolio_variance
+from stock_functions import annualization_factor, compute_returns, covariance_matrix
+from portfolio_functions import PortfolioProblem
+from optimizers import (factor_cache, max_sharpe_portfolio, minimum_variance_portfolio, rebalance_portfolio,
+                        robust_portfolio)
+from cardinality import cardinality_portfolio
 from efficient_frontier import generate_efficient_frontier
-from plot_functions import plot_portfolio_weights, prepare_portfolio_data, plot_industry_weights, plot_sector_weights
+from optimizer_cache import ResultCache
+from group_constraints import GroupConstraints, GroupMembership
+from solver_metrics import SolverMetrics
+from random_portfolios import random_portfolio_cloud
+from resampled_frontier import resampled_efficient_frontier
+from scenario_risk import min_cvar_portfolio
+from security_master import security_metadata
+from plot_functions import (plot_efficient_frontier, plot_portfolio_weights,
+                            plot_industry_weights, plot_sector_weights)
+from report_renderer import render_charts
 
-def main():
+def main(plots=True, chart_workers=0, cloud_samples=1_000_000, resamples=0, workers=None, return_kind='simple',
+         metrics_log=None, max_sector_weight=None, min_country_weight=None, current_weights_path=None,
+         linear_cost=0.0, quadratic_cost=0.0, max_turnover=None, max_names=None, min_position=0.0,
+         time_limit=10.0, cvar_beta=None, robust_kappa=None, risk_aversion=2.0):
     adj_close_df = load_stock_data("data/stock_data.csv")
-    returns = simple_returns(adj_close_df)
+    tickers = list(adj_close_df.columns)  # ticker order follows the CSV columns
+    returns = compute_returns(adj_close_df, kind=return_kind)  # annualized by the data's own frequency
     cov_matrix = covariance_matrix(returns)
     
-    # Constraints: sum of weights = 1
-    constraints = ({'type': 'eq', 'fun': lambda weights: np.sum(weights) - 1})
-
     #Bondaries for weights: between -8% and 10%
-    bounds = tuple((-0.08, 0.1) for _ in range(len(tickers)))
-    
-    # Set initial weights
-    initial_weights = np.array([1/len(tickers)] * len(tickers))
-    
-    # Optimize weights to maximize Sharpe ratio
-    optimized_results = minimize(neg_sharpe_ratio, initial_weights,
-                                args=(returns, cov_matrix),
-                                method='SLSQP',
-                                constraints=constraints,
-                                bounds=bounds)
-    optimal_weights = optimized_results.x
-    
-    # Find MVP
-    mvp_result = minimize(portfolio_variance,
-                         initial_weights,
-                         args=(cov_matrix,),
-                         method='SLSQP',
-                         constraints=constraints,
-                         bounds=bounds)
-    mvp_weights = mvp_result.x
+    bounds = (-0.08, 0.1)
+
+    # Sector / industry / country membership matrices, built once and shared by
+    # the exposure limits and the charts
+    metadata = security_metadata(tickers)  # aligned to the CSV column order
+    memberships = {column: GroupMembership.from_metadata(metadata, tickers, column)
+                   for column in ('Sector', 'Industry', 'Country')}
+    group_constraints = []
+    if max_sector_weight is not None:
+        group_constraints.append(GroupConstraints(memberships['Sector'], upper=max_sector_weight))
+    if min_country_weight is not None:
+        group_constraints.append(GroupConstraints(memberships['Country'], lower=min_country_weight))
+    group_constraints = group_constraints or None
+
+    # Both optimizations are box-constrained QPs with a budget constraint, solved
+    # by the active-set solver (SLSQP is used as a fallback)
+    problem = PortfolioProblem.from_returns(returns, cov_matrix)
+
+    # Results are cached on disk by a hash of the inputs, so re-running with
+    # unchanged data skips the solves entirely. The group limits enter the key
+    # with the memberships they apply to, so editing security_master.csv
+    # invalidates the cached solves
+    result_cache = ResultCache()
+    solver_inputs = (returns, annualization_factor(returns), tickers, bounds, problem.risk_free_rate, 'qp')
+    for constraint in group_constraints or []:
+        membership = constraint.membership
+        solver_inputs += (membership.name, list(membership.labels), membership.matrix.toarray(),
+                          constraint.lower, constraint.upper)
+
+    # Wall time, iterations, status and constraint violation of every solve
+    # (only solves that actually ran, cached results are not re-solved)
+    metrics = SolverMetrics(log_path=metrics_log)
+
+    def solve_portfolios():
+        cache = factor_cache(problem)
+        # Optimize weights to maximize Sharpe ratio
+        optimal = max_sharpe_portfolio(problem, bounds=bounds, cache=cache, group_constraints=group_constraints)
+        # Find MVP
+        mvp = minimum_variance_portfolio(problem, bounds=bounds, cache=cache, group_constraints=group_constraints)
+        outcome = {'optimal_weights': optimal.x, 'mvp_weights': mvp.x}
+        for name, result in (('max_sharpe', optimal), ('min_variance', mvp)):
+            record = metrics.record(name, result, 'qp')
+            outcome[f'{name}_success'], outcome[f'{name}_message'] = record['success'], record['message']
+        return outcome
+
+    # The solve status is cached with the weights, so a failed solve is reported
+    # again when its cached result is reused
+    portfolios = result_cache.get_or_compute('portfolios', solver_inputs, solve_portfolios)
+    for name in ('max_sharpe', 'min_variance'):
+        if not portfolios[f'{name}_success']:
+            print(f"Warning: {name} optimization did not converge: {portfolios[f'{name}_message']}")
+    optimal_weights = portfolios['optimal_weights']
+    mvp_weights = portfolios['mvp_weights']
     
     # Calculate MVP metrics
-    mvp_return = expected_returns(mvp_weights, returns)
-    mvp_volatility = standard_deviation(mvp_weights, cov_matrix)
-    mvp_sharpe = sharpe_ratio(mvp_weights, returns, cov_matrix)
+    mvp_return = problem.expected_return(mvp_weights)
+    mvp_volatility = problem.standard_deviation(mvp_weights)
+    mvp_sharpe = problem.sharpe_ratio(mvp_weights)
     
     # Print optimal portfolio values
     print("Optimal Weights (Max Sharpe Ratio):")
@@ -53,9 +94,9 @@ def main():
         print(f"{ticker}: {weight:.4f}")
     print()
     
-    optimal_portfolio_return = expected_returns(optimal_weights, returns)
-    optimal_portfolio_volatility = standard_deviation(optimal_weights, cov_matrix)
-    optimal_sharpe_ratio = sharpe_ratio(optimal_weights, returns, cov_matrix)
+    optimal_portfolio_return = problem.expected_return(optimal_weights)
+    optimal_portfolio_volatility = problem.standard_deviation(optimal_weights)
+    optimal_sharpe_ratio = problem.sharpe_ratio(optimal_weights)
     
     print(f"Portfolio Expected Return: {optimal_portfolio_return:.4f}")
     print(f"Portfolio Volatility: {optimal_portfolio_volatility:.4f}")
@@ -69,61 +110,161 @@ def main():
     print(f"\nMVP Expected Return: {mvp_return:.4f}")
     print(f"MVP Volatility: {mvp_volatility:.4f}")
     print(f"MVP Sharpe Ratio: {mvp_sharpe:.4f}")
-    
+
+    # Rebalancing: trade from the current holdings towards max Sharpe, net of costs
+    if current_weights_path is not None:
+        current = pd.read_csv(current_weights_path, index_col=0).iloc[:, 0].reindex(tickers).fillna(0.0)
+        rebalanced = rebalance_portfolio(problem, current.to_numpy(), bounds=bounds, linear_cost=linear_cost,
+                                         quadratic_cost=quadratic_cost, max_turnover=max_turnover,
+                                         group_constraints=group_constraints)
+        record = metrics.record('rebalance', rebalanced, 'slsqp')
+        if not record['success']:
+            print(f"Warning: rebalance optimization did not converge: {record['message']}")
+        print("\nRebalance from current holdings:")
+        for ticker, weight, trade in zip(tickers, rebalanced.x, rebalanced.trades):
+            if abs(trade) > 1e-6:
+                print(f"{ticker}: {trade:+.4f} -> {weight:.4f}")
+        print(f"Turnover: {rebalanced.turnover:.4f}, cost: {rebalanced.cost:.4f}, "
+              f"Sharpe {problem.sharpe_ratio(current.to_numpy()):.4f} -> {problem.sharpe_ratio(rebalanced.x):.4f}")
+
+    # Max Sharpe portfolio holding at most max_names tickers
+    if max_names is not None:
+        limited = cardinality_portfolio(problem, max_names, min_position=min_position, bounds=bounds,
+                                        time_limit=time_limit, workers=workers, group_constraints=group_constraints)
+        metrics.record('cardinality', limited, 'slsqp', max_names=max_names)
+        print(f"\nMax Sharpe Portfolio with at most {max_names} names ({limited.message.lower()}):")
+        for i in limited.support:
+            print(f"{tickers[i]}: {limited.x[i]:.4f}")
+        print(f"Sharpe Ratio: {problem.sharpe_ratio(limited.x):.4f} "
+              f"(unconstrained {optimal_sharpe_ratio:.4f}), {limited.nfev} supports tried")
+
+    # Minimum expected shortfall on the historical returns (one scenario per period).
+    # Portfolio returns are w'r only for simple returns, so the scenarios are
+    # simple returns whatever --returns says
+    if cvar_beta is not None:
+        scenarios = compute_returns(adj_close_df, kind='simple', dtype=np.float32)
+        tail = min_cvar_portfolio(scenarios, bounds=bounds, beta=cvar_beta, group_constraints=group_constraints)
+        metrics.record('min_cvar', tail, 'lp', beta=cvar_beta)
+        print(f"\nMinimum CVaR Portfolio ({cvar_beta:.0%} per-period expected shortfall):")
+        for ticker, weight in zip(tickers, tail.x):
+            print(f"{ticker}: {weight:.4f}")
+        print(f"CVaR: {tail.fun:.4f}, VaR: {tail.var:.4f}, Sharpe Ratio: {problem.sharpe_ratio(tail.x):.4f}")
+
+    # Mean-variance with the expected returns known up to their standard errors
+    if robust_kappa is not None:
+        years = len(returns) / annualization_factor(returns)
+        robust = robust_portfolio(problem, risk_aversion=risk_aversion, kappa=robust_kappa,
+                                  uncertainty=problem.covariance.diagonal() / years, bounds=bounds,
+                                  group_constraints=group_constraints)
+        metrics.record('robust', robust, 'slsqp', kappa=robust_kappa)
+        print(f"\nRobust Mean-Variance Portfolio (kappa {robust_kappa}, risk aversion {risk_aversion}):")
+        for ticker, weight in zip(tickers, robust.x):
+            print(f"{ticker}: {weight:.4f}")
+        print(f"Worst-case Return: {robust.worst_case_return:.4f}, Expected Return: {problem.expected_return(robust.x):.4f}, "
+              f"Volatility: {problem.standard_deviation(robust.x):.4f}")
+
+    if not plots:
+        if len(metrics):
+            print("\n" + metrics.report())
+        return
+
     # Generate and plot efficient frontier
     print("\nGenerating efficient frontier...")
-    eff_returns, eff_vols = generate_efficient_frontier(returns, cov_matrix, mvp_weights, num_points=200)
+    frontier = result_cache.get_or_compute(
+        'frontier', solver_inputs + (200,),
+        lambda: dict(zip(('returns', 'vols'),
+                         generate_efficient_frontier(returns, cov_matrix, mvp_weights, num_points=200, bounds=bounds,
+                                                     metrics=metrics, group_constraints=group_constraints))))
+    eff_returns, eff_vols = frontier['returns'], frontier['vols']
     
-    # Risk-free rate
-    risk_free_rate = 0.0193
+    if len(metrics):
+        print(metrics.report())
 
-    plt.figure(figsize=(10, 7))
-    
-    # Plot efficient frontier
-    plt.plot(eff_vols, eff_returns, 'b-', linewidth=2, label='Efficient Frontier')
-    
-    # Plot optimal portfolio (max Sharpe ratio)
-    plt.plot(optimal_portfolio_volatility, optimal_portfolio_return, 'g*', 
-             markersize=20, label='Optimal Portfolio (Max Sharpe)')
-    
-    # Plot MVP
-    plt.plot(mvp_volatility, mvp_return, 'r*', 
-             markersize=20, label='Minimum Variance Portfolio')
-    
-    # Plot risk-free asset
-    plt.plot(0, risk_free_rate, 'ko', markersize=10, label=f'Risk-Free Asset ({risk_free_rate:.2%})')
-    
-    # Plot Capital Market Line (CML) - line through risk-free rate and tangent portfolio
-    max_x = max(eff_vols.max(), optimal_portfolio_volatility) * 1.1
-    cml_x = np.array([0, max_x])
-    cml_y = risk_free_rate + (optimal_portfolio_return - risk_free_rate) / optimal_portfolio_volatility * cml_x
-    plt.plot(cml_x, cml_y, 'g--', linewidth=2, alpha=0.7, label='Capital Market Line (CML)')
-    
-    # Plot individual stocks
-    for i, ticker in enumerate(tickers):
-        stock_return = expected_returns(np.eye(len(tickers))[i], returns)
-        stock_vol = standard_deviation(np.eye(len(tickers))[i], cov_matrix)
-        plt.plot(stock_vol, stock_return, 'o', markersize=8, alpha=0.6)
-        plt.annotate(ticker, (stock_vol, stock_return), 
-                    xytext=(5, 5), textcoords='offset points', fontsize=9)
-    
-    plt.xlabel('Volatility (Standard Deviation)', fontsize=12)
-    plt.ylabel('Expected Return', fontsize=12)
-    plt.title('Efficient Frontier with Capital Market Line', fontsize=14, fontweight='bold')
-    plt.legend(fontsize=10)
-    plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    
-    # create a file to display the chart
-    file_path = 'efficient_frontier.png'
-    print(f"Saving plot to: {file_path}")
-    plt.savefig(file_path, dpi = 300, bbox_inches = 'tight')
+    # Random portfolios behind the frontier, streamed into a histogram
+    cloud = None
+    if cloud_samples > 0:
+        def sample_cloud():
+            result = random_portfolio_cloud(problem, cloud_samples, bounds=bounds, seed=0)
+            return {'counts': result.counts, 'vol_edges': result.vol_edges, 'return_edges': result.return_edges}
 
+        cloud = result_cache.get_or_compute('cloud', solver_inputs + (cloud_samples, 0), sample_cloud)
+        cloud = (cloud['counts'], cloud['vol_edges'], cloud['return_edges'])
 
-    plot_portfolio_weights(optimal_weights, tickers, 'optimal_weights.png')
-    portfolioo_df = prepare_portfolio_data()
-    plot_industry_weights(optimal_weights, tickers, portfolioo_df, 'industry_weights.png')
-    plot_sector_weights(optimal_weights, tickers, portfolioo_df, 'sector_weights.png')
+    # Resampled (Michaud) frontier, averaged over bootstrap samples of the returns
+    resampled = None
+    if resamples > 0:
+        print(f"Resampling the frontier {resamples} times...")
+        resampled = result_cache.get_or_compute(
+            'resampled', solver_inputs + (100, resamples, 0),
+            lambda: dict(zip(('returns', 'vols', 'weights'),
+                             resampled_efficient_frontier(returns, num_points=100, n_resamples=resamples,
+                                                          bounds=bounds, seed=0, workers=workers))))
+        resampled = (resampled['vols'], resampled['returns'])
+
+    # Individual stocks (each stock is the portfolio holding only that stock)
+    stock_returns, stock_vols, _ = problem.batch_metrics(np.eye(len(tickers)))
+
+    # The report charts are independent of each other, render them in parallel
+    render_charts([
+        (plot_efficient_frontier,
+         (eff_vols, eff_returns,
+          (optimal_portfolio_volatility, optimal_portfolio_return), (mvp_volatility, mvp_return),
+          problem.risk_free_rate, stock_vols, stock_returns, tickers, 'efficient_frontier.png'), {'cloud': cloud, 'resampled': resampled}),
+        (plot_portfolio_weights, (optimal_weights, tickers, 'optimal_weights.png'), {}),
+        (plot_industry_weights, (optimal_weights, tickers, metadata.reset_index(), 'industry_weights.png'),
+         {'membership': memberships['Industry']}),
+        (plot_sector_weights, (optimal_weights, tickers, metadata.reset_index(), 'sector_weights.png'),
+         {'membership': memberships['Sector']}),
+    ], workers=chart_workers)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description="Markowitz portfolio optimization")
+    parser.add_argument("--no-plots", action="store_true",
+                        help="only print the optimal and MVP portfolios, skip the frontier and charts")
+    parser.add_argument("--chart-workers", type=int, default=0,
+                        help="processes used to render charts (0 = one per CPU, 1 = no pool)")
+    parser.add_argument("--cloud-samples", type=int, default=1_000_000,
+                        help="random portfolios drawn behind the frontier (0 = none)")
+    parser.add_argument("--resamples", type=int, default=0,
+                        help="bootstrap resamples for the resampled frontier (0 = skip it)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes used for resampling (default: one per CPU)")
+    parser.add_argument("--returns", choices=("simple", "log"), default="simple",
+                        help="return type used for the means and covariance")
+    parser.add_argument("--metrics-log", default=None,
+                        help="append a JSON line per optimizer solve to this file")
+    parser.add_argument("--max-sector-weight", type=float, default=None,
+                        help="cap on the net weight of every sector, e.g. 0.25")
+    parser.add_argument("--min-country-weight", type=float, default=None,
+                        help="floor on the net weight of every country, e.g. 0.05")
+    parser.add_argument("--current-weights", default=None,
+                        help="CSV of current holdings (ticker, weight); prints the cost-aware rebalance")
+    parser.add_argument("--linear-cost", type=float, default=0.0,
+                        help="linear transaction cost per unit of weight traded")
+    parser.add_argument("--quadratic-cost", type=float, default=0.0,
+                        help="quadratic transaction cost (market impact) on each trade")
+    parser.add_argument("--max-turnover", type=float, default=None,
+                        help="limit on the total weight traded (sum of buys and sells)")
+    parser.add_argument("--max-names", type=int, default=None,
+                        help="also print the max Sharpe portfolio holding at most this many tickers")
+    parser.add_argument("--min-position", type=float, default=0.0,
+                        help="smallest absolute weight of a held ticker with --max-names")
+    parser.add_argument("--time-limit", type=float, default=10.0,
+                        help="seconds allowed for the --max-names search")
+    parser.add_argument("--cvar", type=float, default=None, metavar="BETA",
+                        help="also print the minimum CVaR portfolio at this confidence, e.g. 0.95")
+    parser.add_argument("--robust-kappa", type=float, default=None,
+                        help="also print the robust mean-variance portfolio with this uncertainty radius, e.g. 1.0")
+    parser.add_argument("--risk-aversion", type=float, default=2.0,
+                        help="risk aversion of the robust mean-variance portfolio")
+    args = parser.parse_args()
+    main(plots=not args.no_plots, chart_workers=args.chart_workers, cloud_samples=args.cloud_samples,
+         resamples=args.resamples, workers=args.workers or os.cpu_count(), return_kind=args.returns,
+         metrics_log=args.metrics_log, max_sector_weight=args.max_sector_weight,
+         min_country_weight=args.min_country_weight, current_weights_path=args.current_weights,
+         linear_cost=args.linear_cost, quadratic_cost=args.quadratic_cost, max_turnover=args.max_turnover,
+         max_names=args.max_names, min_position=args.min_position, time_limit=args.time_limit,
+         cvar_beta=args.cvar, robust_kappa=args.robust_kappa, risk_aversion=args.risk_aversion)
\ No newline at end of file
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+
+def inputs_hash(name, *inputs):
+    """
+    SHA-256 over a name and the optimizer inputs. Arrays are hashed by dtype,
+    shape and raw bytes; everything else (bounds, rates, solver options, ticker
+    lists) by its JSON representation.
+    """
+    digest = hashlib.sha256(name.encode())
+    for item in inputs:
+        if hasattr(item, "to_numpy"):
+            item = item.to_numpy()
+        if isinstance(item, np.ndarray):
+            item = np.ascontiguousarray(item)
+            digest.update(f"{item.dtype.str}{item.shape}".encode())
+            digest.update(item.tobytes())
+        else:
+            digest.update(json.dumps(item, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Content-addressed disk cache for optimizer outputs (weights, frontier arrays).
+
+    Each entry is a .npz file named after inputs_hash(). Reading an entry bumps
+    its modification time, and after every write the least recently used entries
+    are deleted until the directory is below max_bytes.
+    """
+
+    def __init__(self, directory=".cache/optimizer", max_bytes=256 * 1024 ** 2):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                arrays = {name: data[name] for name in data.files}
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+        os.utime(path)  # mark as recently used
+        return arrays
+
+    def put(self, key, arrays):
+        path = self._path(key)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)  # readers never see a half-written entry
+        self._evict()
+
+    def get_or_compute(self, name, inputs, compute):
+        """
+        Return the cached arrays for (name, *inputs), or call compute() to get a
+        dict of arrays, store it and return it.
+        """
+        key = inputs_hash(name, *inputs)
+        arrays = self.get(key)
+        if arrays is None:
+            arrays = {k: np.asarray(v) for k, v in compute().items()}
+            self.put(key, arrays)
+        return arrays
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npz") and not entry.name.endswith(".tmp.npz"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):  # oldest first
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npz"):
+                os.remove(entry.path)
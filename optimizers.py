@@ -0,0 +1,349 @@
+import time
+import numpy as np
+import scipy.sparse as sp
+
+from covariance import DenseCovariance, as_covariance
+from group_constraints import group_inequalities
+from scipy.optimize import linprog, minimize, minimize_scalar
+from qp_solver import FactorCache, solve_box_qp
+
+# Solvers shared by main.py and efficient_frontier.py.
+# Every function takes a portfolio_functions.PortfolioProblem, so the objective,
+# gradients and constraints only ever touch numpy arrays.
+# method='qp' uses the active-set solver in qp_solver.py; if it fails (e.g. a
+# singular covariance matrix) the call falls back to SLSQP, which is also
+# available directly with method='slsqp'. All functions return a scipy
+# OptimizeResult so callers can keep reading `.x` and `.success`; the result
+# also carries solver telemetry (see _finish and solver_metrics.py).
+#
+# group_constraints (a group_constraints.GroupConstraints or a list of them)
+# adds sector / industry / country exposure limits. The QP solver only knows
+# the budget, target return and box bounds, so its solution is kept when it
+# already respects the limits; otherwise SLSQP solves the problem with the
+# limits as linear inequalities (constant, analytic Jacobian).
+
+def _budget_constraint(problem):
+    ones = np.ones(problem.n_assets)
+    return {'type': 'eq', 'fun': lambda w: w @ ones - 1, 'jac': lambda w: ones}
+
+def _group_constraint(inequalities):
+    A_ub, b_ub = inequalities
+    jacobian = -A_ub.toarray()
+    return {'type': 'ineq', 'fun': lambda w: b_ub - A_ub @ w, 'jac': lambda w: jacobian}
+
+def _within_groups(weights, inequalities, tol=1e-9):
+    if inequalities is None:
+        return True
+    A_ub, b_ub = inequalities
+    return np.all(A_ub @ weights <= b_ub + tol)
+
+def _asset_bounds(bounds, n_assets):
+    # (lower, upper) as per-asset arrays; each side may be a scalar or an array
+    return tuple(np.broadcast_to(np.asarray(side, dtype=np.float64), (n_assets,)) for side in bounds)
+
+def _slsqp(objective, gradient, problem, constraints, bounds, initial_weights):
+    n_assets = problem.n_assets
+    if initial_weights is None:
+        initial_weights = np.array([1/n_assets] * n_assets)
+    return minimize(objective, initial_weights,
+                    jac=gradient,
+                    method='SLSQP',
+                    constraints=constraints,
+                    bounds=tuple(zip(*_asset_bounds(bounds, n_assets))))
+
+def _qp(A, b, bounds, initial_weights, cache):
+    try:
+        return solve_box_qp(cache.Q, np.zeros(len(cache.Q)), A, b, bounds[0], bounds[1],
+                            x0=initial_weights, cache=cache)
+    except np.linalg.LinAlgError:
+        return None
+
+# Largest universe for which a factor / sparse covariance is expanded to a dense
+# matrix for the QP solver; above it the solvers use SLSQP with the compact
+# matvec / quad_form of the covariance object instead.
+MAX_DENSE_ASSETS = 5000
+
+def _finish(result, problem, bounds, start_time, method, target_return=None, inequalities=None):
+    """
+    Attach telemetry to an optimizer result: wall_time (seconds), the solver
+    that produced it (`method`, 'qp' or 'slsqp' - so QP -> SLSQP fallbacks are
+    visible) and the largest violation of the budget, target return, bound and
+    group constraints at result.x.
+    """
+    weights = result.x
+    lower, upper = bounds
+    violation = max(abs(weights.sum() - 1), np.max(lower - weights), np.max(weights - upper), 0.0)
+    if target_return is not None:
+        violation = max(violation, abs(problem.mean_returns @ weights - target_return))
+    if inequalities is not None:
+        A_ub, b_ub = inequalities
+        violation = max(violation, np.max(A_ub @ weights - b_ub))
+    result.wall_time = time.perf_counter() - start_time
+    result.method = method
+    result.constraint_violation = float(violation)
+    return result
+
+def factor_cache(problem, cache=None):
+    """
+    Reuse `cache` if given, else factor the covariance for the QP solver.
+    Returns None when the covariance is not positive definite or too large
+    to expand to a dense matrix.
+    """
+    if cache is not None:
+        return cache
+    if problem.n_assets > MAX_DENSE_ASSETS and not isinstance(problem.covariance, DenseCovariance):
+        return None
+    try:
+        return FactorCache(problem.covariance.to_dense())
+    except np.linalg.LinAlgError:
+        return None  # not positive definite, only SLSQP can be used
+
+def max_feasible_return(mean_returns, bounds=(-0.08, 0.1), group_constraints=None):
+    """
+    Highest return reachable under the box bounds (scalars or per-asset
+    arrays) and the budget constraint. Start every asset at its lower bound and hand out the remaining budget to
+    the highest-returning assets first (the LP solution is greedy here).
+    With group constraints the LP is solved with HiGHS (-inf if infeasible).
+    """
+    n_assets = len(mean_returns)
+    lower, upper = _asset_bounds(bounds, n_assets)
+    inequalities = group_inequalities(group_constraints)
+    if inequalities is not None:
+        lp = linprog(-mean_returns, A_ub=inequalities[0], b_ub=inequalities[1],
+                     A_eq=np.ones((1, n_assets)), b_eq=[1.0], bounds=np.column_stack([lower, upper]), method='highs')
+        return -lp.fun if lp.status == 0 else -np.inf
+
+    weights = lower.copy()
+    remaining = 1 - weights.sum()
+    for i in np.argsort(mean_returns)[::-1]:
+        if remaining <= 0:
+            break
+        step = min(upper[i] - lower[i], remaining)
+        weights[i] += step
+        remaining -= step
+    return mean_returns @ weights
+
+def minimum_variance_portfolio(problem, bounds=(-0.08, 0.1), method='qp', initial_weights=None, cache=None,
+                               group_constraints=None):
+    """
+    Minimum variance portfolio under the budget constraint, box bounds and
+    optional group constraints.
+    """
+    start_time = time.perf_counter()
+    inequalities = group_inequalities(group_constraints)
+    if method == 'qp':
+        cache = factor_cache(problem, cache)
+        if cache is not None:
+            result = _qp(np.ones((1, problem.n_assets)), [1.0], bounds, initial_weights, cache)
+            if result is not None and result.success and _within_groups(result.x, inequalities):
+                return _finish(result, problem, bounds, start_time, 'qp', inequalities=inequalities)
+
+    constraints = [_budget_constraint(problem)]
+    if inequalities is not None:
+        constraints.append(_group_constraint(inequalities))
+    result = _slsqp(problem.variance, problem.variance_grad, problem, constraints, bounds, initial_weights)
+    return _finish(result, problem, bounds, start_time, 'slsqp', inequalities=inequalities)
+
+def efficient_portfolio(problem, target_return, bounds=(-0.08, 0.1), method='qp', initial_weights=None, cache=None,
+                        group_constraints=None):
+    """
+    Minimum variance portfolio with expected return equal to target_return.
+    Pass the previous frontier point as initial_weights to warm-start.
+    """
+    start_time = time.perf_counter()
+    mean_returns = problem.mean_returns
+    inequalities = group_inequalities(group_constraints)
+
+    if method == 'qp':
+        cache = factor_cache(problem, cache)
+        if cache is not None:
+            A = np.vstack([np.ones(problem.n_assets), mean_returns])
+            result = _qp(A, [1.0, target_return], bounds, initial_weights, cache)
+            if result is not None and result.success and _within_groups(result.x, inequalities):
+                return _finish(result, problem, bounds, start_time, 'qp', target_return, inequalities)
+
+    constraints = [
+        _budget_constraint(problem),
+        {'type': 'eq', 'fun': lambda w: w @ mean_returns - target_return, 'jac': lambda w: mean_returns}
+    ]
+    if inequalities is not None:
+        constraints.append(_group_constraint(inequalities))
+    result = _slsqp(problem.variance, problem.variance_grad, problem, constraints, bounds, initial_weights)
+    return _finish(result, problem, bounds, start_time, 'slsqp', target_return, inequalities)
+
+def max_sharpe_portfolio(problem, bounds=(-0.08, 0.1), method='qp', initial_weights=None, cache=None,
+                         group_constraints=None):
+    """
+    Tangency (maximum Sharpe ratio) portfolio for problem.risk_free_rate.
+
+    With method='qp' the tangency portfolio is searched along the efficient
+    frontier: the Sharpe ratio is unimodal in the target return between the MVP
+    and the highest feasible return, so a bounded scalar search over warm-started
+    QP solves finds it. initial_weights (e.g. the previous rebalance) warm-starts
+    the first of those solves. The result is labelled 'slsqp' if any of the
+    frontier solves fell back to SLSQP.
+    """
+    start_time = time.perf_counter()
+    inequalities = group_inequalities(group_constraints)
+    if method == 'qp':
+        cache = factor_cache(problem, cache)
+        mvp = (minimum_variance_portfolio(problem, bounds, method='qp', initial_weights=initial_weights, cache=cache)
+               if cache is not None else None)
+        if mvp is not None and mvp.success:
+            state = {'weights': mvp.x, 'ok': True, 'method': 'qp'}
+
+            def neg_sharpe(target):
+                result = efficient_portfolio(problem, target, bounds, method='qp',
+                                             initial_weights=state['weights'], cache=cache)
+                if not result.success:
+                    state['ok'] = False
+                    return np.inf
+                if result.method != 'qp':
+                    state['method'] = result.method
+                state['weights'] = result.x
+                return problem.neg_sharpe_ratio(result.x)
+
+            lowest, highest = problem.expected_return(mvp.x), max_feasible_return(problem.mean_returns, bounds)
+            if highest - lowest <= 1e-10:
+                # the bounds leave (up to rounding) a single portfolio on the frontier: the MVP
+                if _within_groups(mvp.x, inequalities):
+                    return _finish(mvp, problem, bounds, start_time, mvp.method, inequalities=inequalities)
+                state['ok'] = False
+            else:
+                search = minimize_scalar(neg_sharpe, method='bounded', bounds=(lowest, highest),
+                                         options={'xatol': 1e-10})
+            if state['ok']:
+                result = efficient_portfolio(problem, search.x, bounds, method='qp',
+                                             initial_weights=state['weights'], cache=cache)
+                result.nit = result.nfev = search.nfev  # one QP solve per Sharpe evaluation
+                if result.success and _within_groups(result.x, inequalities):
+                    method = state['method'] if result.method == 'qp' else result.method
+                    return _finish(result, problem, bounds, start_time, method, inequalities=inequalities)
+
+    constraints = [_budget_constraint(problem)]
+    if inequalities is not None:
+        constraints.append(_group_constraint(inequalities))
+    result = _slsqp(problem.neg_sharpe_ratio, problem.neg_sharpe_grad, problem, constraints, bounds, initial_weights)
+    return _finish(result, problem, bounds, start_time, 'slsqp', inequalities=inequalities)
+
+def rebalance_portfolio(problem, current_weights, bounds=(-0.08, 0.1), linear_cost=0.0, quadratic_cost=0.0,
+                        max_turnover=None, group_constraints=None):
+    """
+    Max Sharpe portfolio net of transaction costs, trading from current_weights.
+
+    The trade is split into buys and sells, w = current + buy - sell with
+    buy, sell >= 0, so the L1 terms (linear costs, turnover) are linear in
+    the variables and the problem stays smooth for SLSQP:
+        return net of costs = mu'w - linear_cost'(buy + sell) - quadratic_cost * |buy - sell|^2
+        turnover            = sum(buy + sell) <= max_turnover
+    Costs are in the same (annualized) units as the expected returns and may be
+    scalars or per-asset arrays. The solve starts from the current holdings
+    (no trade), so small rebalances converge in a few iterations. Holdings that
+    have drifted outside the bounds are traded back inside; if max_turnover
+    does not allow that, the result is unsuccessful (status 4).
+
+    result.x holds the new weights; result.trades, result.turnover and
+    result.cost describe the trade.
+    """
+    start_time = time.perf_counter()
+    n_assets = problem.n_assets
+    current_weights = np.asarray(current_weights, dtype=np.float64)
+    if abs(current_weights.sum() - 1) > 1e-6:
+        raise ValueError(f"Current weights must sum to 1, got {current_weights.sum():.6f}")
+
+    mean_returns = problem.mean_returns
+    rf = problem.risk_free_rate
+    linear_cost = np.broadcast_to(np.asarray(linear_cost, dtype=np.float64), (n_assets,))
+    quadratic_cost = np.broadcast_to(np.asarray(quadratic_cost, dtype=np.float64), (n_assets,))
+
+    def split(z):
+        buy, sell = z[:n_assets], z[n_assets:]
+        return current_weights + buy - sell, buy - sell, buy + sell
+
+    def objective(z):
+        weights, trade, traded = split(z)
+        net_return = mean_returns @ weights - linear_cost @ traded - quadratic_cost @ (trade * trade)
+        return -(net_return - rf) / np.sqrt(problem.variance(weights))
+
+    def gradient(z):
+        weights, trade, traded = split(z)
+        net_return = mean_returns @ weights - linear_cost @ traded - quadratic_cost @ (trade * trade)
+        variance = problem.variance(weights)
+        volatility = np.sqrt(variance)
+        # d(-Sharpe) = -d(return) / vol + (return - rf) d(variance) / (2 vol^3)
+        grad_weights = -mean_returns / volatility + (net_return - rf) * problem.covariance.matvec(weights) / volatility ** 3
+        grad_cost = (linear_cost + 2 * quadratic_cost * trade, linear_cost - 2 * quadratic_cost * trade)
+        return np.concatenate([grad_weights + grad_cost[0] / volatility, -grad_weights + grad_cost[1] / volatility])
+
+    signs = np.concatenate([np.ones(n_assets), -np.ones(n_assets)])
+    constraints = [{'type': 'eq', 'fun': lambda z: signs @ z, 'jac': lambda z: signs}]  # buys pay for sells
+    if max_turnover is not None:
+        ones = np.ones(2 * n_assets)
+        constraints.append({'type': 'ineq', 'fun': lambda z: max_turnover - ones @ z, 'jac': lambda z: -ones})
+    inequalities = group_inequalities(group_constraints)
+    if inequalities is not None:
+        A_ub, b_ub = inequalities
+        dense = A_ub.toarray()
+        jacobian = np.hstack([-dense, dense])
+        constraints.append({'type': 'ineq', 'fun': lambda z: b_ub - A_ub @ split(z)[0], 'jac': lambda z: jacobian})
+
+    # holdings that drifted outside the box must be traded back into it
+    lower, upper = _asset_bounds(bounds, n_assets)
+    min_buy, min_sell = np.maximum(lower - current_weights, 0.0), np.maximum(current_weights - upper, 0.0)
+    z_bounds = (list(zip(min_buy, np.maximum(upper - current_weights, 0.0))) +
+                list(zip(min_sell, np.maximum(current_weights - lower, 0.0))))
+    result = minimize(objective, np.concatenate([min_buy, min_sell]), jac=gradient, method='SLSQP',
+                      constraints=constraints, bounds=z_bounds)
+
+    weights, trade, traded = split(result.x)
+    result.x = weights
+    result.trades = trade
+    result.turnover = traded.sum()
+    result.cost = linear_cost @ traded + quadratic_cost @ (trade * trade)
+    result = _finish(result, problem, (lower, upper), start_time, 'slsqp', inequalities=inequalities)
+    if max_turnover is not None:
+        result.constraint_violation = max(result.constraint_violation, result.turnover - max_turnover)
+    if result.success and result.constraint_violation > 1e-6:
+        # e.g. a turnover cap too tight to bring the holdings back within the bounds
+        result.success, result.status = False, 4
+        result.message = f"Constraints cannot be satisfied (violation {result.constraint_violation:.2e})"
+    return result
+
+def robust_portfolio(problem, risk_aversion=2.0, kappa=1.0, uncertainty=None, bounds=(-0.08, 0.1),
+                     initial_weights=None, group_constraints=None):
+    """
+    Robust mean-variance portfolio. The expected returns are only known to lie
+    in the ellipsoid {mu : (mu - mean_returns)' Omega^-1 (mu - mean_returns) <= kappa^2},
+    whose worst case for w is mean_returns'w - kappa * sqrt(w' Omega w), so
+        max  mean_returns'w - kappa * sqrt(w' Omega w) - risk_aversion / 2 * w'Sw
+    Omega (`uncertainty`) is the covariance of the estimation error of
+    problem.mean_returns: a vector of error variances (independent errors), a
+    matrix or a covariance object. It defaults to the return variances, with
+    kappa setting the scale (Omega = diag(S) / years of data gives standard
+    errors). kappa=0 is the classical mean-variance portfolio.
+
+    result.worst_case_return is the worst-case expected return of result.x.
+    """
+    start_time = time.perf_counter()
+    mean_returns = problem.mean_returns
+    if uncertainty is None:
+        uncertainty = problem.covariance.diagonal()
+    if np.ndim(uncertainty) == 1:
+        uncertainty = sp.diags(np.asarray(uncertainty, dtype=np.float64))
+    uncertainty = as_covariance(uncertainty)
+
+    def objective(w):
+        return -(mean_returns @ w - kappa * np.sqrt(uncertainty.quad_form(w))) + risk_aversion / 2 * problem.variance(w)
+
+    def gradient(w):
+        omega_w = uncertainty.matvec(w)
+        spread = max(np.sqrt(w @ omega_w), 1e-12)  # sqrt(w'Omega w) > 0 for any fully invested w
+        return -mean_returns + kappa * omega_w / spread + risk_aversion / 2 * problem.variance_grad(w)
+
+    inequalities = group_inequalities(group_constraints)
+    constraints = [_budget_constraint(problem)]
+    if inequalities is not None:
+        constraints.append(_group_constraint(inequalities))
+    result = _slsqp(objective, gradient, problem, constraints, bounds, initial_weights)
+    result.worst_case_return = mean_returns @ result.x - kappa * np.sqrt(uncertainty.quad_form(result.x))
+    return _finish(result, problem, bounds, start_time, 'slsqp', inequalities=inequalities)
@@ -1,105 +1,114 @@
 import pandas as pd
 import numpy as np
-import matplotlib
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-import plotly.io as pio
-import plotly.graph_objects as go
-import matplotlib.ticker as mtick
 
 from datetime import datetime
+from group_constraints import GroupMembership
+from security_master import load_security_master
+
+# matplotlib is imported inside the plotting functions, so importing this
+# module costs nothing when no chart is drawn.
+
+def _matplotlib():
+    # The charts draw on a Figure created directly instead of through pyplot: it
+    # is not registered with pyplot, so there is no global figure state and no
+    # GUI backend is needed to save it
+    import matplotlib.style
+    from matplotlib.artist import setp
+    from matplotlib.figure import Figure
+    return matplotlib.style, setp, Figure
 
 def prepare_portfolio_data():
     """
-    Prepares the initial portfolio data from the provided list.
-    In a real-world scenario, you might load this from a CSV.
+    Prepares the portfolio data from the security master (security_master.csv).
     Returns:
-        pd.DataFrame: The prepared portfolio data.
+        pd.DataFrame: The portfolio data, one row per company with a 'Ticker' column.
     """
-    # Data from the table, structured for DataFrame creation
-    data = {
-        'Company': [
-            'Synopsys, Inc.', 'ASML Holding N.V.', 'SAP SE', 'Infineon Technologies AG', 
-            'Siemens Aktiengesellschaft', 'Schneider Electric SE', 'Thales Group', 'Airbus SE',
-            'Allianz SE', 'BNP Paribas SA', 'ING Groep N.V.',
-            'TotalEnergies SE', 'Iberdrola SA', 'Enel SpA', 'EDP : Energias de Portugal SA',
-            'LVMH Moët Hennessy - Louis Vuitton', 'Industria de Diseño Textil SA', 'Ferrari N.V.', 
-            'Koninklijke Ahold Delhaize N.V.',
-            'Sanofi', 'Siemens Healthineers AG',
-            'BASF SE', 'Linde plc',
-            'Deutsche Telekom AG', 'Telefónica SA'
-        ],
-        'Ticker': [
-            'SYP.DE', 'ASML.AS', 'SAP.DE', 'IFX.DE',
-            'SIE.DE', 'SU.PA', 'HO.PA', 'AIR.PA',
-            'ALV.DE', 'BNP.PA', 'INGA.AS',
-            'TTE.PA', 'IBE.MC', 'ENEL.MI', 'EDP.LS',
-            'MC.PA', 'ITX.MC', 'RACE.MI', 'AD.AS',
-            'SAN.PA', 'SHL.DE',
-            'BAS.DE', 'LIN.DE',
-            'DTE.DE', 'TEF.MC'
-        ],
-        'Market_Cap_B': [
-            74.9, 347.2, 271.8, 43.5,
-            190.8, 142.8, 53.6, 164.1,
-            136.0, 76.8, 60.2,
-            117.0, 114.5, 85.9, 18.4,
-            308.3, 154.9, 62.9, 33.0,
-            108.1, 55.6,
-            39.0, 180.6,
-            142.1, 25.7
-        ],
-        'Credit_Rating': [
-            'BBB', 'No info', 'A+', 'BBB+',
-            'AA-', 'A', 'A-', 'A',
-            'AA', 'A+', 'A-',
-            'A+', 'BBB+', 'BBB', 'BBB',
-            'AA-', 'No info', 'No info', 'No info',
-            'AA', 'No Info',
-            'A-', 'A',
-            'BBB+', 'BBB-'
-        ],
-        'Sector': [
-            'Technology', 'Technology', 'Technology', 'Technology',
-            'Industrials', 'Industrials', 'Industrials', 'Industrials',
-            'Financial Services', 'Financial Services', 'Financial Services',
-            'Energy', 'Utilities', 'Utilities', 'Utilities',
-            'Consumer Cyclical', 'Consumer Cyclical', 'Consumer Cyclical', 'Consumer Defensive',
-            'Healthcare', 'Healthcare',
-            'Basic Materials', 'Basic Materials',
-            'Communication Services', 'Communication Services'
-        ],
-        'Industry': [
-            'Software - Infrastructure', 'Semiconductor Equipment & Materials', 'Software - Application', 'Semiconductors',
-            'Specialty Industrial Machinery', 'Specialty Industrial Machinery', 'Aerospace & Defense', 'Aerospace & Defense',
-            'Insurance - Diversified', 'Banks - Regional', 'Banks - Diversified',
-            'Oil & Gas Integrated', 'Utilities - Diversified', 'Utilities - Diversified', 'Utilities - Diversified',
-            'Luxury Goods', 'Apparel Retail', 'Auto Manufacturers', 'Grocery Stores',
-            'Drug Manufacturers - General', 'Medical Devices',
-            'Chemicals', 'Chemicals',
-            'Telecom Services', 'Telecom Services'
-        ],
-        'Country': [
-            'USA', 'Netherlands', 'Germany', 'Germany',
-            'Germany', 'France', 'France', 'Netherlands',
-            'Germany', 'Luxembourg', 'Netherlands',
-            'France', 'Spain', 'Italy', 'Portugal',
-            'France', 'Spain', 'Italy', 'Netherlands',
-            'France', 'Germany',
-            'Germany', 'Ireland',
-            'Germany', 'Spain'
-        ]
-    }
-    
-    portfolio_df = pd.DataFrame(data)
-    return portfolio_df
+    return load_security_master().reset_index()
+
+def plot_efficient_frontier(eff_vols, eff_returns, optimal_point, mvp_point, risk_free_rate,
+                            stock_vols, stock_returns, tickers, file_path='efficient_frontier.png', cloud=None,
+                            resampled=None):
+    """
+    Plot the efficient frontier with the Capital Market Line, the optimal (max
+    Sharpe) portfolio, the MVP and the individual stocks, optionally over the
+    density of random portfolios.
+
+    Args:
+        eff_vols, eff_returns: Frontier volatilities and returns
+        optimal_point: (volatility, return) of the max Sharpe portfolio
+        mvp_point: (volatility, return) of the minimum variance portfolio
+        risk_free_rate: Risk-free rate used for the CML
+        stock_vols, stock_returns: Per-stock volatilities and returns
+        tickers: List of ticker symbols
+        file_path: Output filename for the PNG file
+        cloud: Optional (counts, vol_edges, return_edges) histogram of random
+               portfolios, e.g. from random_portfolios.random_portfolio_cloud
+        resampled: Optional (vols, returns) of the resampled (Michaud) frontier
+    """
+    optimal_portfolio_volatility, optimal_portfolio_return = optimal_point
+    mvp_volatility, mvp_return = mvp_point
+
+    _, _, Figure = _matplotlib()
+    fig = Figure(figsize=(10, 7))
+    ax = fig.subplots()
+
+    # Plot random portfolio density (log scale, empty bins left blank)
+    if cloud is not None:
+        from matplotlib.colors import LogNorm
+        counts, vol_edges, return_edges = cloud
+        counts = np.ma.masked_equal(counts.T, 0)
+        if counts.count():
+            mesh = ax.pcolormesh(vol_edges, return_edges, counts, cmap='Greys', norm=LogNorm(), alpha=0.6)
+            fig.colorbar(mesh, ax=ax, label='Random portfolios')
+    
+    # Plot efficient frontier
+    ax.plot(eff_vols, eff_returns, 'b-', linewidth=2, label='Efficient Frontier')
+
+    # Plot resampled frontier
+    if resampled is not None:
+        ax.plot(resampled[0], resampled[1], color='orange', linestyle='-.', linewidth=2,
+                label='Resampled Frontier')
+    
+    # Plot optimal portfolio (max Sharpe ratio)
+    ax.plot(optimal_portfolio_volatility, optimal_portfolio_return, 'g*', 
+            markersize=20, label='Optimal Portfolio (Max Sharpe)')
+    
+    # Plot MVP
+    ax.plot(mvp_volatility, mvp_return, 'r*', 
+            markersize=20, label='Minimum Variance Portfolio')
+    
+    # Plot risk-free asset
+    ax.plot(0, risk_free_rate, 'ko', markersize=10, label=f'Risk-Free Asset ({risk_free_rate:.2%})')
+    
+    # Plot Capital Market Line (CML) - line through risk-free rate and tangent portfolio
+    max_x = max(np.max(eff_vols), optimal_portfolio_volatility) * 1.1
+    cml_x = np.array([0, max_x])
+    cml_y = risk_free_rate + (optimal_portfolio_return - risk_free_rate) / optimal_portfolio_volatility * cml_x
+    ax.plot(cml_x, cml_y, 'g--', linewidth=2, alpha=0.7, label='Capital Market Line (CML)')
+    
+    # Plot individual stocks
+    for ticker, stock_return, stock_vol in zip(tickers, stock_returns, stock_vols):
+        ax.plot(stock_vol, stock_return, 'o', markersize=8, alpha=0.6)
+        ax.annotate(ticker, (stock_vol, stock_return), 
+                    xytext=(5, 5), textcoords='offset points', fontsize=9)
+    
+    ax.set_xlabel('Volatility (Standard Deviation)', fontsize=12)
+    ax.set_ylabel('Expected Return', fontsize=12)
+    ax.set_title('Efficient Frontier with Capital Market Line', fontsize=14, fontweight='bold')
+    ax.legend(fontsize=10)
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    
+    print(f"Saving plot to: {file_path}")
+    fig.savefig(file_path, dpi = 300, bbox_inches = 'tight')
 
 def plot_portfolio_weights(weights, tickers, file_path=None, title="Optimal Portfolio Weights"):
     
     weights_pct = np.array(weights) * 100
-    plt.style.use('seaborn-v0_8-whitegrid')
-    fig, ax = plt.subplots(figsize=(18, 7))
+    style, setp, Figure = _matplotlib()
+    style.use('seaborn-v0_8-whitegrid')
+    fig = Figure(figsize=(18, 7))
+    ax = fig.subplots()
 
     positive_color = '#005A9C'  # Blue for positive
     negative_color = '#D50000'  # Red for negative
@@ -142,29 +151,20 @@ def plot_portfolio_weights(weights, tickers, file_path=None, title="Optimal Port
     ax.set_xlabel('Stock Ticker', fontsize=14, fontfamily='serif')
     
     # Format ticks and spines
-    plt.xticks(rotation=45, ha='right', fontsize=12, fontfamily='serif')
-    plt.yticks(fontsize=12, fontfamily='serif')
+    setp(ax.get_xticklabels(), rotation=45, ha='right', fontsize=12, fontfamily='serif')
+    setp(ax.get_yticklabels(), fontsize=12, fontfamily='serif')
     ax.spines['top'].set_visible(False)
     ax.spines['right'].set_visible(False)
     ax.yaxis.grid(True, linestyle='--', which='major', color='grey', alpha=0.6)
     ax.set_axisbelow(True)  # Keep gridlines behind bars
     
-    plt.tight_layout()
+    fig.tight_layout()
 
-    # Save or show the plot
+    # Save the plot, or hand the figure back (e.g. for display in a notebook)
     if file_path:
-        plt.savefig(file_path, dpi=300, bbox_inches='tight')
+        fig.savefig(file_path, dpi=300, bbox_inches='tight')
         print(f"✅ Saved portfolio weights plot to: {file_path}")
-        plt.close(fig)
-    else:
-        # Check if the backend is interactive before trying to show the plot
-        backend = matplotlib.get_backend()
-        if 'agg' in backend.lower():
-            print(f"⚠️ Warning: Matplotlib is using the non-interactive '{backend}' backend. Plot cannot be shown.")
-            print("To view the plot, provide a 'file_path' argument to save it to a file, or switch to an interactive backend.")
-            plt.close(fig)
-        else:
-            plt.show()
+    return fig
 
 """
 def create_portfolio_treemap(df: pd.DataFrame, output_filename: str = 'portfolio_composition_final_with_totals.png'):
@@ -392,8 +392,10 @@ def plot_market_cap_by_sector(df, filename='market_cap_by_sector.png'):
     total = sector_data.sum()
     percentages = (sector_data / total) * 100
     
-    plt.style.use('seaborn-v0_8-whitegrid')
-    fig, ax = plt.subplots(figsize=(18, 7))
+    style, setp, Figure = _matplotlib()
+    style.use('seaborn-v0_8-whitegrid')
+    fig = Figure(figsize=(18, 7))
+    ax = fig.subplots()
     
     # Create the bars
     bars = ax.bar(sector_data.index, percentages, color='#005A9C', 
@@ -418,17 +420,16 @@ def plot_market_cap_by_sector(df, filename='market_cap_by_sector.png'):
     ax.set_xlabel('Sector', fontsize=14, fontfamily='serif')
     
     # Format ticks and spines
-    plt.xticks(rotation=45, ha='right', fontsize=12, fontfamily='serif')
-    plt.yticks(fontsize=12, fontfamily='serif')
+    setp(ax.get_xticklabels(), rotation=45, ha='right', fontsize=12, fontfamily='serif')
+    setp(ax.get_yticklabels(), fontsize=12, fontfamily='serif')
     ax.spines['top'].set_visible(False)
     ax.spines['right'].set_visible(False)
     ax.yaxis.grid(True, linestyle='--', which='major', color='grey', alpha=0.6)
     ax.set_axisbelow(True)
     
-    plt.tight_layout()
-    plt.savefig(filename, dpi=300, bbox_inches='tight')
+    fig.tight_layout()
+    fig.savefig(filename, dpi=300, bbox_inches='tight')
     print(f"✅ Saved sector market cap plot to: {filename}")
-    plt.close(fig)
 
 
 def plot_market_cap_by_industry(df, filename='market_cap_by_industry.png'):
@@ -457,8 +458,10 @@ def plot_market_cap_by_industry(df, filename='market_cap_by_industry.png'):
     total_market_cap = industry_data.sum()
     allocation_pct = (industry_data / total_market_cap) * 100
     
-    plt.style.use('seaborn-v0_8-whitegrid')
-    fig, ax = plt.subplots(figsize=(18, 7))
+    style, setp, Figure = _matplotlib()
+    style.use('seaborn-v0_8-whitegrid')
+    fig = Figure(figsize=(18, 7))
+    ax = fig.subplots()
     
     # Create the bars
     bars = ax.bar(industry_data.index, allocation_pct, color='#005A9C',
@@ -483,22 +486,22 @@ def plot_market_cap_by_industry(df, filename='market_cap_by_industry.png'):
     ax.set_xlabel('Industry', fontsize=14, fontfamily='serif')
     
     # Format ticks and spines
-    plt.xticks(rotation=45, ha='right', fontsize=12, fontfamily='serif')
-    plt.yticks(fontsize=12, fontfamily='serif')
+    setp(ax.get_xticklabels(), rotation=45, ha='right', fontsize=12, fontfamily='serif')
+    setp(ax.get_yticklabels(), fontsize=12, fontfamily='serif')
     ax.spines['top'].set_visible(False)
     ax.spines['right'].set_visible(False)
     ax.yaxis.grid(True, linestyle='--', which='major', color='grey', alpha=0.6)
     ax.set_axisbelow(True)
     
-    plt.tight_layout()
-    plt.savefig(filename, dpi=300, bbox_inches='tight')
+    fig.tight_layout()
+    fig.savefig(filename, dpi=300, bbox_inches='tight')
     print(f"✅ Saved industry market cap plot to: {filename}")
     print(f"Total sectors analyzed: {len(industry_data)}")
     print(f"Total market cap: €{total_market_cap:.2f}B")
-    plt.close(fig)
 
 
-def plot_industry_weights(optimal_weights, tickers, portfolio_df, output_filename='industry_weights.png'):
+def plot_industry_weights(optimal_weights, tickers, portfolio_df, output_filename='industry_weights.png',
+                          membership=None):
     """
     Plot portfolio weight distribution by industry.
     
@@ -507,25 +510,16 @@ def plot_industry_weights(optimal_weights, tickers, portfolio_df, output_filenam
         tickers: List of ticker symbols
         portfolio_df: DataFrame with 'Ticker' and 'Industry' columns
         output_filename: Output filename for the PNG file
+        membership: Optional group_constraints.GroupMembership for 'Industry', e.g.
+                    the one used for the optimizer's exposure limits; built from
+                    portfolio_df if not given
     """
     print("Aggregating weights by industry and plotting...")
 
-    # Create a DataFrame from the optimized weights and tickers
-    weights_df = pd.DataFrame({
-        'Ticker': tickers,
-        'Weight': optimal_weights
-    })
-
-    # Merge with the portfolio info to get the industry for each ticker
-    merged_df = pd.merge(
-        weights_df,
-        portfolio_df[['Ticker', 'Industry']],
-        on='Ticker',
-        how='left'
-    )
-
-    # Aggregate (sum) the weights by industry
-    industry_weights = merged_df.groupby('Industry')['Weight'].sum()
+    # Aggregate (sum) the weights by industry: one sparse product with the membership matrix
+    if membership is None:
+        membership = GroupMembership.from_metadata(portfolio_df, tickers, 'Industry')
+    industry_weights = membership.aggregate(optimal_weights)
     
     # Sort for better visualization
     industry_weights = industry_weights.sort_values(ascending=False)
@@ -533,8 +527,10 @@ def plot_industry_weights(optimal_weights, tickers, portfolio_df, output_filenam
     # Convert to percentage
     weights_pct = industry_weights * 100
 
-    plt.style.use('seaborn-v0_8-whitegrid')
-    fig, ax = plt.subplots(figsize=(18, 7))
+    style, setp, Figure = _matplotlib()
+    style.use('seaborn-v0_8-whitegrid')
+    fig = Figure(figsize=(18, 7))
+    ax = fig.subplots()
     
     positive_color = '#005A9C'  # Blue for positive
     negative_color = '#D50000'  # Red for negative
@@ -570,17 +566,16 @@ def plot_industry_weights(optimal_weights, tickers, portfolio_df, output_filenam
     ax.set_xlabel('Industry', fontsize=14, fontfamily='serif')
     
     # Format ticks and spines
-    plt.xticks(rotation=45, ha='right', fontsize=12, fontfamily='serif')
-    plt.yticks(fontsize=12, fontfamily='serif')
+    setp(ax.get_xticklabels(), rotation=45, ha='right', fontsize=12, fontfamily='serif')
+    setp(ax.get_yticklabels(), fontsize=12, fontfamily='serif')
     ax.spines['top'].set_visible(False)
     ax.spines['right'].set_visible(False)
     ax.yaxis.grid(True, linestyle='--', which='major', color='grey', alpha=0.6)
     ax.set_axisbelow(True)
     
-    plt.tight_layout()
-    plt.savefig(output_filename, dpi=300, bbox_inches='tight')
+    fig.tight_layout()
+    fig.savefig(output_filename, dpi=300, bbox_inches='tight')
     print(f"✅ Saved industry weight plot to: {output_filename}")
-    plt.close(fig)
 
 def plot_companies_by_country(df, filename='companies_by_country.png'):
     """
@@ -593,8 +588,10 @@ def plot_companies_by_country(df, filename='companies_by_country.png'):
     # Count companies by country
     country_counts = df['Country'].value_counts().sort_values(ascending=False)
     
-    plt.style.use('seaborn-v0_8-whitegrid')
-    fig, ax = plt.subplots(figsize=(18, 7))
+    style, setp, Figure = _matplotlib()
+    style.use('seaborn-v0_8-whitegrid')
+    fig = Figure(figsize=(18, 7))
+    ax = fig.subplots()
     
     # Create the bars
     bars = ax.bar(country_counts.index, country_counts.values, color='#005A9C',
@@ -619,21 +616,21 @@ def plot_companies_by_country(df, filename='companies_by_country.png'):
     ax.set_xlabel('Country', fontsize=14, fontfamily='serif')
     
     # Format ticks and spines
-    plt.xticks(rotation=45, ha='right', fontsize=12, fontfamily='serif')
-    plt.yticks(fontsize=12, fontfamily='serif')
+    setp(ax.get_xticklabels(), rotation=45, ha='right', fontsize=12, fontfamily='serif')
+    setp(ax.get_yticklabels(), fontsize=12, fontfamily='serif')
     ax.spines['top'].set_visible(False)
     ax.spines['right'].set_visible(False)
     ax.yaxis.grid(True, linestyle='--', which='major', color='grey', alpha=0.6)
     ax.set_axisbelow(True)
     
-    plt.tight_layout()
-    plt.savefig(filename, dpi=300, bbox_inches='tight')
+    fig.tight_layout()
+    fig.savefig(filename, dpi=300, bbox_inches='tight')
     print(f"✅ Saved companies by country plot to: {filename}")
     print(f"Total countries: {len(country_counts)}")
     print(f"Total companies: {country_counts.sum()}")
-    plt.close(fig)
 
-def plot_sector_weights(optimal_weights, tickers, portfolio_df, output_filename='sector_weights.png'):
+def plot_sector_weights(optimal_weights, tickers, portfolio_df, output_filename='sector_weights.png',
+                        membership=None):
     """
     Plot portfolio weight distribution by sector.
     
@@ -642,25 +639,16 @@ def plot_sector_weights(optimal_weights, tickers, portfolio_df, output_filename=
         tickers: List of ticker symbols
         portfolio_df: DataFrame with 'Ticker' and 'Sector' columns
         output_filename: Output filename for the PNG file
+        membership: Optional group_constraints.GroupMembership for 'Sector', e.g.
+                    the one used for the optimizer's exposure limits; built from
+                    portfolio_df if not given
     """
     print("Aggregating weights by sector and plotting...")
 
-    # Create a DataFrame from the optimized weights and tickers
-    weights_df = pd.DataFrame({
-        'Ticker': tickers,
-        'Weight': optimal_weights
-    })
-
-    # Merge with the portfolio info to get the sector for each ticker
-    merged_df = pd.merge(
-        weights_df,
-        portfolio_df[['Ticker', 'Sector']],
-        on='Ticker',
-        how='left'
-    )
-
-    # Aggregate (sum) the weights by sector
-    sector_weights = merged_df.groupby('Sector')['Weight'].sum()
+    # Aggregate (sum) the weights by sector: one sparse product with the membership matrix
+    if membership is None:
+        membership = GroupMembership.from_metadata(portfolio_df, tickers, 'Sector')
+    sector_weights = membership.aggregate(optimal_weights)
     
     # Sort for better visualization
     sector_weights = sector_weights.sort_values(ascending=False)
@@ -668,8 +656,10 @@ def plot_sector_weights(optimal_weights, tickers, portfolio_df, output_filename=
     # Convert to percentage
     weights_pct = sector_weights * 100
 
-    plt.style.use('seaborn-v0_8-whitegrid')
-    fig, ax = plt.subplots(figsize=(18, 7))
+    style, setp, Figure = _matplotlib()
+    style.use('seaborn-v0_8-whitegrid')
+    fig = Figure(figsize=(18, 7))
+    ax = fig.subplots()
     
     positive_color = '#005A9C'  # Blue for positive
     negative_color = '#D50000'  # Red for negative
@@ -705,17 +695,16 @@ def plot_sector_weights(optimal_weights, tickers, portfolio_df, output_filename=
     ax.set_xlabel('Sector', fontsize=14, fontfamily='serif')
     
     # Format ticks and spines
-    plt.xticks(rotation=45, ha='right', fontsize=12, fontfamily='serif')
-    plt.yticks(fontsize=12, fontfamily='serif')
+    setp(ax.get_xticklabels(), rotation=45, ha='right', fontsize=12, fontfamily='serif')
+    setp(ax.get_yticklabels(), fontsize=12, fontfamily='serif')
     ax.spines['top'].set_visible(False)
     ax.spines['right'].set_visible(False)
     ax.yaxis.grid(True, linestyle='--', which='major', color='grey', alpha=0.6)
     ax.set_axisbelow(True)
     
-    plt.tight_layout()
-    plt.savefig(output_filename, dpi=300, bbox_inches='tight')
+    fig.tight_layout()
+    fig.savefig(output_filename, dpi=300, bbox_inches='tight')
     print(f"✅ Saved sector weight plot to: {output_filename}")
-    plt.close(fig)
 
 
 # --- Main Execution Block ---
@@ -1,13 +1,18 @@
 import numpy as np
 
+from covariance import as_covariance
+from stock_functions import annualization_factor
+
+# cov_matrix may be an ndarray / DataFrame or any covariance.* object
+
 #portfolio standard deviation
 def standard_deviation(weights, cov_matrix):
-    variance = weights.T @ cov_matrix @ weights # transpose weights so an array that is 1 x n -> n x 1 then multiply with cov matrix and weights
+    variance = portfolio_variance(weights, cov_matrix)
     return np.sqrt(variance) # sd
 
 # portfolio return
 def expected_returns(weights, simple_returns):
-    return np.sum(simple_returns.mean() * weights) * 12 # annualized returns
+    return np.sum(simple_returns.mean() * weights) * annualization_factor(simple_returns) # annualized returns
 
 # Sharpe ratio
 def sharpe_ratio(weights, simple_returns, cov_matrix, risk_free_rate = 0.0193):
@@ -19,4 +24,74 @@ def neg_sharpe_ratio(weights, simple_returns, cov_matrix, risk_free_rate = 0.019
 
 # variance
 def portfolio_variance(weights, cov_matrix):
-    return weights.T @ cov_matrix @ weights
+    if hasattr(cov_matrix, 'quad_form'):
+        return cov_matrix.quad_form(weights)
+    return weights.T @ cov_matrix @ weights # transpose weights so an array that is 1 x n -> n x 1 then multiply with cov matrix and weights
+
+# Batch versions: weights is an (N_portfolios x N_assets) matrix, one portfolio per row.
+# They take the same arguments as the functions above and return a vector with
+# one value per portfolio.
+
+# portfolio returns
+def batch_expected_returns(weights, simple_returns):
+    return weights @ simple_returns.mean().to_numpy() * annualization_factor(simple_returns) # annualized returns
+
+# portfolio variances, w_i' S w_i for every row in one matmul
+def batch_portfolio_variance(weights, cov_matrix):
+    return as_covariance(cov_matrix).batch_quad_form(weights)
+
+# portfolio standard deviations
+def batch_standard_deviation(weights, cov_matrix):
+    return np.sqrt(batch_portfolio_variance(weights, cov_matrix))
+
+# Sharpe ratios
+def batch_sharpe_ratio(weights, simple_returns, cov_matrix, risk_free_rate = 0.0193):
+    return (batch_expected_returns(weights, simple_returns) - risk_free_rate) / batch_standard_deviation(weights, cov_matrix)
+
+# Precomputed mean vector and covariance for use inside optimizer loops.
+# The pandas reductions happen once here; every method below works on
+# contiguous float64 arrays only. The covariance is held as a covariance.*
+# object, so a factor or sparse model is never expanded to a dense matrix.
+class PortfolioProblem:
+
+    def __init__(self, mean_returns, cov_matrix, risk_free_rate = 0.0193):
+        self.mean_returns = np.ascontiguousarray(mean_returns, dtype=np.float64)  # annualized
+        self.covariance = as_covariance(cov_matrix)  # annualized
+        self.risk_free_rate = risk_free_rate
+        self.n_assets = len(self.mean_returns)
+
+    @classmethod
+    def from_returns(cls, simple_returns, cov_matrix, risk_free_rate = 0.0193):
+        return cls(simple_returns.mean().to_numpy() * annualization_factor(simple_returns), cov_matrix, risk_free_rate)
+
+    def expected_return(self, weights):
+        return weights @ self.mean_returns
+
+    def variance(self, weights):
+        return self.covariance.quad_form(weights)
+
+    def variance_grad(self, weights):
+        return 2 * self.covariance.matvec(weights)
+
+    def standard_deviation(self, weights):
+        return np.sqrt(self.variance(weights))
+
+    def sharpe_ratio(self, weights):
+        return (self.expected_return(weights) - self.risk_free_rate) / self.standard_deviation(weights)
+
+    def neg_sharpe_ratio(self, weights):
+        return -self.sharpe_ratio(weights)
+
+    # returns, volatilities and Sharpe ratios for a matrix of portfolios (one per row)
+    def batch_metrics(self, weights):
+        weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+        rets = weights @ self.mean_returns
+        vols = np.sqrt(self.covariance.batch_quad_form(weights))
+        return rets, vols, (rets - self.risk_free_rate) / vols
+
+    # d/dw of -(mu'w - rf) / sqrt(w'Sw)
+    def neg_sharpe_grad(self, weights):
+        cov_w = self.covariance.matvec(weights)
+        vol = np.sqrt(weights @ cov_w)
+        excess = weights @ self.mean_returns - self.risk_free_rate
+        return -(self.mean_returns / vol - excess * cov_w / vol ** 3)
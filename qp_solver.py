@@ -0,0 +1,191 @@
+import numpy as np
+
+from collections import OrderedDict
+from scipy.linalg import cho_factor, cho_solve
+from scipy.optimize import OptimizeResult, linprog
+
+
+class FactorCache:
+    """
+    Factorizations of the covariance matrix Q reused across active-set
+    iterations and across solves.
+
+    Q is factored (and inverted) once. Systems with Q[F, F], F being the assets
+    not at a bound, are then solved through the Schur complement of the fixed
+    block B of Q^-1, which only needs a small |B| x |B| factor. When most assets
+    sit at a bound it is cheaper to factor Q[F, F] directly. Both kinds of small
+    factors are kept in an LRU dict keyed by the asset set, since along a
+    frontier the active set changes only one asset at a time.
+    """
+
+    def __init__(self, Q, max_size=256):
+        self.Q = np.ascontiguousarray(Q, dtype=np.float64)
+        self.factor = cho_factor(self.Q, lower=True, check_finite=False)
+        self.inverse = cho_solve(self.factor, np.eye(len(self.Q)), check_finite=False)
+        self.max_size = max_size
+        self._factors = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _small_factor(self, kind, mask, matrix):
+        key = (kind, np.packbits(mask).tobytes())
+        if key in self._factors:
+            self.hits += 1
+            self._factors.move_to_end(key)
+            return self._factors[key]
+
+        self.misses += 1
+        idx = np.flatnonzero(mask)
+        factor = cho_factor(matrix[np.ix_(idx, idx)], lower=True, check_finite=False)
+        self._factors[key] = factor
+        if len(self._factors) > self.max_size:
+            self._factors.popitem(last=False)  # drop the least recently used factor
+        return factor
+
+    def solve(self, free, rhs):
+        """Solve Q[F, F] y = rhs for the free mask F (rhs may be 1-D or 2-D)."""
+        n_fixed = len(free) - np.count_nonzero(free)
+        if n_fixed == 0:
+            return cho_solve(self.factor, rhs, check_finite=False)
+        if n_fixed > len(free) // 2:
+            return cho_solve(self._small_factor('free', free, self.Q), rhs, check_finite=False)
+
+        # (Q_FF)^-1 = H_FF - H_FB (H_BB)^-1 H_BF  with H = Q^-1
+        fixed = ~free
+        embedded = np.zeros((len(free),) + rhs.shape[1:])
+        embedded[free] = rhs
+        h_rhs = self.inverse @ embedded
+        correction = cho_solve(self._small_factor('fixed', fixed, self.inverse), h_rhs[fixed], check_finite=False)
+        return h_rhs[free] - self.inverse[:, fixed][free] @ correction
+
+
+def feasible_point(A, b, lower, upper):
+    """
+    Phase 1: find any x with A x = b and lower <= x <= upper (HiGHS LP).
+    Returns None when the constraints are infeasible.
+    """
+    n = A.shape[1]
+    result = linprog(np.zeros(n), A_eq=A, b_eq=b, bounds=list(zip(lower, upper)), method='highs')
+    return result.x if result.status == 0 else None
+
+
+def _is_feasible(x, A, b, lower, upper, tol):
+    return (np.all(x >= lower - tol) and np.all(x <= upper + tol)
+            and np.allclose(A @ x, b, atol=tol * 10, rtol=0))
+
+
+def _repair(x, A, b, lower, upper, tol, max_rounds=50):
+    """
+    Pull a point back onto A x = b by minimal-norm changes of the variables
+    strictly inside their bounds, clipping to the box after each round.
+    Returns None if no feasible point is reached.
+    """
+    x = np.clip(x, lower, upper)
+    for _ in range(max_rounds):
+        residual = b - A @ x
+        if np.max(np.abs(residual)) <= tol:
+            return x
+        free = (x > lower + tol) & (x < upper - tol)
+        A_f = A[:, free]
+        try:
+            delta = A_f.T @ np.linalg.solve(A_f @ A_f.T, residual)
+        except np.linalg.LinAlgError:
+            return None
+        x[free] += delta
+        x = np.clip(x, lower, upper)
+    return None
+
+
+def solve_box_qp(Q, c, A, b, lower, upper, x0=None, cache=None, tol=1e-10, max_iter=None):
+    """
+    Minimize 1/2 x'Qx + c'x  subject to  A x = b  and  lower <= x <= upper
+    with a primal active-set method. Q must be positive definite.
+
+    Bounds in the working set are held fixed; each iteration solves the
+    equality-constrained problem on the free variables with the factors in
+    `cache` and either steps to it, blocks on a new bound, or releases the
+    bound with the wrong-signed multiplier. Passing the previous solution as
+    `x0` warm-starts the solve, even when it violates the new equality
+    constraints (e.g. a different target return).
+
+    Returns a scipy OptimizeResult with x, fun, nit, success, status, message
+    and eq_multipliers.
+    """
+    A = np.atleast_2d(np.asarray(A, dtype=np.float64))
+    b = np.atleast_1d(np.asarray(b, dtype=np.float64))
+    c = np.asarray(c, dtype=np.float64)
+    n = len(c)
+    lower = np.broadcast_to(np.asarray(lower, dtype=np.float64), (n,))
+    upper = np.broadcast_to(np.asarray(upper, dtype=np.float64), (n,))
+    if cache is None:
+        cache = FactorCache(Q)
+    Q = cache.Q
+    if max_iter is None:
+        max_iter = 10 * n + 100
+
+    if x0 is None:
+        # Cold start from the solution with every bound ignored; clipping it
+        # gives a good guess of which bounds end up active
+        all_free = np.ones(n, dtype=bool)
+        inv_c, inv_at = cache.solve(all_free, c), cache.solve(all_free, A.T)
+        x0 = -(inv_c + inv_at @ np.linalg.solve(A @ inv_at, -(b + A @ inv_c)))
+
+    # Starting point: the (repaired) warm start if feasible, otherwise an LP vertex
+    x = _repair(np.asarray(x0, dtype=np.float64), A, b, lower, upper, tol)
+    if x is None or not _is_feasible(x, A, b, lower, upper, 1e-9):
+        x = feasible_point(A, b, lower, upper)
+        if x is None:
+            return OptimizeResult(x=None, fun=np.nan, nit=0, success=False, status=2,
+                                  message='Constraints are infeasible', eq_multipliers=None)
+
+    # Working set: +1 fixed at the upper bound, -1 at the lower bound, 0 free
+    state = np.zeros(n, dtype=np.int8)
+    state[x <= lower + tol] = -1
+    state[x >= upper - tol] = 1
+    if np.linalg.matrix_rank(A[:, state == 0]) < A.shape[0]:
+        state[:] = 0  # the warm start's active set is too large; start from no bounds fixed
+
+    lam = np.zeros(A.shape[0])
+    for iteration in range(1, max_iter + 1):
+        free = state == 0
+        fixed = ~free
+        x[state == -1] = lower[state == -1]
+        x[state == 1] = upper[state == 1]
+
+        # Equality-constrained QP on the free variables
+        x_fixed = np.where(fixed, x, 0.0)
+        A_f = A[:, free]
+        g = c[free] + (Q @ x_fixed)[free]
+        r = b - A @ x_fixed
+        inv_g = cache.solve(free, g)
+        inv_at = cache.solve(free, A_f.T)
+        lam = np.linalg.solve(A_f @ inv_at, -(r + A_f @ inv_g))
+        target = -(inv_g + inv_at @ lam)
+        step = target - x[free]
+
+        if np.max(np.abs(step), initial=0.0) <= tol:
+            # Stationary on the working set: check the bound multipliers
+            z = Q @ x + c + A.T @ lam
+            violation = np.where(state == -1, -z, np.where(state == 1, z, 0.0))
+            worst = np.argmax(violation)
+            if violation[worst] <= tol * max(1.0, np.abs(z).max()):
+                return OptimizeResult(x=x, fun=0.5 * x @ Q @ x + c @ x, nit=iteration, success=True,
+                                      status=0, message='Optimization terminated successfully',
+                                      eq_multipliers=lam)
+            state[worst] = 0
+            continue
+
+        # Move towards the target, stopping at the first bound that blocks
+        xf = x[free]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(step < 0, (lower[free] - xf) / step,
+                             np.where(step > 0, (upper[free] - xf) / step, np.inf))
+        blocking = np.argmin(ratio)
+        alpha = min(1.0, max(ratio[blocking], 0.0))
+        x[free] = xf + alpha * step
+        if alpha < 1.0:
+            j = np.flatnonzero(free)[blocking]
+            state[j] = -1 if step[blocking] < 0 else 1
+
+    return OptimizeResult(x=x, fun=0.5 * x @ Q @ x + c @ x, nit=max_iter, success=False, status=1,
+                          message='Iteration limit reached', eq_multipliers=lam)
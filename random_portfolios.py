@@ -0,0 +1,97 @@
+import numpy as np
+
+from optimizers import max_feasible_return
+
+# Monte-Carlo cloud of random portfolios for the efficient frontier chart.
+# Portfolios are drawn and evaluated in fixed-size chunks and only a 2-D
+# (volatility x return) histogram is kept, so memory does not grow with the
+# number of samples.
+
+
+def sample_weights(rng, size, n_assets, bounds=(-0.08, 0.1)):
+    """
+    Draw `size` random weight vectors inside the box bounds that sum to 1.
+
+    Each vector is drawn uniformly in the box, then the budget shortfall (or
+    excess) is spread over the assets in proportion to their room to the upper
+    (or lower) bound, which keeps every weight inside the bounds.
+    Returns an array of shape (size, n_assets).
+    """
+    lower, upper = bounds
+    if n_assets * lower > 1 or n_assets * upper < 1:
+        raise ValueError(f"No portfolio of {n_assets} assets sums to 1 within bounds {bounds}")
+
+    weights = rng.uniform(lower, upper, size=(size, n_assets))
+    gap = 1 - weights.sum(axis=1, keepdims=True)
+
+    room = np.where(gap > 0, upper - weights, weights - lower)
+    room_total = room.sum(axis=1, keepdims=True)
+    np.divide(gap, room_total, out=gap, where=room_total > 0)
+    weights += gap * room
+    return weights
+
+
+class PortfolioCloud:
+    """
+    Streaming 2-D histogram of random portfolios over (volatility, return),
+    plus the best Sharpe ratio seen. Samples outside the grid are only counted.
+    """
+
+    def __init__(self, vol_edges, return_edges):
+        self.vol_edges = vol_edges
+        self.return_edges = return_edges
+        self.counts = np.zeros((len(vol_edges) - 1, len(return_edges) - 1), dtype=np.int64)
+        self.n_samples = 0
+        self.n_outside = 0
+        self.best_sharpe = -np.inf
+        self.best_weights = None
+
+    def add(self, weights, rets, vols, sharpes):
+        counts, _, _ = np.histogram2d(vols, rets, bins=(self.vol_edges, self.return_edges))
+        self.counts += counts.astype(np.int64)
+        self.n_samples += len(rets)
+        self.n_outside += len(rets) - int(counts.sum())
+
+        best = np.argmax(sharpes)
+        if sharpes[best] > self.best_sharpe:
+            self.best_sharpe = sharpes[best]
+            self.best_weights = weights[best].copy()
+
+    def density(self):
+        """Share of all samples in each bin, same shape as counts."""
+        return self.counts / max(self.n_samples, 1)
+
+
+def random_portfolio_cloud(problem, n_samples=1_000_000, bounds=(-0.08, 0.1), chunk_size=50_000, bins=200,
+                           vol_range=None, return_range=None, seed=None):
+    """
+    Sample n_samples random portfolios within the bounds and aggregate their
+    volatility and return into a PortfolioCloud.
+
+    The return range defaults to the lowest / highest return reachable under the
+    bounds. The volatility range defaults to zero up to 1.25x the largest
+    volatility of the first chunk; later samples beyond it count as outside.
+    Peak memory is a few chunk_size x n_assets arrays whatever n_samples is.
+    """
+    rng = np.random.default_rng(seed)
+    n_assets = problem.n_assets
+
+    if return_range is None:
+        mean_returns = problem.mean_returns
+        return_range = (-max_feasible_return(-mean_returns, bounds), max_feasible_return(mean_returns, bounds))
+
+    cloud = None
+    remaining = n_samples
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        weights = sample_weights(rng, size, n_assets, bounds)
+        rets, vols, sharpes = problem.batch_metrics(weights)
+
+        if cloud is None:
+            if vol_range is None:
+                vol_range = (0.0, 1.25 * vols.max())
+            cloud = PortfolioCloud(np.linspace(*vol_range, bins + 1), np.linspace(*return_range, bins + 1))
+
+        cloud.add(weights, rets, vols, sharpes)
+        remaining -= size
+    return cloud
@@ -0,0 +1,49 @@
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+
+# Renders report charts, optionally in parallel.
+# A chart job is (function, args, kwargs) where function is one of the
+# plot_functions plotting functions (they draw on their own Figure, never on
+# pyplot's global state, so jobs are independent of each other and need no
+# particular backend).
+
+
+def _use_headless_backend():
+    # pool workers only: a worker never opens a window, and the caller's backend
+    # is left alone
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+
+
+def _render(job):
+    import matplotlib
+
+    function, args, kwargs = job
+    # restore rcParams afterwards so a style set by one chart does not leak into
+    # the next chart rendered by the same process
+    with matplotlib.rc_context():
+        function(*args, **kwargs)
+
+
+def render_charts(jobs, workers=None):
+    """
+    Render chart jobs to their image files.
+
+    workers=None or 1 renders in this process, without touching its matplotlib
+    backend; otherwise the jobs are spread over a process pool of headless
+    workers (workers=0 uses one process per CPU). Jobs finish in any order but
+    exceptions from any of them are raised here.
+    """
+    jobs = list(jobs)
+    if workers == 0:
+        workers = os.cpu_count() or 1
+
+    if workers is None or workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            _render(job)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=_use_headless_backend) as executor:
+        for _ in executor.map(_render, jobs):
+            pass
@@ -0,0 +1,90 @@
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+from efficient_frontier import frontier_weights
+from optimizers import max_feasible_return, minimum_variance_portfolio
+from portfolio_functions import PortfolioProblem
+from stock_functions import annualization_factor
+
+# Resampled (Michaud) efficient frontier.
+# The per-period returns are bootstrapped, a frontier of num_points portfolios is
+# solved for every resample, and the weights of the k-th point (k-th return
+# rank, from the resample's MVP to its highest attainable return) are averaged
+# over all resamples. The averaged portfolios are then evaluated with the
+# full-sample means and covariance.
+#
+# Every resample gets its own child of one np.random.SeedSequence, so the
+# result only depends on `seed`, never on the number of workers or the order in
+# which resamples finish.
+
+# Per-process state for resampling workers, set up once by _init_worker
+_worker = {}
+
+def _init_worker(returns, num_points, bounds, risk_free_rate, method, periods_per_year):
+    _worker.update(returns=returns, num_points=num_points, bounds=bounds, risk_free_rate=risk_free_rate,
+                   method=method, periods_per_year=periods_per_year)
+
+def _resample_frontier(returns, seed_sequence, num_points, bounds, risk_free_rate, method, periods_per_year):
+    """
+    Frontier weights (num_points x n_assets) for one bootstrap sample of the
+    rows of `returns`; rows of NaN where a point could not be solved.
+    """
+    rng = np.random.default_rng(seed_sequence)
+    sample = returns[rng.integers(0, len(returns), size=len(returns))]
+    problem = PortfolioProblem(sample.mean(axis=0) * periods_per_year,
+                               np.cov(sample, rowvar=False) * periods_per_year, risk_free_rate)
+
+    mvp = minimum_variance_portfolio(problem, bounds=bounds, method=method)
+    if not mvp.success:
+        return np.full((num_points, problem.n_assets), np.nan)
+    target_returns = np.linspace(problem.expected_return(mvp.x),
+                                 max_feasible_return(problem.mean_returns, bounds), num_points)
+    return frontier_weights(problem, target_returns, bounds, method=method)
+
+def _resample_task(seed_sequence):
+    return _resample_frontier(_worker['returns'], seed_sequence, _worker['num_points'], _worker['bounds'],
+                              _worker['risk_free_rate'], _worker['method'], _worker['periods_per_year'])
+
+def resampled_efficient_frontier(returns, num_points=100, n_resamples=500, bounds=(-0.08, 0.1), method='qp',
+                                 risk_free_rate=0.0193, seed=0, workers=None, periods_per_year=None):
+    """
+    Resampled efficient frontier from the (T x N) per-period returns.
+
+    Resamples run in a process pool when workers > 1; results are identical
+    for any number of workers. Points that failed in a resample are left out of
+    that rank's average. periods_per_year defaults to the frequency of a
+    returns DataFrame (monthly for a plain array).
+    Returns (frontier returns, frontier volatilities, averaged weights of shape
+    (num_points, n_assets)), all evaluated on the full sample.
+    """
+    if periods_per_year is None:
+        periods_per_year = annualization_factor(returns) if hasattr(returns, 'attrs') else 12
+    returns_array = np.ascontiguousarray(getattr(returns, 'values', returns), dtype=np.float64)
+    seeds = np.random.SeedSequence(seed).spawn(n_resamples)
+    settings = (num_points, tuple(bounds), risk_free_rate, method, periods_per_year)
+
+    total = np.zeros((num_points, returns_array.shape[1]))
+    solved = np.zeros(num_points, dtype=np.int64)
+
+    def accumulate(weights):
+        ok = ~np.isnan(weights).any(axis=1)
+        total[ok] += weights[ok]
+        solved[ok] += 1
+
+    if workers is None or workers <= 1:
+        for seed_sequence in seeds:
+            accumulate(_resample_frontier(returns_array, seed_sequence, *settings))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(returns_array,) + settings) as executor:
+            chunksize = max(1, n_resamples // (4 * workers))
+            for weights in executor.map(_resample_task, seeds, chunksize=chunksize):
+                accumulate(weights)
+
+    averaged = total / np.maximum(solved, 1)[:, None]
+    averaged = averaged[solved > 0]
+
+    problem = PortfolioProblem(returns_array.mean(axis=0) * periods_per_year,
+                               np.cov(returns_array, rowvar=False) * periods_per_year, risk_free_rate)
+    rets, vols, _ = problem.batch_metrics(averaged)
+    return rets, vols, averaged
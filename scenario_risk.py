@@ -0,0 +1,253 @@
+import time
+import numpy as np
+
+from group_constraints import group_inequalities
+from scipy.optimize import OptimizeResult, linprog, minimize
+
+# CVaR (expected shortfall) of portfolios on a scenario matrix: one row of
+# per-period asset returns per scenario, historical (stock_functions.simple_returns)
+# or simulated, as an ndarray, DataFrame or np.memmap. The returns must be
+# simple returns: the portfolio return in a scenario is w'r, which does not
+# hold for log returns.
+#
+# The scenarios are read in float32 chunks of `chunk_size` rows, so memory
+# stays at one chunk plus a few vectors with one value per scenario (losses,
+# tail weights), even for 100k+ scenarios.
+#
+# min_cvar_portfolio solves the Rockafellar-Uryasev LP
+#     min  alpha + 1 / ((1 - beta) S) * sum_s max(0, -r_s'w - alpha)
+# by cutting planes instead of building its S-row constraint matrix. CVaR is
+# the largest average loss over any (1 - beta) fraction of the scenarios, so
+# the tail of the current portfolio gives the linear cut
+#     cvar(w') >= -rbar_tail'w'   for every w'
+# that is exact at w. Every iteration is two chunked passes over the
+# scenarios plus small problems over (w, theta):
+#   - the next portfolio is a proximal bundle step: the cuts plus a quadratic
+#     penalty on the distance to the best portfolio so far (SLSQP), with cuts
+#     that stay inactive pruned. Plain cutting planes (Kelley) jump between
+#     vertices of the weight box and stall on large scenario sets.
+#   - lower bounds come from the LP minimizing the largest cut, and, whenever
+#     the best portfolio improves, from the RU LP with only the scenarios
+#     ranked around its VaR as rows (worse ones enter linearly, better ones
+#     are dropped). That relaxation is exact at the optimum, so it closes the
+#     gap the cuts alone leave.
+# The search stops when the best CVaR is within a relative `tol` of the lower
+# bound. The historical data takes about 30 iterations; synthetic 20k-100k x 25
+# scenario sets take 90-130 iterations (3-7 s), 100k x 50 about 210 (20-25 s).
+
+# Scenarios read per chunk (rows)
+SCENARIO_CHUNK_SIZE = 20_000
+
+# First proximal step length, as a fraction of the widest weight bound
+PROXIMAL_STEP = 0.1
+
+# Cuts that were not active in this many proximal steps in a row are dropped
+# from the proximal problem (the lower-bound LP keeps all of them)
+PRUNE_AFTER = 20
+
+# Scenarios on each side of the VaR kept as rows in the lower bound around
+# the best portfolio, per asset (plus one)
+BAND_PER_ASSET = 2
+
+
+def _chunks(scenarios, chunk_size):
+    """(start, float32 block) pairs covering the rows of `scenarios`."""
+    scenarios = getattr(scenarios, 'values', scenarios)
+    for start in range(0, len(scenarios), chunk_size):
+        yield start, np.asarray(scenarios[start:start + chunk_size], dtype=np.float32)
+
+
+def scenario_losses(scenarios, weights, chunk_size=SCENARIO_CHUNK_SIZE):
+    """Portfolio loss (minus the return) in every scenario, as float64."""
+    weights = np.asarray(weights, dtype=np.float64)
+    losses = np.empty(len(scenarios))
+    for start, chunk in _chunks(scenarios, chunk_size):
+        losses[start:start + len(chunk)] = -(chunk @ weights)
+    return losses
+
+
+def _tail(losses, beta):
+    """
+    Probability weights of the worst (1 - beta) fraction of the scenarios
+    (fractional for the scenario on the boundary), with the VaR and CVaR.
+    """
+    size = (1 - beta) * len(losses)
+    whole = int(np.floor(size))
+    worst = np.argpartition(-losses, min(whole, len(losses) - 1))[:whole + 1]
+    worst = worst[np.argsort(-losses[worst], kind='stable')]
+    tail = np.zeros(len(losses))
+    tail[worst[:whole]] = 1.0
+    if whole < len(worst):
+        tail[worst[whole]] = size - whole
+    tail /= size
+    return tail, losses[worst[min(whole, len(worst) - 1)]], tail @ losses
+
+
+def portfolio_cvar(weights, scenarios, beta=0.95, chunk_size=SCENARIO_CHUNK_SIZE):
+    """
+    (VaR, CVaR) of a portfolio at confidence `beta`, as positive losses per
+    period of the scenarios.
+    """
+    _, var, cvar = _tail(scenario_losses(scenarios, weights, chunk_size), beta)
+    return var, cvar
+
+
+def min_cvar_portfolio(scenarios, bounds=(-0.08, 0.1), beta=0.95, min_return=None, group_constraints=None,
+                       chunk_size=SCENARIO_CHUNK_SIZE, tol=1e-6, max_iter=500):
+    """
+    Minimum CVaR portfolio at confidence `beta` under the budget constraint,
+    box bounds and optional group constraints. min_return is a floor on the
+    mean scenario return (per period, like the scenarios).
+
+    Returns an OptimizeResult with result.x the weights, result.fun the CVaR and
+    result.var the VaR; status 0 if the gap to result.lower_bound closed to
+    `tol`, 1 at max_iter, 2 if the constraints are infeasible.
+    """
+    if not 0 < beta < 1:
+        raise ValueError(f"beta must be between 0 and 1, got {beta}")
+    start_time = time.perf_counter()
+    n_assets = np.shape(scenarios)[1]
+    lower, upper = (np.broadcast_to(np.asarray(side, dtype=np.float64), (n_assets,)) for side in bounds)
+
+    # rows of A_ub @ (w, theta) <= b_ub besides the cuts
+    fixed_rows, fixed_limits = [], []
+    mean_returns = None
+    if min_return is not None:
+        mean_returns = np.zeros(n_assets)
+        for _, chunk in _chunks(scenarios, chunk_size):
+            mean_returns += chunk.sum(axis=0, dtype=np.float64)
+        mean_returns /= len(scenarios)
+        fixed_rows.append(np.append(-mean_returns, 0.0))
+        fixed_limits.append(-min_return)
+    inequalities = group_inequalities(group_constraints)
+    if inequalities is not None:
+        A_ub, b_ub = inequalities
+        fixed_rows.extend(np.hstack([A_ub.toarray(), np.zeros((A_ub.shape[0], 1))]))
+        fixed_limits.extend(b_ub)
+
+    fixed_rows = np.array(fixed_rows).reshape(-1, n_assets + 1)
+    fixed_limits = np.array(fixed_limits, dtype=np.float64)
+    cost = np.append(np.zeros(n_assets), 1.0)
+    A_eq = np.append(np.ones(n_assets), 0.0)[None, :]
+    variable_bounds = np.vstack([np.column_stack([lower, upper]), [-np.inf, np.inf]])
+    cuts = []
+
+    tail_size = (1 - beta) * len(scenarios)
+    band_size = BAND_PER_ASSET * (n_assets + 1)
+
+    def add_cut(weights):
+        """Evaluate the portfolio and add its cut; returns (cvar, var, losses)."""
+        losses = scenario_losses(scenarios, weights, chunk_size)
+        tail, var, cvar = _tail(losses, beta)
+        tail_return = np.zeros(n_assets)  # rbar_tail = sum_s tail_s r_s
+        for start, chunk in _chunks(scenarios, chunk_size):
+            tail_return += tail[start:start + len(chunk)] @ chunk
+        cuts.append(np.append(-tail_return, -1.0))
+        return cvar, var, losses
+
+    def band_bound(losses):
+        """
+        Lower bound from the RU LP with the scenarios ranked around the VaR of
+        `losses` kept as rows, the worse ones entering linearly and the better
+        ones dropped. Exact when `losses` are those of the optimum.
+        """
+        order = np.argsort(-losses, kind='stable')
+        split = max(0, int(np.floor(tail_size)) - band_size)
+        above, band = order[:split], np.sort(order[split:split + 2 * band_size + 1])
+        in_above = np.zeros(len(losses), dtype=bool)
+        in_above[above] = True
+        above_return = np.zeros(n_assets)
+        for start, chunk in _chunks(scenarios, chunk_size):
+            above_return += chunk[in_above[start:start + len(chunk)]].sum(axis=0, dtype=np.float64)
+        band_returns = np.asarray(getattr(scenarios, 'values', scenarios)[band], dtype=np.float64)
+
+        # variables (w, alpha, u): alpha + (sum_above (-r_s'w - alpha) + sum_band u_s) / tail_size
+        size = len(band)
+        lp = linprog(np.concatenate([-above_return / tail_size, [1 - split / tail_size], np.full(size, 1 / tail_size)]),
+                     A_ub=np.vstack([np.hstack([fixed_rows, np.zeros((len(fixed_rows), size))]),
+                                     np.hstack([-band_returns, -np.ones((size, 1)), -np.eye(size)])]),
+                     b_ub=np.append(fixed_limits, np.zeros(size)),
+                     A_eq=np.append(A_eq[0], np.zeros(size))[None, :], b_eq=[1.0],
+                     bounds=np.vstack([variable_bounds, np.column_stack([np.zeros(size), np.full(size, np.inf)])]),
+                     method='highs')
+        return lp.fun if lp.status == 0 else -np.inf
+
+    def proximal_step(center, bundle, weight):
+        """argmin over (w, theta) of theta + weight / 2 * |w - center|^2 above the bundle's cuts."""
+        rows = np.vstack([fixed_rows, np.array(cuts)[bundle]])
+        limits = np.append(fixed_limits, np.zeros(len(bundle)))
+        constraints = [{'type': 'ineq', 'fun': lambda z: limits - rows @ z, 'jac': lambda z: -rows},
+                       {'type': 'eq', 'fun': lambda z: A_eq[0] @ z - 1, 'jac': lambda z: A_eq[0]}]
+        start = np.append(center, np.max(np.array(cuts)[bundle, :n_assets] @ center))
+        return minimize(lambda z: z[-1] + weight / 2 * np.sum((z[:-1] - center) ** 2), start,
+                        jac=lambda z: np.append(weight * (z[:-1] - center), 1.0), method='SLSQP',
+                        constraints=constraints, bounds=variable_bounds, options={'ftol': 1e-15, 'maxiter': 500})
+
+    add_cut(np.full(n_assets, 1 / n_assets))  # any portfolio gives a valid first cut
+    center = None  # (cvar, var, weights) of the best portfolio so far
+    bundle, idle = [0], {0: 0}  # cuts in the proximal problem, iterations since each was last active
+    lower_bound = -np.inf
+    status, message = 1, 'Iteration limit reached'
+    for iteration in range(1, max_iter + 1):
+        # global lower bound from all cuts (Kelley's LP)
+        lp = linprog(cost, A_ub=np.vstack([fixed_rows, cuts]), b_ub=np.append(fixed_limits, np.zeros(len(cuts))),
+                     A_eq=A_eq, b_eq=[1.0], bounds=variable_bounds, method='highs')
+        if lp.status != 0:
+            status, message = 2, f"Master LP failed: {lp.message}"
+            break
+        lower_bound = max(lower_bound, lp.fun)
+        if center is None:
+            # the first center is the LP solution, feasible for every constraint
+            candidate = lp.x[:n_assets]
+            cvar, var, losses = add_cut(candidate)
+            center = (cvar, var, candidate)
+            lower_bound = max(lower_bound, band_bound(losses))
+            bundle.append(len(cuts) - 1)
+            idle[len(cuts) - 1] = 0
+            weight = np.linalg.norm(cuts[-1][:n_assets]) / (PROXIMAL_STEP * np.max(upper - lower))
+            continue
+        if center[0] - lower_bound <= tol * max(abs(center[0]), 1e-8):
+            status, message = 0, 'Optimization terminated successfully'
+            break
+
+        step = proximal_step(center[2], bundle, weight)
+        candidate, model = (step.x[:n_assets], step.x[-1]) if step.success else (lp.x[:n_assets], lp.fun)
+        predicted = center[0] - model
+        slack = model - np.array(cuts)[bundle, :n_assets] @ candidate
+        for j, gap in zip(bundle, slack):
+            idle[j] = 0 if gap <= 1e-9 * max(abs(model), 1e-12) else idle[j] + 1
+        bundle = [j for j in bundle if idle[j] < PRUNE_AFTER]
+
+        cvar, var, losses = add_cut(candidate)
+        bundle.append(len(cuts) - 1)
+        idle[len(cuts) - 1] = 0
+        if center[0] - cvar >= 0.1 * predicted:
+            # serious step: move the center, and allow longer steps after a good one
+            if center[0] - cvar >= 0.5 * predicted:
+                weight /= 2
+            center = (cvar, var, candidate)
+            lower_bound = max(lower_bound, band_bound(losses))
+        else:
+            # null step: the new cut refines the model, take shorter steps
+            weight *= 1.5
+
+    if center is None:
+        result = OptimizeResult(x=np.full(n_assets, np.nan), fun=np.inf, var=np.inf, success=False, status=status,
+                                message=message)
+    else:
+        cvar, var, weights = center
+        result = OptimizeResult(x=weights, fun=cvar, var=var, success=status == 0, status=status, message=message)
+    result.nit = iteration
+    result.nfev = len(cuts)
+    result.lower_bound = lower_bound
+    result.beta = beta
+
+    violation = max(abs(result.x.sum() - 1), np.max(lower - result.x), np.max(result.x - upper), 0.0)
+    if mean_returns is not None:
+        violation = max(violation, min_return - mean_returns @ result.x)
+    if inequalities is not None:
+        violation = max(violation, np.max(inequalities[0] @ result.x - inequalities[1]))
+    result.wall_time = time.perf_counter() - start_time
+    result.method = 'lp'
+    result.constraint_violation = float(violation)
+    return result
@@ -0,0 +1,46 @@
+import os
+import pandas as pd
+
+from universe import security_master_path
+
+# Security master: one row of static metadata per ticker (company, market cap,
+# rating, sector, industry, country), kept in a CSV file next to universe.py.
+#
+# The file is parsed once per process and cached until it changes on disk. The
+# table is indexed by ticker, and the grouping columns are categorical, so
+# aligning metadata to any ticker list is a hash-index lookup and grouping
+# works on integer codes instead of strings.
+
+CATEGORICAL_COLUMNS = ('Credit_Rating', 'Sector', 'Industry', 'Country')
+
+# (path, modification time) -> master DataFrame
+_cache = {}
+
+
+def load_security_master(file_path=security_master_path):
+    """
+    The security master as a DataFrame indexed by 'Ticker'. Parsed on the first
+    call and whenever the file's modification time changes; treat the returned
+    frame as read-only, it is shared between callers.
+    """
+    mtime = os.path.getmtime(file_path)
+    key = os.path.abspath(file_path)
+    cached = _cache.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    master = pd.read_csv(file_path, index_col='Ticker',
+                         dtype={column: 'category' for column in CATEGORICAL_COLUMNS})
+    if not master.index.is_unique:
+        duplicates = sorted(set(master.index[master.index.duplicated()]))
+        raise ValueError(f"Duplicate tickers in {file_path}: {duplicates}")
+
+    _cache[key] = (mtime, master)
+    return master
+
+
+def security_metadata(tickers, file_path=security_master_path):
+    """
+    Metadata rows for `tickers`, in that order (NaN for tickers not in the master).
+    """
+    return load_security_master(file_path).reindex(tickers)
@@ -0,0 +1,97 @@
+import json
+import time
+import pandas as pd
+
+# Telemetry for optimizer calls.
+# Every optimizers.* function attaches wall_time, method and constraint_violation
+# to its OptimizeResult; solve_record() turns such a result into a plain dict
+# (picklable, so frontier workers can send records back), and SolverMetrics
+# collects the records of a run and can append each one to a JSON-lines log.
+
+# Fields of every record; anything else in a record is caller context
+RESULT_FIELDS = ('name', 'method', 'fallback', 'success', 'status', 'message', 'wall_time', 'nit', 'nfev',
+                 'constraint_violation')
+
+# Solves slower than this many seconds are counted as slow in the summary
+SLOW_SOLVE_SECONDS = 1.0
+
+
+def solve_record(name, result, requested_method=None, **context):
+    """
+    Plain dict describing one optimizer result. `context` adds fields such as
+    the target return or the rebalance date.
+    """
+    record = {
+        'name': name,
+        'method': result.get('method'),
+        'fallback': requested_method is not None and result.get('method') != requested_method,
+        'success': bool(result.success),
+        'status': int(result.status) if result.get('status') is not None else None,
+        'message': str(result.get('message', '')),
+        'wall_time': result.get('wall_time'),
+        'nit': int(result.nit) if result.get('nit') is not None else None,
+        'nfev': int(result.nfev) if result.get('nfev') is not None else None,
+        'constraint_violation': result.get('constraint_violation'),
+    }
+    record.update(context)
+    return record
+
+
+class SolverMetrics:
+    """
+    Collects solve records for a run. With log_path every record is also
+    appended to that file as one JSON object per line, with a timestamp.
+    """
+
+    def __init__(self, log_path=None):
+        self.log_path = log_path
+        self.records = []
+
+    def __len__(self):
+        return len(self.records)
+
+    def record(self, name, result, requested_method=None, **context):
+        """Record an optimizer result and return its record."""
+        record = solve_record(name, result, requested_method, **context)
+        self.add(record)
+        return record
+
+    def add(self, *records):
+        """Add records made by solve_record (e.g. returned from worker processes)."""
+        self.records.extend(records)
+        if self.log_path and records:
+            timestamp = time.strftime('%Y-%m-%dT%H:%M:%S')
+            with open(self.log_path, 'a') as f:
+                for record in records:
+                    f.write(json.dumps({'time': timestamp, **record}, default=str) + '\n')
+
+    def failures(self):
+        return [record for record in self.records if not record['success']]
+
+    def to_frame(self):
+        return pd.DataFrame(self.records)
+
+    def summary(self):
+        """Counts and worst cases over all records."""
+        times = [r['wall_time'] for r in self.records if r['wall_time'] is not None]
+        violations = [r['constraint_violation'] for r in self.records if r['constraint_violation'] is not None]
+        return {
+            'solves': len(self.records),
+            'failures': len(self.failures()),
+            'fallbacks': sum(r['fallback'] for r in self.records),
+            'slow': sum(t > SLOW_SOLVE_SECONDS for t in times),
+            'total_time': sum(times),
+            'max_time': max(times, default=0.0),
+            'max_constraint_violation': max(violations, default=0.0),
+        }
+
+    def report(self):
+        """One-line summary, followed by a line per failed solve."""
+        s = self.summary()
+        lines = [f"Solver metrics: {s['solves']} solves in {s['total_time']:.3f}s "
+                 f"(max {s['max_time']:.3f}s, {s['slow']} slow), {s['failures']} failed, "
+                 f"{s['fallbacks']} fell back to SLSQP, max constraint violation {s['max_constraint_violation']:.2e}"]
+        for record in self.failures():
+            context = {k: v for k, v in record.items() if k not in RESULT_FIELDS}
+            lines.append(f"  FAILED {record['name']} {context}: status {record['status']}, {record['message']}")
+        return '\n'.join(lines)
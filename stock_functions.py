@@ -1,10 +1,160 @@
 import pandas as pd
 import numpy as np
 
+from covariance import LowRankCovariance
+
+# Periods per year for the sampling frequencies we download, keyed by the
+# largest median spacing (in days) between two observations of that frequency
+PERIODS_PER_YEAR = (
+    (1.5, 252),   # daily (trading days)
+    (10, 52),     # weekly
+    (45, 12),     # monthly
+    (120, 4),     # quarterly
+    (np.inf, 1),  # yearly
+)
+
+def periods_per_year(index):
+    """
+    Number of observations per year implied by a DatetimeIndex, from the median
+    spacing between dates. Anything without dates is assumed to be monthly.
+    """
+    if not isinstance(index, pd.DatetimeIndex) or len(index) < 2:
+        return 12
+    spacing_days = np.median(np.diff(index.values)) / np.timedelta64(1, "D")
+    for max_days, periods in PERIODS_PER_YEAR:
+        if spacing_days <= max_days:
+            return periods
+
+def annualization_factor(returns):
+    """Periods per year of a returns DataFrame (set by compute_returns, else from its index)."""
+    return returns.attrs.get('periods_per_year') or periods_per_year(returns.index)
+
+def compute_returns(adj_close_df, kind='simple', dtype=np.float64):
+    """
+    Per-period returns of a price DataFrame, either 'simple' (P_t / P_{t-1} - 1)
+    or 'log' (log(P_t / P_{t-1})). Rows with a missing price are dropped.
+
+    The ratios are computed with numpy into a single preallocated array of
+    `dtype` and transformed in place (float32 halves the memory for daily data).
+    The result records its return kind and periods per year in `.attrs`.
+    """
+    if kind not in ('simple', 'log'):
+        raise ValueError(f"Unknown return kind: {kind}")
+    prices = np.asarray(adj_close_df.to_numpy(), dtype=dtype)
+
+    returns = np.empty((len(prices) - 1, prices.shape[1]), dtype=dtype)
+    np.divide(prices[1:], prices[:-1], out=returns)
+    if kind == 'simple':
+        returns -= 1
+    else:
+        np.log(returns, out=returns)
+
+    keep = ~np.isnan(returns).any(axis=1)
+    index = adj_close_df.index[1:]
+    if not keep.all():
+        returns, index = returns[keep], index[keep]
+
+    returns_df = pd.DataFrame(returns, index=index, columns=adj_close_df.columns, copy=False)
+    returns_df.attrs['return_kind'] = kind
+    returns_df.attrs['periods_per_year'] = periods_per_year(adj_close_df.index)
+    return returns_df
+
 def simple_returns(adj_close_df):
-    s_simple_returns = adj_close_df.pct_change()  # (P_t - P_{t-1}) / P_{t-1}
-    s_simple_returns = s_simple_returns.dropna()  # Drop NaN from first row
-    return s_simple_returns
+    return compute_returns(adj_close_df, kind='simple')  # (P_t - P_{t-1}) / P_{t-1}, first row dropped
+
+def log_returns(adj_close_df):
+    return compute_returns(adj_close_df, kind='log')  # log(P_t / P_{t-1}), first row dropped
+
+def covariance_matrix(simple_returns, method='sample', **kwargs):
+    """
+    Annualized covariance matrix of the returns (the annualization factor is
+    taken from the returns' frequency, see annualization_factor).
+
+    method:
+        'sample'                raw sample covariance (the default)
+        'ledoit_wolf'           shrinkage towards a scaled identity
+        'constant_correlation'  shrinkage towards the constant-correlation matrix
+        'factor'                low-rank-plus-diagonal factor model (n_factors=...),
+                                returned as a covariance.LowRankCovariance
+    The sample and shrinkage estimators return a DataFrame like .cov() does.
+    """
+    periods = annualization_factor(simple_returns)
+    if method == 'sample':
+        return simple_returns.cov() * periods
+    if method == 'ledoit_wolf':
+        cov = ledoit_wolf_shrinkage(simple_returns.to_numpy())
+    elif method == 'constant_correlation':
+        cov = constant_correlation_shrinkage(simple_returns.to_numpy())
+    elif method == 'factor':
+        return factor_model_covariance(simple_returns.to_numpy(), index=simple_returns.columns, **kwargs).scaled(periods)
+    else:
+        raise ValueError(f"Unknown covariance method: {method}")
+    return pd.DataFrame(cov * periods, index=simple_returns.columns, columns=simple_returns.columns)
+
+def ledoit_wolf_shrinkage(returns):
+    """
+    Ledoit-Wolf (2004) shrinkage of the sample covariance towards mu * I, mu being
+    the average variance. Works on a (T x N) array of per-period returns and
+    returns the per-period (not annualized) N x N estimate.
+    """
+    x = returns - returns.mean(axis=0)
+    t, n = x.shape
+    sample = x.T @ x / t
+    mu = np.trace(sample) / n
+
+    # distance of the sample to the target, and how noisy the sample itself is
+    d2 = (np.sum(sample ** 2) - 2 * mu * np.trace(sample) + n * mu ** 2) / n
+    b2_bar = (np.sum(np.sum(x ** 2, axis=1) ** 2) - t * np.sum(sample ** 2)) / (t ** 2 * n)
+    b2 = min(b2_bar, d2)
+    shrinkage = b2 / d2 if d2 > 0 else 1.0
+
+    return shrinkage * mu * np.eye(n) + (1 - shrinkage) * sample
+
+def constant_correlation_shrinkage(returns):
+    """
+    Ledoit-Wolf (2003) shrinkage of the sample covariance towards the matrix with
+    the sample variances and a single average correlation. Works on a (T x N)
+    array of per-period returns and returns the per-period N x N estimate.
+    """
+    x = returns - returns.mean(axis=0)
+    t, n = x.shape
+    sample = x.T @ x / t
+    var = np.diag(sample)
+    sqrt_var = np.sqrt(var)
+
+    corr = sample / np.outer(sqrt_var, sqrt_var)
+    r_bar = (corr.sum() - n) / (n * (n - 1))
+    prior = r_bar * np.outer(sqrt_var, sqrt_var)
+    np.fill_diagonal(prior, var)
+
+    # pi: asymptotic variance of the sample covariance entries
+    pi_mat = (x ** 2).T @ (x ** 2) / t - sample ** 2
+    pi = pi_mat.sum()
+
+    # rho: asymptotic covariance between the target and the sample
+    theta_mat = (x ** 3).T @ x / t - var[:, None] * sample
+    np.fill_diagonal(theta_mat, 0)
+    rho = np.trace(pi_mat) + r_bar * np.sum(np.outer(1 / sqrt_var, sqrt_var) * theta_mat)
+
+    gamma = np.sum((sample - prior) ** 2)
+    shrinkage = max(0.0, min(1.0, (pi - rho) / gamma / t)) if gamma > 0 else 1.0
+
+    return shrinkage * prior + (1 - shrinkage) * sample
+
+def factor_model_covariance(returns, n_factors=5, index=None, min_specific_var=1e-10):
+    """
+    Statistical (PCA) factor model of the per-period covariance: the top
+    n_factors principal components give the loadings, the rest of each asset's
+    variance is kept as specific variance. Uses an SVD of the (T x N) returns,
+    so the N x N sample covariance is never formed.
+    """
+    x = returns - returns.mean(axis=0)
+    t, n = x.shape
+    n_factors = min(n_factors, t - 1, n)
+
+    _, s, vt = np.linalg.svd(x, full_matrices=False)
+    loadings = vt[:n_factors].T * (s[:n_factors] / np.sqrt(t - 1))
 
-def covariance_matrix(simple_returns):
-    return simple_returns.cov() * 12  # Annualize covariance matrix assuming 12 months
+    total_var = np.sum(x ** 2, axis=0) / (t - 1)
+    specific_var = np.maximum(total_var - np.sum(loadings ** 2, axis=1), min_specific_var)
+    return LowRankCovariance(loadings, specific_var, index=index)
@@ -0,0 +1,30 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from portfolio_functions import PortfolioProblem  # noqa: E402
+
+
+def make_returns(n_assets=12, n_periods=120, freq='ME', seed=0):
+    """Per-period returns from a small factor model, as a dated DataFrame."""
+    rng = np.random.default_rng(seed)
+    factors = rng.normal(0.005, 0.04, size=(n_periods, 3))
+    loadings = rng.normal(0.0, 0.5, size=(3, n_assets))
+    returns = factors @ loadings + rng.normal(0.006, 0.05, size=(n_periods, n_assets))
+    index = pd.date_range('2010-01-31', periods=n_periods, freq=freq)
+    return pd.DataFrame(returns, index=index, columns=[f"A{i:02d}" for i in range(n_assets)])
+
+
+@pytest.fixture
+def returns():
+    return make_returns()
+
+
+@pytest.fixture
+def problem(returns):
+    return PortfolioProblem.from_returns(returns, returns.cov() * 12)
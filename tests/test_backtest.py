@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import RollingMoments, rolling_backtest
+from optimizers import max_sharpe_portfolio
+from portfolio_functions import PortfolioProblem
+
+
+def test_rolling_moments_match_a_direct_recompute(returns):
+    data = returns.to_numpy()
+    window = 36
+    moments = RollingMoments(data.shape[1])
+    moments.reset(data[:window])
+    for t in range(window, len(data)):
+        moments.add(data[t])
+        moments.remove(data[t - window])
+        rows = data[t - window + 1:t + 1]
+        assert np.allclose(moments.mean(), rows.mean(axis=0), atol=1e-12)
+        assert np.allclose(moments.cov(), np.cov(rows, rowvar=False), atol=1e-12)
+
+
+def test_rolling_moments_built_row_by_row():
+    rows = np.random.default_rng(3).normal(size=(20, 4))
+    moments = RollingMoments(4)
+    for row in rows:
+        moments.add(row)
+    assert moments.count == 20
+    assert np.allclose(moments.cov(), pd.DataFrame(rows).cov().to_numpy(), atol=1e-12)
+
+
+@pytest.mark.parametrize('recompute_every', [1, 5, 120])
+def test_backtest_uses_the_trailing_window(returns, recompute_every):
+    window = 36
+    portfolio, weights = rolling_backtest(returns, window=window, rebalance_every=12, bounds=(-0.08, 0.2),
+                                          recompute_every=recompute_every)
+    assert len(portfolio) == len(returns) - window
+    assert list(weights.index) == list(returns.index[window::12])
+
+    # each rebalance equals a fresh solve on a DataFrame.cov() of the window
+    for date, row in weights.iloc[:3].iterrows():
+        t = returns.index.get_loc(date)
+        history = returns.iloc[t - window:t]
+        problem = PortfolioProblem.from_returns(history, history.cov() * 12)
+        expected = max_sharpe_portfolio(problem, (-0.08, 0.2), method='qp')
+        assert np.allclose(row.to_numpy(), expected.x, atol=1e-6)
+    assert portfolio.iloc[0] == pytest.approx(weights.iloc[0].to_numpy() @ returns.iloc[window].to_numpy())
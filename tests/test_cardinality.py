@@ -0,0 +1,76 @@
+import itertools
+import numpy as np
+import pytest
+
+from cardinality import _solve_support, cardinality_portfolio
+from conftest import make_returns
+from group_constraints import GroupConstraints, GroupMembership
+from portfolio_functions import PortfolioProblem
+
+
+@pytest.fixture
+def small_problem():
+    returns = make_returns(n_assets=9, seed=4)
+    return PortfolioProblem.from_returns(returns, returns.cov() * 12)
+
+
+def brute_force(problem, max_assets, bounds, min_position, objective):
+    """Best score over every support of at most max_assets names."""
+    lower, upper = (np.broadcast_to(np.asarray(side, dtype=np.float64), (problem.n_assets,)) for side in bounds)
+    settings = (problem.mean_returns, problem.covariance.to_dense(), problem.risk_free_rate,
+                lower, upper, min_position, objective, 'slsqp')
+    scores = [solved[0] for size in range(1, max_assets + 1)
+              for support in itertools.combinations(range(problem.n_assets), size)
+              if (solved := _solve_support(support, *settings)) is not None]
+    return max(scores)
+
+
+@pytest.mark.parametrize('objective, bounds, min_position', [('sharpe', (0.0, 0.5), 0.0),
+                                                             ('sharpe', (-0.1, 0.5), 0.05),
+                                                             ('variance', (0.0, 0.5), 0.1)])
+def test_local_search_finds_the_best_support(small_problem, objective, bounds, min_position):
+    max_assets = 4
+    result = cardinality_portfolio(small_problem, max_assets, min_position, bounds, objective=objective,
+                                   time_limit=60.0, restarts=20)
+    assert result.status == 0 and result.success
+    assert -result.fun == pytest.approx(brute_force(small_problem, max_assets, bounds, min_position, objective),
+                                        rel=1e-6)
+
+    held = np.flatnonzero(result.x)
+    assert len(held) <= max_assets and set(held) <= set(result.support)
+    assert np.all(np.abs(result.x[held]) >= min_position - 1e-9)
+    assert result.x.sum() == pytest.approx(1.0)
+    assert np.all(result.x >= bounds[0] - 1e-9) and np.all(result.x <= bounds[1] + 1e-9)
+
+
+def test_workers_do_not_change_the_result(problem):
+    sequential = cardinality_portfolio(problem, 5, bounds=(0.0, 0.3), time_limit=60.0, seed=1)
+    parallel = cardinality_portfolio(problem, 5, bounds=(0.0, 0.3), time_limit=60.0, seed=1, workers=2)
+    assert sequential.status == parallel.status == 0
+    assert list(parallel.support) == list(sequential.support)
+    assert np.allclose(parallel.x, sequential.x)
+
+
+def test_too_few_names_to_be_invested(problem):
+    with pytest.raises(ValueError):
+        cardinality_portfolio(problem, 3, bounds=(0.0, 0.3))
+
+
+def test_no_feasible_support(small_problem):
+    # two names of at least 60% hold more than 100%, one name at most 60%
+    result = cardinality_portfolio(small_problem, 2, min_position=0.6, bounds=(0.0, 0.6), time_limit=5.0)
+    assert result.status == 2 and not result.success
+
+
+def test_group_limits_apply_to_the_held_names(problem):
+    sectors = GroupMembership(np.repeat(np.eye(3), 4, axis=1), ['A', 'B', 'C'], name='Sector')  # 4 names each
+    unconstrained = cardinality_portfolio(problem, 6, bounds=(0.0, 0.4), time_limit=60.0)
+    cap = sectors.exposures(unconstrained.x).max() - 0.1
+    limits = GroupConstraints(sectors, upper=cap)
+
+    result = cardinality_portfolio(problem, 6, bounds=(0.0, 0.4), time_limit=60.0, group_constraints=limits,
+                                   workers=2)
+    assert result.success and len(result.support) <= 6
+    assert sectors.exposures(result.x).max() <= cap + 1e-8
+    assert result.constraint_violation < 1e-8
+    assert -result.fun < -unconstrained.fun
@@ -0,0 +1,56 @@
+import numpy as np
+import scipy.sparse as sp
+import pytest
+
+from covariance import DenseCovariance, LowRankCovariance, SparseCovariance, as_covariance
+from stock_functions import factor_model_covariance
+
+
+def low_rank(n_assets=50, n_factors=4, seed=0):
+    rng = np.random.default_rng(seed)
+    return LowRankCovariance(rng.normal(0, 0.1, size=(n_assets, n_factors)), rng.uniform(0.001, 0.01, n_assets))
+
+
+def block_diagonal(n_blocks=5, block=8, seed=0):
+    rng = np.random.default_rng(seed)
+    blocks = []
+    for _ in range(n_blocks):
+        factor = rng.normal(size=(block, block)) * 0.1
+        blocks.append(factor @ factor.T + 0.01 * np.eye(block))
+    return SparseCovariance(sp.block_diag(blocks))
+
+
+@pytest.mark.parametrize('cov', [low_rank(), block_diagonal()], ids=['low_rank', 'sparse'])
+def test_operations_match_the_dense_matrix(cov):
+    dense = DenseCovariance(cov.to_dense())
+    rng = np.random.default_rng(1)
+    weights = rng.normal(size=len(cov))
+    batch = rng.normal(size=(7, len(cov)))
+    rhs = rng.normal(size=(len(cov), 3))
+
+    assert np.allclose(cov.matvec(weights), dense.matvec(weights), atol=1e-12)
+    assert cov.quad_form(weights) == pytest.approx(dense.quad_form(weights), rel=1e-12)
+    assert np.allclose(cov.batch_quad_form(batch), dense.batch_quad_form(batch), rtol=1e-12)
+    assert np.allclose(cov.diagonal(), dense.diagonal(), rtol=1e-12)
+    assert np.allclose(cov.scaled(12).to_dense(), dense.matrix * 12, rtol=1e-12)
+    # Woodbury / sparse LU against a dense solve, for a vector and a matrix right-hand side
+    assert np.allclose(cov.solve(weights), np.linalg.solve(dense.matrix, weights), rtol=1e-8)
+    assert np.allclose(cov.solve(rhs), np.linalg.solve(dense.matrix, rhs), rtol=1e-8)
+
+
+def test_factor_model_keeps_the_sample_variances(returns):
+    x = returns.to_numpy()
+    cov = factor_model_covariance(x, n_factors=3)
+    assert cov.loadings.shape == (x.shape[1], 3)
+    assert np.allclose(cov.diagonal(), x.var(axis=0, ddof=1))
+    # with every factor kept the model is the sample covariance
+    full = factor_model_covariance(x, n_factors=x.shape[1], min_specific_var=0.0)
+    assert np.allclose(full.to_dense(), np.cov(x, rowvar=False), atol=1e-12)
+
+
+def test_as_covariance_picks_the_representation():
+    matrix = np.eye(3)
+    assert isinstance(as_covariance(matrix), DenseCovariance)
+    assert isinstance(as_covariance(sp.eye(3)), SparseCovariance)
+    cov = low_rank()
+    assert as_covariance(cov) is cov
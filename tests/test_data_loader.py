@@ -0,0 +1,61 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_loader import _store_is_current, load_price_store, load_stock_data, save_price_store, store_path_for
+
+
+@pytest.fixture
+def prices():
+    index = pd.bdate_range('2023-01-02', periods=50)
+    values = 100 + np.cumsum(np.random.default_rng(0).normal(size=(50, 3)), axis=0)
+    df = pd.DataFrame(values, index=index, columns=['AAA', 'BBB.DE', 'CCC'])
+    df.iloc[:5, 2] = np.nan  # listed later
+    df.iloc[20, 0] = np.nan  # missing quote
+    return df
+
+
+def test_store_round_trip(tmp_path, prices):
+    store_path = str(tmp_path / 'stock_data_store')
+    save_price_store(prices, store_path)
+    loaded = load_price_store(store_path)
+    assert loaded.index.equals(prices.index) and list(loaded.columns) == list(prices.columns)
+    assert np.array_equal(loaded.to_numpy(), prices.to_numpy(), equal_nan=True)
+    assert np.isnan(loaded.iloc[:5, 2]).all() and np.isnan(loaded.iloc[20, 0])
+    assert loaded.to_numpy().flags['F_CONTIGUOUS']  # each ticker is contiguous
+
+
+def set_mtime(path, seconds):
+    os.utime(path, (seconds, seconds))
+
+
+def test_the_newer_of_store_and_csv_is_loaded(tmp_path, prices):
+    csv_path = str(tmp_path / 'stock_data.csv')
+    store_path = store_path_for(csv_path)
+    assert store_path == str(tmp_path / 'stock_data_store')
+    prices.to_csv(csv_path)
+    assert not _store_is_current(store_path, csv_path)  # no store yet
+
+    save_price_store(prices * 2, store_path)
+    set_mtime(csv_path, 1_000_000)
+    assert _store_is_current(store_path, csv_path)
+    assert np.allclose(load_stock_data(csv_path).iloc[-1], prices.iloc[-1] * 2, equal_nan=True)
+
+    # the CSV was edited after the store was written: read the CSV
+    set_mtime(os.path.join(store_path, 'prices.npy'), 500_000)
+    assert not _store_is_current(store_path, csv_path)
+    loaded = load_stock_data(csv_path)
+    assert np.allclose(loaded, prices, equal_nan=True)
+    assert loaded.index.equals(prices.index)
+
+
+def test_store_without_a_csv(tmp_path, prices):
+    csv_path = str(tmp_path / 'stock_data.csv')
+    save_price_store(prices, store_path_for(csv_path))
+    assert np.allclose(load_stock_data(csv_path), prices, equal_nan=True)
+
+
+def test_missing_data(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_stock_data(str(tmp_path / 'stock_data.csv'))
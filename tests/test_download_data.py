@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from download_data import FakeProvider, download, load_watermarks, update
+
+TICKERS = ['AAA', 'BBB']
+
+
+def fake_prices():
+    index = pd.bdate_range('2024-06-03', pd.Timestamp.today().normalize())
+    prices = 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.01, size=(len(index), 2)), axis=0))
+    return pd.DataFrame(prices, index=index, columns=TICKERS)
+
+
+def test_update_fetches_up_to_today(tmp_path):
+    prices = fake_prices()
+    provider = FakeProvider(prices)
+    file_path = str(tmp_path / 'stock_data.csv')
+    download(TICKERS, file_path, start='2024-06-01', end='2024-12-01', provider=provider)
+    watermark = load_watermarks(file_path)['AAA']
+    assert watermark < pd.Timestamp('2024-12-01')
+
+    updated = update(TICKERS, file_path, start='2024-06-01', provider=provider)
+    assert provider.requests[-1][1] == watermark  # only the missing range is requested
+    assert updated.index[-1] == prices.index[-1]
+    assert np.allclose(updated, prices)
+    assert load_watermarks(file_path)['BBB'] == prices.index[-1]
+
+
+def test_update_with_a_fixed_end(tmp_path):
+    provider = FakeProvider(fake_prices())
+    file_path = str(tmp_path / 'stock_data.csv')
+    updated = update(TICKERS, file_path, start='2024-06-01', end='2024-09-01', provider=provider)
+    assert updated.index[-1] < pd.Timestamp('2024-09-01')
+    assert provider.requests == [(TICKERS, pd.Timestamp('2024-06-01'), '2024-09-01')]
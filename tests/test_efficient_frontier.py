@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from scipy.optimize import minimize
+from covariance import LowRankCovariance
+from efficient_frontier import frontier_weights, generate_efficient_frontier, two_fund_weights
+from optimizers import minimum_variance_portfolio
+from portfolio_functions import PortfolioProblem
+from solver_metrics import SolverMetrics
+
+BOUNDS = (-0.08, 0.2)
+
+
+def slsqp_frontier_point(problem, target, bounds):
+    """Minimum variance at `target` return, solved by SLSQP to a tight tolerance."""
+    cov, mu = problem.covariance.to_dense(), problem.mean_returns
+    n = problem.n_assets
+    result = minimize(lambda w: w @ cov @ w, np.full(n, 1 / n), jac=lambda w: 2 * cov @ w, method='SLSQP',
+                      constraints=[{'type': 'eq', 'fun': lambda w: [w.sum() - 1, w @ mu - target],
+                                    'jac': lambda w: np.vstack([np.ones(n), mu])}],
+                      bounds=[bounds] * n, options={'ftol': 1e-14, 'maxiter': 1000})
+    assert result.success
+    return result.x
+
+
+def test_two_fund_weights_solve_the_budget_constrained_problem(problem):
+    targets = np.linspace(0.05, 0.3, 5)
+    weights = two_fund_weights(targets, problem.mean_returns, problem.covariance)
+    # KKT system of min w'Sw s.t. 1'w = 1, mu'w = target
+    n = problem.n_assets
+    A = np.vstack([np.ones(n), problem.mean_returns])
+    kkt = np.block([[2 * problem.covariance.to_dense(), A.T], [A, np.zeros((2, 2))]])
+    for target, row in zip(targets, weights):
+        expected = np.linalg.solve(kkt, np.concatenate([np.zeros(n), [1.0, target]]))[:n]
+        assert np.allclose(row, expected, atol=1e-10)
+
+
+def test_two_fund_weights_with_a_factor_covariance(problem):
+    rng = np.random.default_rng(0)
+    cov = LowRankCovariance(rng.normal(0, 0.1, size=(problem.n_assets, 3)), rng.uniform(0.01, 0.02, problem.n_assets))
+    targets = np.array([0.05, 0.2])
+    dense = two_fund_weights(targets, problem.mean_returns, cov.to_dense())
+    assert np.allclose(two_fund_weights(targets, problem.mean_returns, cov), dense, atol=1e-10)
+
+
+# the active set is exact, the SLSQP path stops at its default ftol
+@pytest.mark.parametrize('method, rel', [('qp', 1e-8), ('slsqp', 1e-3)])
+def test_frontier_matches_slsqp(returns, problem, method, rel):
+    mvp = minimum_variance_portfolio(problem, BOUNDS)
+    metrics = SolverMetrics()
+    targets, vols = generate_efficient_frontier(returns, returns.cov() * 12, mvp.x, num_points=40, bounds=BOUNDS,
+                                                method=method, metrics=metrics)
+    # the first points come from the two-fund formula, the rest are solved
+    assert 0 < len(metrics) < len(targets)
+    for target, vol in zip(targets, vols):
+        expected = slsqp_frontier_point(problem, target, BOUNDS)
+        assert vol == pytest.approx(problem.standard_deviation(expected), rel=rel)
+
+
+def test_frontier_weights(problem):
+    mvp = minimum_variance_portfolio(problem, BOUNDS)
+    targets = np.linspace(problem.expected_return(mvp.x), 0.9 * problem.mean_returns.max(), 12)
+    weights = frontier_weights(problem, targets, BOUNDS)
+    assert np.allclose(weights @ problem.mean_returns, targets)
+    assert np.all(weights >= BOUNDS[0] - 1e-9) and np.all(weights <= BOUNDS[1] + 1e-9)
+    for target, row in zip(targets, weights):
+        expected = slsqp_frontier_point(problem, target, BOUNDS)
+        assert problem.variance(row) == pytest.approx(problem.variance(expected), rel=1e-6)
+
+
+@pytest.mark.parametrize('covariance', ['dense', 'low_rank'])
+def test_workers_give_the_sequential_frontier(returns, covariance):
+    cov = returns.cov() * 12
+    if covariance == 'low_rank':
+        values, vectors = np.linalg.eigh(cov)
+        loadings = vectors[:, -4:] * np.sqrt(values[-4:])
+        cov = LowRankCovariance(loadings, np.diag(cov) - np.sum(loadings ** 2, axis=1))
+    problem = PortfolioProblem.from_returns(returns, cov)
+    mvp = minimum_variance_portfolio(problem, BOUNDS)
+
+    sequential_metrics, parallel_metrics = SolverMetrics(), SolverMetrics()
+    sequential = generate_efficient_frontier(returns, cov, mvp.x, num_points=60, bounds=BOUNDS,
+                                             metrics=sequential_metrics)
+    parallel = generate_efficient_frontier(returns, cov, mvp.x, num_points=60, bounds=BOUNDS, workers=2,
+                                           metrics=parallel_metrics)
+    assert len(parallel_metrics) == len(sequential_metrics) >= 8  # enough points for several chunks
+    assert np.array_equal(parallel[0], sequential[0])  # same points, in the same order
+    assert np.allclose(parallel[1], sequential[1], rtol=1e-10)
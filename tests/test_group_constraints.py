@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from group_constraints import GroupConstraints, GroupMembership, group_inequalities, group_violation
+from optimizers import max_feasible_return, max_sharpe_portfolio, minimum_variance_portfolio
+
+SECTORS = ['Tech', 'Tech', 'Energy', 'Health', 'Tech', 'Energy', 'Health', 'Health', 'Tech', 'Energy', 'Utilities',
+           'Tech']
+
+
+@pytest.fixture
+def sectors(returns):
+    metadata = pd.DataFrame({'Ticker': returns.columns, 'Sector': SECTORS})
+    return GroupMembership.from_metadata(metadata, list(returns.columns), 'Sector')
+
+
+def test_membership_aggregates_like_groupby(returns, sectors):
+    weights = np.random.default_rng(0).dirichlet(np.ones(len(SECTORS)))
+    expected = pd.Series(weights).groupby(pd.Series(SECTORS)).sum()
+    assert np.allclose(sectors.aggregate(weights).reindex(expected.index), expected)
+    batch = np.random.default_rng(1).normal(size=(5, len(SECTORS)))
+    assert np.allclose(sectors.exposures(batch), [sectors.exposures(row) for row in batch])
+
+
+def test_tickers_missing_from_the_metadata_belong_to_no_group(returns):
+    metadata = pd.DataFrame({'Sector': SECTORS[:-1]}, index=returns.columns[:-1])
+    membership = GroupMembership.from_metadata(metadata, list(returns.columns), 'Sector')
+    assert membership.matrix.shape == (4, len(SECTORS))
+    assert membership.matrix[:, -1].nnz == 0
+
+
+def test_inequalities_and_violation(sectors):
+    constraints = GroupConstraints(sectors, lower={'Energy': 0.1}, upper=0.4)
+    A_ub, b_ub = group_inequalities(constraints)
+    assert A_ub.shape == (5, len(SECTORS))  # four upper limits and one lower limit
+    assert np.allclose(b_ub, [0.4] * 4 + [-0.1])
+
+    weights = np.zeros(len(SECTORS))
+    weights[[0, 1, 4]] = 0.2  # Tech 60%, Energy 0%
+    weights[[3, 10]] = 0.2
+    assert group_violation(constraints, weights) == pytest.approx(0.2)
+    assert np.allclose(group_violation(constraints, np.stack([weights, np.full(len(SECTORS), 1 / 12)])), [0.2, 5 / 12 - 0.4])
+    assert group_inequalities(GroupConstraints(sectors)) is None
+    assert group_violation(None, weights) == 0.0
+
+
+@pytest.mark.parametrize('optimizer', [minimum_variance_portfolio, max_sharpe_portfolio])
+def test_optimizers_respect_the_limits(problem, sectors, optimizer):
+    bounds = (0.0, 0.3)
+    unconstrained = optimizer(problem, bounds)
+    tech = sectors.labels.get_loc('Tech')
+    limit = sectors.exposures(unconstrained.x)[tech] - 0.1
+    constraints = GroupConstraints(sectors, upper={'Tech': limit})
+
+    result = optimizer(problem, bounds, group_constraints=constraints)
+    assert result.success and result.method == 'slsqp'  # the QP answer breaks the limit
+    assert sectors.exposures(result.x)[tech] <= limit + 1e-8
+    assert result.constraint_violation < 1e-8
+
+    # a limit that does not bind leaves the QP solution untouched
+    loose = GroupConstraints(sectors, upper=1.0)
+    result = optimizer(problem, bounds, group_constraints=loose)
+    assert result.method == 'qp' and np.allclose(result.x, unconstrained.x)
+
+
+def test_max_feasible_return_with_limits(problem, sectors):
+    bounds = (0.0, 0.3)
+    mean_returns = problem.mean_returns
+    assert max_feasible_return(mean_returns, bounds, GroupConstraints(sectors, upper=1.0)) == \
+        pytest.approx(max_feasible_return(mean_returns, bounds))
+
+    # at most 35% in each sector: no random feasible portfolio beats the LP
+    constraints = GroupConstraints(sectors, upper=0.35)
+    best = max_feasible_return(mean_returns, bounds, constraints)
+    sample = np.random.default_rng(2).dirichlet(np.ones(len(SECTORS)) * 0.3, size=20000)
+    feasible = (sample <= 0.3).all(axis=1) & (group_violation(constraints, sample) <= 0)
+    assert feasible.any()
+    assert best >= (sample[feasible] @ mean_returns).max()
+    assert max_feasible_return(mean_returns, bounds, GroupConstraints(sectors, upper=0.2)) == -np.inf
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import main
+from conftest import make_returns
+from security_master import load_security_master
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """A working directory with data/stock_data.csv for twelve tickers of the security master."""
+    tickers = list(load_security_master().index[:12])
+    returns = make_returns(n_assets=12)
+    prices = 100 * (1 + returns).cumprod()
+    prices.columns = tickers
+    (tmp_path / 'data').mkdir()
+    prices.to_csv(tmp_path / 'data' / 'stock_data.csv')
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_cached_failures_are_reported_again(workdir, monkeypatch, capsys):
+    def failing(problem, **kwargs):
+        result = max_sharpe(problem, **kwargs)
+        result.success, result.message = False, 'Iteration limit reached'
+        return result
+    max_sharpe = main.max_sharpe_portfolio
+    monkeypatch.setattr(main, 'max_sharpe_portfolio', failing)
+
+    for _ in range(2):  # solved, then read from the result cache
+        main.main(plots=False)
+        assert "Warning: max_sharpe optimization did not converge: Iteration limit reached" in capsys.readouterr().out
+    assert len(list((workdir / '.cache' / 'optimizer').glob('*.npz'))) == 1
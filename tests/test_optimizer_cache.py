@@ -0,0 +1,55 @@
+import os
+import numpy as np
+
+from optimizer_cache import ResultCache, inputs_hash
+
+
+def test_key_depends_on_every_input(returns):
+    key = inputs_hash('portfolios', returns, (-0.08, 0.1), 0.0193, ['A', 'B'])
+    assert key == inputs_hash('portfolios', returns.copy(), (-0.08, 0.1), 0.0193, ['A', 'B'])
+    changed = returns.copy()
+    changed.iloc[5, 3] += 1e-12
+    assert key != inputs_hash('portfolios', changed, (-0.08, 0.1), 0.0193, ['A', 'B'])
+    assert key != inputs_hash('portfolios', returns.astype(np.float32), (-0.08, 0.1), 0.0193, ['A', 'B'])
+    assert key != inputs_hash('portfolios', returns.to_numpy().reshape(-1), (-0.08, 0.1), 0.0193, ['A', 'B'])
+    assert key != inputs_hash('frontier', returns, (-0.08, 0.1), 0.0193, ['A', 'B'])
+    assert key != inputs_hash('portfolios', returns, (-0.08, 0.2), 0.0193, ['A', 'B'])
+    assert key != inputs_hash('portfolios', returns, (-0.08, 0.1), 0.0193, ['B', 'A'])
+
+
+def test_get_or_compute(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {'weights': [0.5, 0.5], 'ok': True}
+
+    first = cache.get_or_compute('portfolios', (1, 2), compute)
+    second = cache.get_or_compute('portfolios', (1, 2), compute)
+    assert len(calls) == 1
+    assert np.array_equal(first['weights'], second['weights']) and second['ok']
+    cache.get_or_compute('portfolios', (1, 3), compute)
+    assert len(calls) == 2
+    cache.clear()
+    assert cache.get(inputs_hash('portfolios', 1, 2)) is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    entry = {'values': np.zeros(1000)}  # about 8 kB per entry
+    cache = ResultCache(str(tmp_path), max_bytes=30_000)
+    for i, key in enumerate('abc'):
+        cache.put(key, entry)
+        os.utime(cache._path(key), (1000 + i, 1000 + i))
+    assert cache.get('a') is not None  # reading 'a' makes 'b' the oldest
+    cache.put('d', entry)
+    assert cache.get('b') is None
+    assert all(cache.get(key) is not None for key in 'acd')
+    assert sum(entry.stat().st_size for entry in os.scandir(tmp_path)) <= 30_000
+
+
+def test_unreadable_entry_is_a_miss(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    with open(cache._path('broken'), 'wb') as f:
+        f.write(b'not an npz file')
+    assert cache.get('broken') is None
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+import optimizers
+from optimizers import efficient_portfolio, max_sharpe_portfolio, minimum_variance_portfolio, robust_portfolio
+from portfolio_functions import PortfolioProblem
+from qp_solver import solve_box_qp
+from solver_metrics import solve_record
+
+
+def test_robust_portfolio_without_uncertainty_is_mean_variance(problem):
+    # kappa = 0: max mu'w - risk_aversion / 2 w'Sw, a QP
+    bounds = (-0.08, 0.2)
+    cov = problem.covariance.to_dense()
+    expected = solve_box_qp(2.0 * cov, -problem.mean_returns, np.ones((1, problem.n_assets)), [1.0], *bounds)
+    result = robust_portfolio(problem, risk_aversion=2.0, kappa=0.0, bounds=bounds)
+
+    assert result.success
+    assert np.allclose(result.x, expected.x, atol=1e-5)
+    assert result.worst_case_return == pytest.approx(problem.expected_return(result.x))
+
+
+def test_robust_portfolio_worst_case_return(problem):
+    uncertainty = problem.covariance.diagonal() / 10
+    result = robust_portfolio(problem, kappa=1.0, uncertainty=uncertainty, bounds=(-0.08, 0.2))
+    spread = np.sqrt(result.x @ (uncertainty * result.x))
+    assert result.success and result.constraint_violation < 1e-8
+    assert result.worst_case_return == pytest.approx(problem.expected_return(result.x) - spread)
+
+
+@pytest.mark.parametrize('bounds', [(-0.08, 0.2), (0.0, 0.3)])
+def test_qp_and_slsqp_agree(problem, bounds):
+    qp = minimum_variance_portfolio(problem, bounds, method='qp')
+    slsqp = minimum_variance_portfolio(problem, bounds, method='slsqp')
+    assert qp.method == 'qp' and qp.success
+    # SLSQP stops at ftol = 1e-9 on the variance, the active set is exact
+    assert problem.variance(qp.x) <= problem.variance(slsqp.x) + 1e-12
+    assert problem.variance(qp.x) == pytest.approx(problem.variance(slsqp.x), rel=1e-3)
+
+    # the frontier search of the QP path finds the tangency portfolio
+    qp = max_sharpe_portfolio(problem, bounds, method='qp')
+    slsqp = max_sharpe_portfolio(problem, bounds, method='slsqp')
+    assert qp.method == 'qp' and qp.success
+    assert problem.sharpe_ratio(qp.x) >= problem.sharpe_ratio(slsqp.x) - 1e-8
+    assert np.allclose(qp.x, slsqp.x, atol=1e-3)
+
+
+def test_efficient_portfolio_hits_the_target(problem):
+    mvp = minimum_variance_portfolio(problem, (-0.08, 0.2))
+    target = problem.expected_return(mvp.x) + 0.02
+    result = efficient_portfolio(problem, target, (-0.08, 0.2))
+    reference = efficient_portfolio(problem, target, (-0.08, 0.2), method='slsqp')
+    assert result.success and result.constraint_violation < 1e-9
+    assert problem.expected_return(result.x) == pytest.approx(target)
+    assert problem.variance(result.x) <= problem.variance(reference.x) + 1e-12
+
+
+def test_max_sharpe_reports_frontier_fallbacks(problem, monkeypatch):
+    # every target-return QP fails, so each frontier point is solved by SLSQP
+    qp = optimizers._qp
+    monkeypatch.setattr(optimizers, '_qp', lambda A, *args: None if len(A) == 2 else qp(A, *args))
+    result = max_sharpe_portfolio(problem, (-0.08, 0.2), method='qp')
+    assert result.success and result.method == 'slsqp'
+    assert solve_record('tangency', result, 'qp')['fallback']
+
+
+def test_max_sharpe_checks_the_final_frontier_solve(problem, monkeypatch):
+    efficient = optimizers.efficient_portfolio
+    calls = []
+    monkeypatch.setattr(optimizers, 'efficient_portfolio', lambda *args, **kwargs: calls.append(1) or
+                        efficient(*args, **kwargs))
+    expected = max_sharpe_portfolio(problem, (-0.08, 0.2), method='qp')
+
+    # the same search, with the last solve (at the tangency target) failing
+    def failing_last(*args, **kwargs):
+        result = efficient(*args, **kwargs)
+        calls.pop()
+        if not calls:
+            result.success, result.status = False, 9
+        return result
+    monkeypatch.setattr(optimizers, 'efficient_portfolio', failing_last)
+    result = max_sharpe_portfolio(problem, (-0.08, 0.2), method='qp')
+    assert result.success and result.method == 'slsqp'
+    assert problem.sharpe_ratio(result.x) == pytest.approx(problem.sharpe_ratio(expected.x), rel=1e-6)
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_max_sharpe_when_the_bounds_allow_one_portfolio(seed):
+    # ten assets capped at 10%: equal weights is the only portfolio, and rounding
+    # can put the MVP return just above the highest feasible return
+    rng = np.random.default_rng(seed)
+    factor = rng.normal(size=(10, 10)) * 0.05
+    problem = PortfolioProblem(rng.normal(0.08, 0.05, 10), factor @ factor.T + 0.01 * np.eye(10))
+    result = max_sharpe_portfolio(problem, (-0.08, 0.1))
+    assert result.success and result.method == 'qp'
+    assert np.allclose(result.x, 0.1)
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from covariance import LowRankCovariance
+from portfolio_functions import (batch_expected_returns, batch_portfolio_variance, batch_sharpe_ratio,
+                                 batch_standard_deviation, expected_returns, portfolio_variance, sharpe_ratio,
+                                 standard_deviation)
+
+
+@pytest.fixture
+def weights(returns):
+    return np.random.default_rng(0).dirichlet(np.ones(returns.shape[1]), size=6)
+
+
+def test_batch_functions_match_the_scalar_ones(returns, weights):
+    cov = returns.cov() * 12
+    assert np.allclose(batch_expected_returns(weights, returns), [expected_returns(w, returns) for w in weights])
+    assert np.allclose(batch_portfolio_variance(weights, cov), [portfolio_variance(w, cov) for w in weights])
+    assert np.allclose(batch_standard_deviation(weights, cov), [standard_deviation(w, cov) for w in weights])
+    assert np.allclose(batch_sharpe_ratio(weights, returns, cov, 0.03),
+                       [sharpe_ratio(w, returns, cov, 0.03) for w in weights])
+
+
+def test_batch_functions_on_a_factor_covariance(weights):
+    rng = np.random.default_rng(1)
+    cov = LowRankCovariance(rng.normal(0, 0.1, size=(weights.shape[1], 2)), np.full(weights.shape[1], 0.01))
+    assert np.allclose(batch_portfolio_variance(weights, cov), [portfolio_variance(w, cov) for w in weights])
+
+
+def test_problem_batch_metrics(problem, returns, weights):
+    cov = returns.cov() * 12
+    rets, vols, sharpes = problem.batch_metrics(weights)
+    assert np.allclose(rets, batch_expected_returns(weights, returns))
+    assert np.allclose(vols, batch_standard_deviation(weights, cov))
+    assert np.allclose(sharpes, batch_sharpe_ratio(weights, returns, cov, problem.risk_free_rate))
+    assert np.allclose(problem.batch_metrics(weights[0])[2], problem.sharpe_ratio(weights[0]))
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from scipy.optimize import minimize
+from qp_solver import FactorCache, feasible_point, solve_box_qp
+
+
+def random_qp(n, seed, n_eq=1):
+    rng = np.random.default_rng(seed)
+    factor = rng.normal(size=(n, n))
+    Q = factor @ factor.T / n + 0.05 * np.eye(n)
+    c = rng.normal(size=n)
+    A = np.vstack([np.ones(n), rng.normal(size=(n_eq - 1, n))])
+    b = np.append(1.0, A[1:] @ np.full(n, 1 / n))  # 1/n is feasible for the extra rows
+    return Q, c, A, b
+
+
+def slsqp_reference(Q, c, A, b, lower, upper):
+    n = len(c)
+    result = minimize(lambda x: 0.5 * x @ Q @ x + c @ x, np.full(n, 1 / n), jac=lambda x: Q @ x + c,
+                      constraints=[{'type': 'eq', 'fun': lambda x: A @ x - b, 'jac': lambda x: A}],
+                      bounds=list(zip(np.broadcast_to(lower, n), np.broadcast_to(upper, n))),
+                      method='SLSQP', options={'ftol': 1e-12, 'maxiter': 1000})
+    assert result.success
+    return result
+
+
+def assert_kkt(result, Q, c, A, b, lower, upper, tol=1e-8):
+    """Feasibility and sign-correct bound multipliers at result.x."""
+    x = result.x
+    assert np.allclose(A @ x, b, atol=tol)
+    assert np.all(x >= lower - tol) and np.all(x <= upper + tol)
+    z = Q @ x + c + A.T @ result.eq_multipliers  # = multipliers of the bounds
+    lower, upper = np.broadcast_to(lower, x.shape), np.broadcast_to(upper, x.shape)
+    free = (x > lower + 1e-9) & (x < upper - 1e-9)
+    pinned = lower == upper
+    assert np.allclose(z[free], 0.0, atol=1e-7)
+    assert np.all(z[(x <= lower + 1e-9) & ~pinned] >= -1e-7)
+    assert np.all(z[(x >= upper - 1e-9) & ~pinned] <= 1e-7)
+
+
+@pytest.mark.parametrize('seed', range(8))
+@pytest.mark.parametrize('n, n_eq', [(10, 1), (30, 2), (60, 2)])
+def test_matches_slsqp_on_random_box_qps(n, n_eq, seed):
+    Q, c, A, b = random_qp(n, seed, n_eq)
+    lower, upper = -0.5 / n, 3.0 / n
+    result = solve_box_qp(Q, c, A, b, lower, upper)
+    reference = slsqp_reference(Q, c, A, b, lower, upper)
+
+    assert result.success
+    assert_kkt(result, Q, c, A, b, lower, upper)
+    assert result.fun <= reference.fun + 1e-9
+    assert np.allclose(result.x, reference.x, atol=1e-5)
+
+
+def test_warm_start_gives_the_same_solution():
+    Q, c, A, b = random_qp(40, 1, n_eq=2)
+    cache = FactorCache(Q)
+    cold = solve_box_qp(Q, c, A, b, -0.02, 0.1, cache=cache)
+    b_moved = b + np.array([0.0, 0.01])
+    warm = solve_box_qp(Q, c, A, b_moved, -0.02, 0.1, x0=cold.x, cache=cache)
+    fresh = solve_box_qp(Q, c, A, b_moved, -0.02, 0.1)
+    assert warm.success and fresh.success
+    assert np.allclose(warm.x, fresh.x, atol=1e-9)
+
+
+def test_per_asset_bounds_and_fixed_variables():
+    Q, c, A, b = random_qp(15, 2)
+    lower = np.full(15, -0.05)
+    upper = np.full(15, 0.2)
+    lower[:3] = upper[:3] = 0.05  # degenerate: three variables pinned
+    result = solve_box_qp(Q, c, A, b, lower, upper)
+    assert result.success
+    assert np.allclose(result.x[:3], 0.05)
+    assert_kkt(result, Q, c, A, b, lower, upper)
+    assert result.fun <= slsqp_reference(Q, c, A, b, lower, upper).fun + 1e-9
+
+
+def test_only_one_feasible_point():
+    # the budget can only be met with every variable at its upper bound
+    Q, c, A, b = random_qp(10, 3)
+    result = solve_box_qp(Q, c, A, b, 0.0, 0.1)
+    assert result.success
+    assert np.allclose(result.x, 0.1)
+
+
+def test_infeasible_bounds():
+    Q, c, A, b = random_qp(10, 4)
+    assert feasible_point(A, b, np.zeros(10), np.full(10, 0.09)) is None
+    result = solve_box_qp(Q, c, A, b, 0.0, 0.09)
+    assert result.status == 2 and not result.success and result.x is None
+
+
+@pytest.mark.parametrize('n_fixed', [0, 3, 30])
+def test_factor_cache_solves_subsystems(n_fixed):
+    # no bound fixed, few fixed (Schur complement of Q^-1) and mostly fixed (direct factor)
+    Q, _, _, _ = random_qp(40, 5)
+    cache = FactorCache(Q)
+    free = np.ones(40, dtype=bool)
+    free[np.random.default_rng(0).choice(40, n_fixed, replace=False)] = False
+    rhs = np.random.default_rng(1).normal(size=(free.sum(), 2))
+    expected = np.linalg.solve(Q[np.ix_(free, free)], rhs)
+    assert np.allclose(cache.solve(free, rhs), expected, atol=1e-10)
+    assert np.allclose(cache.solve(free, rhs), expected, atol=1e-10)  # second call hits the LRU factors
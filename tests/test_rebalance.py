@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from optimizers import max_sharpe_portfolio, rebalance_portfolio
+
+BOUNDS = (-0.08, 0.2)
+
+
+@pytest.fixture
+def current(problem):
+    return np.full(problem.n_assets, 1 / problem.n_assets)
+
+
+def test_without_costs_it_is_the_tangency_portfolio(problem, current):
+    result = rebalance_portfolio(problem, current, BOUNDS)
+    tangency = max_sharpe_portfolio(problem, BOUNDS)
+    assert result.success
+    assert problem.sharpe_ratio(result.x) == pytest.approx(problem.sharpe_ratio(tangency.x), rel=1e-5)
+    assert np.allclose(result.x, tangency.x, atol=1e-3)
+
+
+def test_trades_are_consistent(problem, current):
+    result = rebalance_portfolio(problem, current, BOUNDS, linear_cost=0.002, quadratic_cost=0.01)
+    assert result.constraint_violation < 1e-8
+    assert np.allclose(result.x, current + result.trades)
+    assert result.turnover == pytest.approx(np.abs(result.trades).sum(), abs=1e-8)
+    assert result.cost == pytest.approx(0.002 * result.turnover + 0.01 * result.trades @ result.trades, abs=1e-10)
+
+
+@pytest.mark.parametrize('max_turnover', [0.05, 0.2])
+def test_turnover_cap(problem, current, max_turnover):
+    result = rebalance_portfolio(problem, current, BOUNDS, max_turnover=max_turnover)
+    assert result.success
+    assert result.turnover <= max_turnover + 1e-8
+    # the cap binds, and trading still improves on holding
+    assert result.turnover == pytest.approx(max_turnover, abs=1e-6)
+    assert problem.sharpe_ratio(result.x) > problem.sharpe_ratio(current)
+
+
+def test_costs_shrink_the_trade(problem, current):
+    turnovers = [rebalance_portfolio(problem, current, BOUNDS, linear_cost=cost).turnover
+                 for cost in (0.0, 0.01, 0.05)]
+    assert turnovers[0] > turnovers[1] > turnovers[2]
+    # a prohibitive cost means no trade
+    assert rebalance_portfolio(problem, current, BOUNDS, linear_cost=10.0).turnover < 1e-8
+
+
+def test_current_weights_must_be_a_portfolio(problem, current):
+    with pytest.raises(ValueError):
+        rebalance_portfolio(problem, current * 0.9, BOUNDS)
+
+
+@pytest.fixture
+def drifted(problem):
+    # the tangency portfolio after its largest position grew to 30%, above the 20% cap
+    weights = max_sharpe_portfolio(problem, BOUNDS).x.copy()
+    top = np.argmax(weights)
+    weights[top] += 0.3 - weights[top]
+    weights[np.arange(len(weights)) != top] *= (1 - 0.3) / (weights.sum() - 0.3)
+    return weights, top
+
+
+@pytest.mark.parametrize('linear_cost', [0.0, 0.05])
+def test_drifted_holdings_are_brought_back_within_the_bounds(problem, drifted, linear_cost):
+    weights, top = drifted
+    result = rebalance_portfolio(problem, weights, BOUNDS, linear_cost=linear_cost)
+    assert result.success
+    assert result.constraint_violation < 1e-8
+    assert result.x[top] <= BOUNDS[1] + 1e-8
+    assert np.all(result.x >= BOUNDS[0] - 1e-8)
+
+
+def test_turnover_cap_too_tight_to_restore_the_bounds(problem, drifted):
+    weights, _ = drifted
+    result = rebalance_portfolio(problem, weights, BOUNDS, max_turnover=0.1)  # needs at least 2 x 10%
+    assert not result.success
+    assert result.constraint_violation > 1e-6
+
+    result = rebalance_portfolio(problem, weights, BOUNDS, max_turnover=0.25)
+    assert result.success and result.turnover <= 0.25 + 1e-8
+    assert result.constraint_violation < 1e-8
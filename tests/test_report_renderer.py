@@ -0,0 +1,34 @@
+import os
+import matplotlib
+import pytest
+
+from matplotlib.figure import Figure
+from report_renderer import render_charts
+
+
+def draw(file_path, title):
+    fig = Figure()
+    fig.add_subplot().set_title(title)
+    fig.savefig(file_path)
+
+
+@pytest.mark.parametrize('workers', [None, 1, 2])
+def test_charts_are_rendered_without_switching_the_callers_backend(tmp_path, workers):
+    backend = matplotlib.get_backend()
+    matplotlib.use('svg')  # stands in for an interactive user's backend
+    try:
+        paths = [str(tmp_path / f'chart{i}.png') for i in range(3)]
+        render_charts([(draw, (path,), {'title': 'Chart'}) for path in paths], workers=workers)
+        assert all(os.path.getsize(path) > 0 for path in paths)
+        assert matplotlib.get_backend() == 'svg'
+    finally:
+        matplotlib.use(backend)
+
+
+def fail():
+    raise RuntimeError('broken chart')
+
+
+def test_errors_reach_the_caller(tmp_path):
+    with pytest.raises(RuntimeError, match='broken chart'):
+        render_charts([(draw, (str(tmp_path / 'ok.png'), 'ok'), {}), (fail, (), {})], workers=2)
@@ -0,0 +1,21 @@
+import numpy as np
+
+from resampled_frontier import resampled_efficient_frontier
+
+BOUNDS = (-0.08, 0.2)
+
+
+def test_result_does_not_depend_on_the_workers(returns):
+    sequential = resampled_efficient_frontier(returns, num_points=15, n_resamples=8, bounds=BOUNDS, seed=3, workers=1)
+    parallel = resampled_efficient_frontier(returns, num_points=15, n_resamples=8, bounds=BOUNDS, seed=3, workers=2)
+    for a, b in zip(sequential, parallel):
+        assert np.array_equal(a, b)
+
+
+def test_averaged_weights_are_portfolios(returns):
+    _, _, weights = resampled_efficient_frontier(returns, num_points=15, n_resamples=8, bounds=BOUNDS, seed=3)
+    assert weights.shape == (15, returns.shape[1])
+    assert np.allclose(weights.sum(axis=1), 1.0)
+    assert np.all(weights >= BOUNDS[0] - 1e-9) and np.all(weights <= BOUNDS[1] + 1e-9)
+    other_seed = resampled_efficient_frontier(returns, num_points=15, n_resamples=8, bounds=BOUNDS, seed=4)
+    assert not np.allclose(other_seed[2], weights)
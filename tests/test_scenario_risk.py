@@ -0,0 +1,69 @@
+import numpy as np
+import scipy.sparse as sp
+import pytest
+
+from scipy.optimize import linprog
+from scenario_risk import min_cvar_portfolio, portfolio_cvar
+
+
+def rockafellar_uryasev(scenarios, bounds, beta):
+    """The explicit RU LP over (w, alpha, u), one row per scenario."""
+    n_scenarios, n_assets = scenarios.shape
+    cost = np.concatenate([np.zeros(n_assets), [1.0], np.full(n_scenarios, 1 / ((1 - beta) * n_scenarios))])
+    A_ub = sp.hstack([-sp.csr_matrix(scenarios.astype(np.float64)), -np.ones((n_scenarios, 1)), -sp.eye(n_scenarios)])
+    A_eq = np.concatenate([np.ones(n_assets), [0.0], np.zeros(n_scenarios)])[None, :]
+    lp = linprog(cost, A_ub=A_ub, b_ub=np.zeros(n_scenarios), A_eq=A_eq, b_eq=[1.0],
+                 bounds=[bounds] * n_assets + [(None, None)] + [(0, None)] * n_scenarios, method='highs')
+    return lp.fun, lp.x[:n_assets]
+
+
+def scenarios(n_scenarios, n_assets, seed=0):
+    rng = np.random.default_rng(seed)
+    mixing = rng.normal(size=(n_assets, n_assets)) * 0.01
+    return (rng.normal(size=(n_scenarios, n_assets)) @ mixing + 0.0005).astype(np.float32)
+
+
+@pytest.mark.parametrize('bounds, beta', [((-0.08, 0.1), 0.95), ((0.0, 1.0), 0.95), ((0.0, 0.3), 0.9)])
+def test_min_cvar_matches_rockafellar_uryasev_lp(bounds, beta):
+    data = scenarios(2000, 10)
+    expected, _ = rockafellar_uryasev(data, bounds, beta)
+    result = min_cvar_portfolio(data, bounds=bounds, beta=beta, chunk_size=300)
+
+    assert result.status == 0 and result.success
+    assert result.fun == pytest.approx(expected, rel=1e-5)
+    assert result.lower_bound <= expected + 1e-12
+    assert result.constraint_violation < 1e-9
+    assert portfolio_cvar(result.x, data, beta)[1] == pytest.approx(result.fun, rel=1e-12)
+
+
+def test_portfolio_cvar_is_the_mean_of_the_worst_losses():
+    data = scenarios(1000, 5)
+    weights = np.full(5, 0.2)
+    losses = -(data.astype(np.float64) @ weights)
+    var, cvar = portfolio_cvar(weights, data, beta=0.95, chunk_size=128)
+    assert cvar == pytest.approx(np.sort(losses)[-50:].mean(), rel=1e-12)
+    assert var == np.sort(losses)[-51]
+
+
+def test_min_return_is_respected():
+    data = scenarios(2000, 10)
+    floor = float(data.mean(axis=0, dtype=np.float64).max()) * 0.8
+    result = min_cvar_portfolio(data, bounds=(0.0, 1.0), min_return=floor)
+    assert result.status == 0
+    assert result.x @ data.mean(axis=0, dtype=np.float64) >= floor - 1e-9
+
+
+def test_unreachable_min_return_is_infeasible():
+    data = scenarios(500, 6)
+    result = min_cvar_portfolio(data, bounds=(0.0, 1.0), min_return=float(data.mean(axis=0).max()) + 1.0)
+    assert result.status == 2 and not result.success
+
+
+def test_infeasible_bounds():
+    result = min_cvar_portfolio(scenarios(500, 6), bounds=(0.0, 0.1))  # 6 x 10% < 100%
+    assert result.status == 2 and not result.success
+
+
+def test_beta_must_be_a_probability():
+    with pytest.raises(ValueError):
+        min_cvar_portfolio(scenarios(100, 3), beta=1.0)
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_functions import (annualization_factor, compute_returns, constant_correlation_shrinkage, covariance_matrix,
+                             ledoit_wolf_shrinkage, periods_per_year)
+
+
+def test_ledoit_wolf_matches_scikit_learn(returns):
+    sklearn_covariance = pytest.importorskip('sklearn.covariance')
+    x = returns.to_numpy()
+    expected, _ = sklearn_covariance.ledoit_wolf(x)
+    assert np.allclose(ledoit_wolf_shrinkage(x), expected, rtol=1e-10, atol=1e-14)
+
+
+def constant_correlation_reference(x):
+    """Ledoit & Wolf (2003), entry by entry."""
+    t, n = x.shape
+    y = x - x.mean(axis=0)
+    s = y.T @ y / t
+    sd = np.sqrt(np.diag(s))
+    r_bar = sum(s[i, j] / (sd[i] * sd[j]) for i in range(n) for j in range(n) if i != j) / (n * (n - 1))
+    f = np.array([[s[i, i] if i == j else r_bar * sd[i] * sd[j] for j in range(n)] for i in range(n)])
+
+    pi = np.array([[np.mean((y[:, i] * y[:, j] - s[i, j]) ** 2) for j in range(n)] for i in range(n)])
+    theta = lambda k, i, j: np.mean((y[:, k] ** 2 - s[k, k]) * (y[:, i] * y[:, j] - s[i, j]))
+    rho = np.trace(pi) + r_bar / 2 * sum(
+        sd[j] / sd[i] * theta(i, i, j) + sd[i] / sd[j] * theta(j, i, j)
+        for i in range(n) for j in range(n) if i != j)
+    gamma = np.sum((f - s) ** 2)
+    delta = max(0.0, min(1.0, (pi.sum() - rho) / gamma / t))
+    return delta * f + (1 - delta) * s
+
+
+@pytest.mark.parametrize('n_periods', [30, 120])
+def test_constant_correlation_matches_the_paper(n_periods):
+    x = np.random.default_rng(n_periods).standard_t(5, size=(n_periods, 6)) * 0.03
+    assert np.allclose(constant_correlation_shrinkage(x), constant_correlation_reference(x), rtol=1e-10)
+
+
+@pytest.mark.parametrize('estimator', [ledoit_wolf_shrinkage, constant_correlation_shrinkage])
+def test_shrinkage_lies_between_sample_and_target(estimator, returns):
+    x = returns.to_numpy()
+    shrunk = estimator(x)
+    sample = np.cov(x, rowvar=False, ddof=0)
+    assert np.allclose(shrunk, shrunk.T)
+    if estimator is constant_correlation_shrinkage:
+        assert np.allclose(np.diag(shrunk), np.diag(sample))  # the target keeps the sample variances
+    assert np.linalg.eigvalsh(shrunk).min() >= np.linalg.eigvalsh(sample).min() - 1e-15
+    assert np.linalg.cond(shrunk) <= np.linalg.cond(sample)
+
+
+@pytest.mark.parametrize('method', ['sample', 'ledoit_wolf', 'constant_correlation'])
+def test_covariance_matrix_is_annualized(returns, method):
+    cov = covariance_matrix(returns, method=method)
+    assert isinstance(cov, pd.DataFrame) and list(cov.columns) == list(returns.columns)
+    if method == 'sample':
+        assert np.allclose(cov, returns.cov() * 12)
+    else:
+        estimator = ledoit_wolf_shrinkage if method == 'ledoit_wolf' else constant_correlation_shrinkage
+        assert np.allclose(cov, estimator(returns.to_numpy()) * 12)
+
+
+def test_unknown_covariance_method(returns):
+    with pytest.raises(ValueError):
+        covariance_matrix(returns, method='nope')
+
+
+@pytest.mark.parametrize('freq, expected', [('B', 252), ('D', 252), ('W-FRI', 52), ('ME', 12), ('MS', 12),
+                                            ('QE', 4), ('YE', 1)])
+def test_periods_per_year_from_the_index(freq, expected):
+    index = pd.date_range('2015-01-01', periods=30, freq=freq)
+    assert periods_per_year(index) == expected
+
+
+def test_periods_per_year_without_dates():
+    assert periods_per_year(pd.RangeIndex(10)) == 12
+    assert periods_per_year(pd.date_range('2020-01-01', periods=1)) == 12
+
+
+def test_daily_index_with_gaps_is_daily():
+    # weekends and a two-week holiday do not move the median spacing
+    index = pd.bdate_range('2020-01-01', '2020-12-31')
+    index = index[(index < '2020-08-01') | (index > '2020-08-14')]
+    assert periods_per_year(index) == 252
+
+
+@pytest.mark.parametrize('kind', ['simple', 'log'])
+def test_compute_returns(kind):
+    index = pd.date_range('2020-01-03', periods=6, freq='W-FRI')
+    prices = pd.DataFrame({'A': [10.0, 11.0, 9.9, np.nan, 12.0, 12.0], 'B': [5.0, 5.5, 5.0, 5.0, 4.0, 4.4]},
+                          index=index)
+    returns = compute_returns(prices, kind=kind)
+    ratio = (prices / prices.shift(1)).iloc[1:].dropna()
+    expected = ratio - 1 if kind == 'simple' else np.log(ratio)
+
+    assert list(returns.index) == list(expected.index)  # the rows around the missing price are dropped
+    assert np.allclose(returns, expected, rtol=1e-12)
+    assert returns.attrs == {'return_kind': kind, 'periods_per_year': 52}
+    assert annualization_factor(returns) == 52
+    assert annualization_factor(returns.iloc[:2]) == 52  # taken from attrs, not the two-row index
+
+
+def test_compute_returns_in_float32():
+    prices = pd.DataFrame({'A': [1.0, 2.0, 3.0]}, index=pd.date_range('2020-01-01', periods=3, freq='D'))
+    returns = compute_returns(prices, dtype=np.float32)
+    assert returns.dtypes.iloc[0] == np.float32
+    assert np.allclose(returns['A'], [1.0, 0.5])
+    with pytest.raises(ValueError):
+        compute_returns(prices, kind='excess')
+
+
+def test_covariance_is_annualized_by_the_data_frequency():
+    index = pd.bdate_range('2020-01-01', periods=300)
+    returns = pd.DataFrame(np.random.default_rng(0).normal(0, 0.01, size=(300, 3)), index=index)
+    assert np.allclose(covariance_matrix(returns), returns.cov() * 252)
@@ -0,0 +1,63 @@
+import os
+
+from datetime import datetime
+
+# ---- TICKER LIST ----
+# Kept free of any network / file side effects so it can be imported cheaply
+# by the optimizer. Use download_data.download() to actually fetch prices.
+
+tickers = [
+    # --- Technology (Software / Semiconductors) ---
+    'HO.PA',
+    'SYP.DE',
+    'ASML.AS',
+    'SAP.DE',
+    'IFX.DE',
+
+    # --- Consumer & Luxury Goods ---
+    'MC.PA',
+    'RACE.MI',
+    'ITX.MC',
+    'AD.AS',
+
+    # --- Industrials & Aerospace ---
+    'AIR.PA',
+    'SIE.DE',
+    'SU.PA',
+
+    # --- Healthcare ---
+    'SAN.PA',
+    'SHL.DE',
+
+    # --- Financials ---
+    'ALV.DE',
+    'BNP.PA',
+    'INGA.AS',
+
+    # --- Energy & Utilities ---
+    'TTE.PA',
+    'IBE.MC',
+    'ENEL.MI',
+    'EDP.LS',
+
+    # --- Materials & Chemicals ---
+    'BAS.DE',
+    'LIN.DE',
+
+    # --- Telecommunications ---
+    'DTE.DE',
+    'TEF.MC'
+]
+
+# define start and end dates
+end_date = datetime.strptime("2025-01-01", "%Y-%m-%d")
+start_date = datetime.strptime("2020-01-31", "%Y-%m-%d")
+
+# sampling interval passed to yfinance
+interval = "1mo"
+
+# default location of the downloaded prices
+stock_data_path = 'data/stock_data.csv'
+
+# static metadata (sector, industry, country, ...) per ticker, see security_master.py
+security_master_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'security_master.csv')